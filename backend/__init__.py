@@ -1,2 +1,10 @@
-from backend.db import get_db
-from backend.utils.email_utils import send_email_otp
\ No newline at end of file
+# Resolved lazily so importing a submodule (e.g. ``python -m backend.benchmarks``)
+# does not connect to MongoDB before it has configured the environment
+def __getattr__(name):
+    if name == "get_db":
+        from backend.db import get_db
+        return get_db
+    if name == "send_email_otp":
+        from backend.utils.email_utils import send_email_otp
+        return send_email_otp
+    raise AttributeError(f"module 'backend' has no attribute {name!r}")
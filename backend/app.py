@@ -1,11 +1,23 @@
 # app.py
-from flask import Flask, send_from_directory
+from flask import Flask
 import os
 from flask_cors import CORS
 from backend.routes import auth_bp, bookings_bp, feedback_bp, admin_bp, staff_bp, services_bp
 from werkzeug.middleware.proxy_fix import ProxyFix
+from backend.db import get_db
+from backend import metrics
+from backend.indexes import ensure_indexes
+from backend.utils.assets import serve_asset
+from backend.utils.json_provider import FastJSONProvider
+from backend.utils.email_utils import start_email_workers
+from backend.utils.stats import start_stats_reconciler
+from backend.utils.rollups import ensure_rollups, start_rollup_reconciler
+from backend.utils.day_slots import ensure_day_slots
+from backend.utils.security import init_password_hasher
 
 app = Flask(__name__)
+# ObjectId/datetime-aware, orjson-backed encoder for every jsonify
+app.json = FastJSONProvider(app)
 
 # CORS: allow production frontend and common local dev origins
 CORS(
@@ -31,11 +43,14 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'None'
 app.config['SESSION_COOKIE_SECURE'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'None'
 app.config['SESSION_COOKIE_SECURE'] = True
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
+
+# Request latency / DB call metrics, /metrics and /readyz
+metrics.init_app(app, get_db)
 
 @app.route('/assets/<path:filename>')
 def serve_assets(filename):
-    return send_from_directory('../backend/public/assets', filename)
+    return serve_asset(filename)
 
 # Register blueprints with clear prefixes
 app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -45,6 +60,37 @@ app.register_blueprint(admin_bp, url_prefix="/api/admin")
 app.register_blueprint(staff_bp, url_prefix="/api/staff")
 app.register_blueprint(services_bp, url_prefix="/api/services")
 
+# Apply the declarative index registry (idempotent, safe on every boot)
+if os.environ.get("SKIP_INDEX_BOOTSTRAP") != "1":
+    try:
+        ensure_indexes(get_db())
+    except Exception as e:
+        print(f"[INDEX BOOTSTRAP ERROR] {e}")
+
+# Calibrate the password KDF cost to PASSWORD_HASH_TARGET_MS on this host
+init_password_hasher()
+
+# Background delivery for the email outbox (EMAIL_OUTBOX_WORKERS=0 disables)
+start_email_workers()
+
+# Periodically correct drift in the incrementally maintained dashboard stats
+start_stats_reconciler(get_db())
+
+# One-time build of the daily appointment rollups (runs in the background)
+try:
+    ensure_rollups(get_db())
+except Exception as e:
+    print(f"[ROLLUP BOOTSTRAP ERROR] {e}")
+
+# Periodically recompute recent rollup days to correct any drift
+start_rollup_reconciler(get_db())
+
+# One-time build of the per staff-day slot masks (runs in the background)
+try:
+    ensure_day_slots(get_db())
+except Exception as e:
+    print(f"[DAY SLOTS BOOTSTRAP ERROR] {e}")
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,9 @@
+# /benchmarks/__init__.py
+"""
+Load-test / benchmark harness for the Flask app.
+
+Boots ``backend.app`` in-process against a throwaway database on a real
+``mongod`` (``MONGO_URI``, default localhost), seeds it with realistic data
+and drives the scripted scenarios in ``scenarios.py`` through Flask's test
+client. See ``python -m backend.benchmarks --help``.
+"""
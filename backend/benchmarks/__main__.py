@@ -0,0 +1,249 @@
+# /benchmarks/__main__.py
+"""
+Run the benchmark scenarios and compare them with stored baselines.
+
+    python -m backend.benchmarks                          # local mongod, all scenarios
+    python -m backend.benchmarks -s booking_burst -s admin_dashboard
+    python -m backend.benchmarks --update-baselines       # record current numbers
+    python -m backend.benchmarks --no-budgets             # skip the query budgets
+
+The target database (``MONGO_DB_NAME``, default ``marmu_bench``) is dropped
+and re-seeded on every run. Exits 1 on a budget violation, a request
+error, or a latency/throughput regression beyond ``--tolerance``.
+
+Baselines are machine-specific and not committed: record them once with
+``--update-baselines`` before comparing. The harness needs a real mongod:
+the app relies on operators mongomock does not implement (``$bit`` updates,
+``$type`` in aggregation expressions and with a list of types), and query
+budgets need command monitoring.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+def _configure_env():
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB_NAME", "marmu_bench")
+    # Keep background work and throttling out of the measurements
+    os.environ.setdefault("EMAIL_OUTBOX_WORKERS", "0")
+    os.environ.setdefault("STATS_RECONCILE_SECONDS", "0")
+    os.environ.setdefault("ROLLUP_RECONCILE_SECONDS", "0")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("PASSWORD_HASH_TARGET_MS", "50")
+    # X-DB-Calls on every response feeds the query-count budgets
+    os.environ["METRICS_DEBUG_HEADERS"] = "1"
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        "p50": round(_percentile(ordered, 50) * 1000, 2),
+        "p95": round(_percentile(ordered, 95) * 1000, 2),
+        "p99": round(_percentile(ordered, 99) * 1000, 2),
+    }
+
+
+class Context:
+    """Seed ids plus the samples recorded by ``call`` for the running scenario."""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def call(self, client, method, path, label, json=None):
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=json)
+        response.get_data()  # drain streamed bodies inside the timing
+        elapsed = time.perf_counter() - start
+        db_calls = int(response.headers.get("X-DB-Calls", -1))
+        with self._lock:
+            self.samples.append((label, elapsed, response.status_code, db_calls))
+        return response.get_json(silent=True)
+
+
+def run_scenario(app, ctx, scenario, iterations=None, warmup=20, check_budgets=True):
+    from backend.metrics import command_monitoring_active
+
+    iterations = iterations or scenario.iterations
+    counter = itertools.count()
+
+    def worker(limit):
+        client = app.test_client()
+        state = {}
+        while True:
+            i = next(counter)
+            if i >= limit:
+                return
+            scenario.step(ctx, client, i, state)
+
+    worker(min(warmup, iterations))
+    ctx.samples = []
+    counter = itertools.count()
+
+    threads = [threading.Thread(target=worker, args=(iterations,)) for _ in range(scenario.concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    samples = ctx.samples
+    endpoints = {}
+    for label, elapsed, status, db_calls in samples:
+        entry = endpoints.setdefault(label, {"latencies": [], "max_db_calls": -1, "errors": 0})
+        entry["latencies"].append(elapsed)
+        entry["max_db_calls"] = max(entry["max_db_calls"], db_calls)
+        if status not in scenario.ok_statuses:
+            entry["errors"] += 1
+
+    report = {
+        "requests": len(samples),
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "throughput": round(len(samples) / wall, 1) if wall else 0.0,
+        **_latency_summary([s[1] for s in samples]),
+        "endpoints": {},
+        "budget_violations": [],
+    }
+    for label, entry in sorted(endpoints.items()):
+        budget = scenario.budgets.get(label)
+        report["endpoints"][label] = {
+            "count": len(entry["latencies"]),
+            "errors": entry["errors"],
+            "max_db_calls": entry["max_db_calls"],
+            "budget": budget,
+            **_latency_summary(entry["latencies"]),
+        }
+        if budget is None or not check_budgets:
+            continue
+        if entry["max_db_calls"] < 0:
+            report["budget_violations"].append(f"{label}: no X-DB-Calls header")
+        elif entry["max_db_calls"] > budget:
+            report["budget_violations"].append(f"{label}: {entry['max_db_calls']} DB calls > budget {budget}")
+    if check_budgets and scenario.budgets and not command_monitoring_active():
+        # X-DB-Calls is 0 without command events, which would pass every budget
+        report["budget_violations"].append("query budgets need command monitoring (run against a real mongod)")
+    return report
+
+
+def compare(name, report, baseline, tolerance):
+    """Regression messages for one scenario (empty when within tolerance)."""
+    problems = list(report["budget_violations"])
+    if report["errors"]:
+        problems.append(f"{report['errors']} requests returned unexpected statuses")
+    if not baseline:
+        return problems
+    for pct in ("p50", "p95", "p99"):
+        limit = baseline[pct] * (1 + tolerance)
+        if report[pct] > limit:
+            problems.append(f"{pct} {report[pct]}ms > baseline {baseline[pct]}ms (+{tolerance:.0%})")
+    floor = baseline["throughput"] * (1 - tolerance)
+    if report["throughput"] < floor:
+        problems.append(f"throughput {report['throughput']}/s < baseline {baseline['throughput']}/s (-{tolerance:.0%})")
+    return problems
+
+
+def _print_report(name, report, problems):
+    print(f"\n== {name}: {report['requests']} req, {report['throughput']} req/s, "
+          f"p50 {report['p50']}ms p95 {report['p95']}ms p99 {report['p99']}ms")
+    for label, e in report["endpoints"].items():
+        budget = "-" if e["budget"] is None else e["budget"]
+        print(f"   {label:<45} n={e['count']:<5} p50={e['p50']:<8} p95={e['p95']:<8} p99={e['p99']:<8} "
+              f"db={e['max_db_calls']}/{budget} err={e['errors']}")
+    for problem in problems:
+        print(f"   FAIL {problem}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-s", "--scenario", action="append", help="Run only these scenarios")
+    parser.add_argument("--iterations", type=int, help="Override the per-scenario request count")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the seed data volume")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression vs baseline")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--json", help="Also write the full report to this file")
+    parser.add_argument("--no-budgets", action="store_true", help="Skip the query-count budgets")
+    parser.add_argument("--force", action="store_true", help="Allow a database name without 'bench' in it")
+    args = parser.parse_args(argv)
+
+    _configure_env()
+    if "bench" not in os.environ["MONGO_DB_NAME"] and not args.force:
+        parser.error(f"refusing to drop database {os.environ['MONGO_DB_NAME']!r} (use --force)")
+
+    from backend.db import client, settings, get_db
+    if settings.db_name != os.environ["MONGO_DB_NAME"]:
+        parser.error(f"backend.db was configured for {settings.db_name!r} before the harness ran; refusing to drop it")
+    from backend.benchmarks.seed import seed
+    from backend.benchmarks.scenarios import SCENARIOS, SCENARIOS_BY_NAME
+    from backend.utils.rollups import rebuild_rollups
+    from backend.utils.day_slots import rebuild_day_slots
+
+    client.drop_database(settings.db_name)
+    db = get_db()
+    print(f"Seeding {settings.db_name} ...")
+    seeded = seed(
+        db,
+        clients=int(2000 * args.scale),
+        appointments=int(20000 * args.scale),
+        feedback=int(3000 * args.scale),
+    )
+    rebuild_rollups(db)
+    rebuild_day_slots(db)
+
+    # Importing the app runs the index bootstrap against the seeded data
+    from backend.app import app
+
+    scenarios = SCENARIOS
+    if args.scenario:
+        unknown = [s for s in args.scenario if s not in SCENARIOS_BY_NAME]
+        if unknown:
+            parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+        scenarios = [SCENARIOS_BY_NAME[s] for s in args.scenario]
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as fh:
+            baselines = json.load(fh)
+    elif not args.update_baselines:
+        parser.error(f"no baselines at {args.baselines}; record them first with --update-baselines")
+
+    ctx = Context(seeded)
+    reports, failed = {}, False
+    for scenario in scenarios:
+        report = run_scenario(app, ctx, scenario, args.iterations, check_budgets=not args.no_budgets)
+        problems = compare(scenario.name, report, baselines.get(scenario.name), args.tolerance)
+        _print_report(scenario.name, report, problems)
+        reports[scenario.name] = report
+        failed = failed or bool(problems)
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(reports, fh, indent=2)
+    if args.update_baselines:
+        for name, report in reports.items():
+            baselines[name] = {k: report[k] for k in ("p50", "p95", "p99", "throughput")}
+        with open(args.baselines, "w") as fh:
+            json.dump(baselines, fh, indent=2, sort_keys=True)
+        print(f"\nBaselines written to {args.baselines}")
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
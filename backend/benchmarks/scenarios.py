@@ -0,0 +1,108 @@
+# /benchmarks/scenarios.py
+"""
+Scripted scenarios. Each ``step`` issues one request through ``ctx.call``;
+the runner spreads ``iterations`` steps over ``concurrency`` threads.
+
+``budgets`` caps the Mongo commands a single request to an endpoint may
+issue (read from ``X-DB-Calls``, which needs driver command monitoring).
+"""
+
+
+class Scenario:
+    def __init__(self, name, step, iterations, concurrency, budgets, ok_statuses=(200,), description=""):
+        self.name = name
+        self.step = step
+        self.iterations = iterations
+        self.concurrency = concurrency
+        self.budgets = budgets
+        self.ok_statuses = ok_statuses
+        self.description = description
+
+
+# ---------------- STEPS ---------------- #
+def booking_burst(ctx, client, i, state):
+    """Distinct clients racing for the nine slots of one artist-day."""
+    username = ctx.seed["usernames"][i % len(ctx.seed["usernames"])]
+    ctx.call(client, "POST", "/api/bookings", "POST /api/bookings", json={
+        "username": username,
+        "fullname": username,
+        "service": "haircut",
+        "date": ctx.seed["bench_date"],
+        "time": f"{9 + i % 9:02d}:00",
+        "staff_id": ctx.seed["staff_ids"][0],
+    })
+
+
+def available_slots_poll(ctx, client, i, state):
+    staff_id = ctx.seed["staff_ids"][i % len(ctx.seed["staff_ids"])]
+    ctx.call(
+        client, "GET", f"/api/bookings/available_slots?date={ctx.seed['bench_date']}&staff_id={staff_id}",
+        "GET /api/bookings/available_slots",
+    )
+
+
+_DASHBOARD_PATHS = [
+    ("/api/admin/dashboard-data", "GET /api/admin/dashboard-data"),
+    ("/api/admin/appointments/summary", "GET /api/admin/appointments/summary"),
+    ("/api/admin/appointments/monthly-report", "GET /api/admin/appointments/monthly-report"),
+    ("/api/admin/reports/appointments?group_by=artist&compare=previous", "GET /api/admin/reports/appointments"),
+]
+
+
+def admin_dashboard(ctx, client, i, state):
+    path, label = _DASHBOARD_PATHS[i % len(_DASHBOARD_PATHS)]
+    ctx.call(client, "GET", path, label)
+
+
+def admin_deep_pagination(ctx, client, i, state):
+    """Walk the appointment list page by page via ``next_cursor``."""
+    path = "/api/admin/appointments?per_page=50&sort=date"
+    if state.get("cursor"):
+        path += f"&cursor={state['cursor']}"
+    body = ctx.call(client, "GET", path, "GET /api/admin/appointments")
+    state["cursor"] = (body or {}).get("next_cursor")
+
+
+_FEEDBACK_PATHS = [
+    ("/api/feedback?limit=20", "GET /api/feedback"),
+    ("/api/admin/feedback?per_page=50", "GET /api/admin/feedback"),
+    ("/api/admin/feedback?per_page=50&status=pending", "GET /api/admin/feedback"),
+]
+
+
+def feedback_listing(ctx, client, i, state):
+    path, label = _FEEDBACK_PATHS[i % len(_FEEDBACK_PATHS)]
+    ctx.call(client, "GET", path, label)
+
+
+SCENARIOS = [
+    Scenario(
+        "booking_burst", booking_burst, iterations=300, concurrency=16,
+        # identity + staff + two-week check + id block + insert + 4 hook writes = 9
+        budgets={"POST /api/bookings": 10}, ok_statuses=(201, 400, 409),
+        description="Concurrent bookings on one artist-day (409/400 are expected losers)",
+    ),
+    Scenario(
+        "available_slots_poll", available_slots_poll, iterations=2000, concurrency=8,
+        budgets={"GET /api/bookings/available_slots": 3},
+    ),
+    Scenario(
+        "admin_dashboard", admin_dashboard, iterations=400, concurrency=4,
+        budgets={
+            "GET /api/admin/dashboard-data": 2,
+            "GET /api/admin/appointments/summary": 2,
+            "GET /api/admin/appointments/monthly-report": 4,
+            "GET /api/admin/reports/appointments": 6,
+        },
+    ),
+    Scenario(
+        "admin_deep_pagination", admin_deep_pagination, iterations=400, concurrency=1,
+        budgets={"GET /api/admin/appointments": 4},
+    ),
+    Scenario(
+        "feedback_listing", feedback_listing, iterations=600, concurrency=4,
+        budgets={"GET /api/feedback": 2, "GET /api/admin/feedback": 4},
+    ),
+]
+
+SCENARIOS_BY_NAME = {s.name: s for s in SCENARIOS}
@@ -0,0 +1,85 @@
+# /benchmarks/seed.py
+"""Deterministic seed data: clients, staff, appointments and feedback."""
+import random
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+SERVICES = {"Barber": "haircut", "TattooArtist": "tattoo"}
+STATUSES = ["Pending", "Approved", "Completed", "Cancelled", "Done"]
+TIMES = [f"{h:02d}:00" for h in range(9, 18)]
+BATCH = 1000
+
+BENCH_DATE = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+
+
+def _insert(collection, docs):
+    for i in range(0, len(docs), BATCH):
+        collection.insert_many(docs[i:i + BATCH], ordered=False)
+
+
+def seed(db, clients=2000, staff=12, appointments=20000, feedback=3000, rng_seed=42):
+    """Populate an empty database; returns ids the scenarios need."""
+    rng = random.Random(rng_seed)
+    now = datetime.now()
+
+    accounts, client_docs = [], []
+    for i in range(clients):
+        account_id = ObjectId()
+        accounts.append({
+            "_id": account_id, "username": f"client{i}", "email": f"client{i}@gmail.com",
+            "hash_pass": "x" * 64, "role": "User", "fullname": f"Client {i}",
+        })
+        client_docs.append({"_id": ObjectId(), "account_id": account_id, "fullname": f"Client {i}"})
+
+    staff_docs = []
+    for i in range(staff):
+        role = "Barber" if i % 2 == 0 else "TattooArtist"
+        account_id = ObjectId()
+        accounts.append({
+            "_id": account_id, "username": f"staff{i}", "email": f"staff{i}@gmail.com",
+            "hash_pass": "x" * 64, "role": role, "fullname": f"Staff {i}",
+        })
+        staff_docs.append({"_id": ObjectId(), "account_id": account_id, "fullname": f"Staff {i}", "specialization": role})
+
+    appointment_docs, seen_slots = [], set()
+    for i in range(appointments):
+        artist = rng.choice(staff_docs)
+        client = rng.choice(client_docs)
+        date = (now + timedelta(days=rng.randint(-365, 60))).strftime("%Y-%m-%d")
+        time = rng.choice(TIMES)
+        status = rng.choice(STATUSES)
+        doc = {
+            "user_id": client["_id"], "fullname": client["fullname"],
+            "service": SERVICES[artist["specialization"]], "appointment_date": date, "time": time,
+            "remarks": "", "status": status, "artist_id": artist["_id"], "artist_name": artist["fullname"],
+            "created_at": now - timedelta(days=rng.randint(0, 400)), "display_id": f"B{i:06d}",
+        }
+        slot = (artist["_id"], date, time)
+        if status != "Cancelled" and slot not in seen_slots:
+            doc["slot_active"] = True
+            seen_slots.add(slot)
+        elif status != "Cancelled":
+            doc["status"] = "Cancelled"
+        appointment_docs.append(doc)
+
+    feedback_docs = []
+    for i in range(feedback):
+        account = accounts[rng.randrange(clients)]
+        feedback_docs.append({
+            "account_id": account["_id"], "username": account["username"], "stars": rng.randint(1, 5),
+            "message": f"Feedback {i}", "reply": "" if rng.random() < 0.3 else "Thanks!",
+            "resolved": rng.random() < 0.5, "date_submitted": now - timedelta(minutes=i * 37),
+        })
+
+    _insert(db.tbl_accounts, accounts)
+    _insert(db.clients, client_docs)
+    _insert(db.tbl_staff, staff_docs)
+    _insert(db.appointments, appointment_docs)
+    _insert(db.feedback, feedback_docs)
+
+    return {
+        "usernames": [a["username"] for a in accounts[:clients]],
+        "staff_ids": [str(s["_id"]) for s in staff_docs],
+        "bench_date": BENCH_DATE,
+    }
@@ -1,15 +1,123 @@
+from dataclasses import dataclass, field
 from pymongo import MongoClient
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 import os
 from dotenv import load_dotenv
+from backend.metrics import command_listener, pool_listener
 
 load_dotenv()
 
-mongo_uri = os.getenv("MONGO_URI")
-if not mongo_uri:
-    raise ValueError("MONGO_URI environment variable is not set!")
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
 
-client = MongoClient(mongo_uri)
-db = client["marmudb"]
+# Operation class -> (read preference, read concern level). "default" covers
+# every plain get_db() call; booking reads stay on the primary and only see
+# majority-committed data; analytics (dashboards, reports) may use secondaries.
+DEFAULT_OP_CLASSES = {
+    "default": ("primary", None),
+    "booking": ("primary", "majority"),
+    "analytics": ("secondaryPreferred", "local"),
+}
 
-def get_db():
-    return db
+
+def _env_int(env, name, default):
+    value = env.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+@dataclass(frozen=True)
+class ConnectionSettings:
+    """Everything that shapes the Mongo client, built from the environment."""
+    uri: str
+    db_name: str = "marmudb"
+    app_name: str = "marmu-backend"
+    max_pool_size: int = 50
+    min_pool_size: int = 0
+    max_idle_time_ms: int = 300000
+    wait_queue_timeout_ms: int = 5000
+    connect_timeout_ms: int = 5000
+    socket_timeout_ms: int = 30000
+    server_selection_timeout_ms: int = 5000
+    compressors: tuple = ()
+    # -1 disables the staleness bound for secondary reads (minimum is 90)
+    max_staleness_seconds: int = -1
+    op_classes: dict = field(default_factory=lambda: dict(DEFAULT_OP_CLASSES))
+
+    @classmethod
+    def from_env(cls, env=os.environ):
+        uri = env.get("MONGO_URI")
+        if not uri:
+            raise ValueError("MONGO_URI environment variable is not set!")
+        op_classes = {}
+        for name, (read_pref, read_concern) in DEFAULT_OP_CLASSES.items():
+            op_classes[name] = (
+                env.get(f"MONGO_READ_PREFERENCE_{name.upper()}", read_pref),
+                env.get(f"MONGO_READ_CONCERN_{name.upper()}", read_concern) or None,
+            )
+        return cls(
+            uri=uri,
+            db_name=env.get("MONGO_DB_NAME", "marmudb"),
+            app_name=env.get("MONGO_APP_NAME", "marmu-backend"),
+            max_pool_size=_env_int(env, "MONGO_MAX_POOL_SIZE", 50),
+            min_pool_size=_env_int(env, "MONGO_MIN_POOL_SIZE", 0),
+            max_idle_time_ms=_env_int(env, "MONGO_MAX_IDLE_TIME_MS", 300000),
+            wait_queue_timeout_ms=_env_int(env, "MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+            connect_timeout_ms=_env_int(env, "MONGO_CONNECT_TIMEOUT_MS", 5000),
+            socket_timeout_ms=_env_int(env, "MONGO_SOCKET_TIMEOUT_MS", 30000),
+            server_selection_timeout_ms=_env_int(env, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+            compressors=tuple(c.strip() for c in env.get("MONGO_COMPRESSORS", "").split(",") if c.strip()),
+            max_staleness_seconds=_env_int(env, "MONGO_MAX_STALENESS_SECONDS", -1),
+            op_classes=op_classes,
+        )
+
+    def client_kwargs(self):
+        kwargs = {
+            "appname": self.app_name,
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+        }
+        if self.compressors:
+            kwargs["compressors"] = ",".join(self.compressors)
+        return kwargs
+
+    def read_options(self, op_class):
+        """``with_options`` kwargs (read preference / concern) for an operation class."""
+        read_pref, read_concern = self.op_classes.get(op_class) or self.op_classes["default"]
+        pref_cls = READ_PREFERENCES[read_pref]
+        if pref_cls is Primary:
+            preference = Primary()
+        else:
+            preference = pref_cls(max_staleness=self.max_staleness_seconds)
+        return {"read_preference": preference, "read_concern": ReadConcern(read_concern)}
+
+
+settings = ConnectionSettings.from_env()
+
+# Listeners feed the per-request DB call counts and pool gauges in backend.metrics
+client = MongoClient(settings.uri, event_listeners=[command_listener, pool_listener], **settings.client_kwargs())
+db = client.get_database(settings.db_name, **settings.read_options("default"))
+
+_dbs = {"default": db}
+
+def get_db(op_class: str = "default"):
+    """
+    The application database, configured for ``op_class`` ("default",
+    "booking" or "analytics"); unknown classes fall back to "default".
+    """
+    handle = _dbs.get(op_class)
+    if handle is None:
+        if op_class not in settings.op_classes:
+            return db
+        handle = _dbs[op_class] = db.with_options(**settings.read_options(op_class))
+    return handle
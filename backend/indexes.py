@@ -0,0 +1,165 @@
+# /indexes.py
+"""
+Declarative index registry for every collection the routes query.
+
+Indexes are applied idempotently at startup via ``ensure_indexes``; the
+query shapes they are meant to serve are checked by ``backend.query_plans``.
+"""
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from backend.utils.profiles import backfill_account_fullnames
+
+# ---------------- REGISTRY ---------------- #
+# collection name -> list of IndexModel. Every index is named explicitly so
+# re-running the bootstrap is a no-op and conflicts are easy to spot.
+INDEXES = {
+    "appointments": [
+        # At most one active (non-cancelled) booking per artist/day/time.
+        # ``slot_active`` is set on insert and unset on cancellation.
+        IndexModel(
+            [("artist_id", ASCENDING), ("appointment_date", ASCENDING), ("time", ASCENDING)],
+            name="active_slot_unique",
+            unique=True,
+            partialFilterExpression={"slot_active": True},
+        ),
+        # Slot-conflict check and available slots for an artist/day
+        IndexModel(
+            [("artist_id", ASCENDING), ("appointment_date", ASCENDING), ("time", ASCENDING), ("status", ASCENDING)],
+            name="artist_date_time_status",
+        ),
+        # Two-week overbooking rule
+        IndexModel(
+            [("user_id", ASCENDING), ("service", ASCENDING), ("appointment_date", ASCENDING)],
+            name="user_service_date",
+        ),
+        # A client's own appointment history
+        IndexModel(
+            [("user_id", ASCENDING), ("appointment_date", DESCENDING), ("time", DESCENDING)],
+            name="user_date_time",
+        ),
+        # Admin listing: default sort, status filters and artist filter.
+        # Sort indexes end in _id, the keyset pagination tiebreak.
+        IndexModel([("appointment_date", ASCENDING), ("time", ASCENDING), ("_id", ASCENDING)], name="date_time_id"),
+        IndexModel(
+            [("status", ASCENDING), ("appointment_date", ASCENDING), ("time", ASCENDING), ("_id", ASCENDING)],
+            name="status_date_time_id",
+        ),
+        IndexModel(
+            [("artist_name", ASCENDING), ("appointment_date", ASCENDING), ("time", ASCENDING), ("_id", ASCENDING)],
+            name="artist_name_date_time_id",
+        ),
+        IndexModel([("fullname", ASCENDING), ("_id", ASCENDING)], name="fullname_id"),
+        IndexModel([("service", ASCENDING), ("_id", ASCENDING)], name="service_id"),
+        # Admin search: booking codes and ranked text over name/artist/service
+        IndexModel(
+            [("display_id", ASCENDING)],
+            name="display_id_unique",
+            unique=True,
+            partialFilterExpression={"display_id": {"$type": "string"}},
+        ),
+        IndexModel(
+            [("fullname", TEXT), ("artist_name", TEXT), ("service", TEXT)],
+            name="appointment_search",
+            weights={"fullname": 10, "artist_name": 5, "service": 2},
+            default_language="none",
+        ),
+    ],
+    "staff_unavailability": [
+        IndexModel(
+            [("staff_id", ASCENDING), ("unavailable_date", ASCENDING), ("unavailable_time", ASCENDING)],
+            name="staff_date_time",
+        ),
+        IndexModel([("unavailable_date", ASCENDING), ("unavailable_time", ASCENDING)], name="date_time"),
+    ],
+    "tbl_accounts": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # Listing sorts (username / name / role), each ending in the _id tiebreak;
+        # name sorts use the denormalized fullname
+        IndexModel([("username", ASCENDING), ("_id", ASCENDING)], name="username_id"),
+        IndexModel([("role", ASCENDING), ("username", ASCENDING), ("_id", ASCENDING)], name="role_username_id"),
+        IndexModel([("fullname", ASCENDING), ("_id", ASCENDING)], name="fullname_id"),
+        IndexModel([("role", ASCENDING), ("fullname", ASCENDING), ("_id", ASCENDING)], name="role_fullname_id"),
+        IndexModel([("role", ASCENDING), ("_id", ASCENDING)], name="role_id"),
+    ],
+    "clients": [
+        IndexModel([("account_id", ASCENDING)], name="account_id"),
+    ],
+    "tbl_staff": [
+        IndexModel([("account_id", ASCENDING)], name="account_id"),
+        IndexModel([("specialization", ASCENDING), ("fullname", ASCENDING)], name="specialization_fullname"),
+    ],
+    "admins": [
+        IndexModel([("account_id", ASCENDING)], name="account_id"),
+    ],
+    "feedback": [
+        IndexModel([("date_submitted", DESCENDING), ("_id", DESCENDING)], name="date_submitted_id"),
+        IndexModel(
+            [("resolved", ASCENDING), ("date_submitted", DESCENDING), ("_id", DESCENDING)],
+            name="resolved_date_submitted_id",
+        ),
+        IndexModel([("reply", ASCENDING)], name="reply"),
+        IndexModel([("stars", DESCENDING), ("_id", DESCENDING)], name="stars_id"),
+        IndexModel([("resolved", ASCENDING), ("stars", DESCENDING), ("_id", DESCENDING)], name="resolved_stars_id"),
+    ],
+    "email_outbox": [
+        # Worker claim: due pending messages and expired "sending" leases
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease"),
+    ],
+    "otp_codes": [
+        # Expired one-time codes are removed by the TTL monitor
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "staff_day_slots": [
+        # Rebuild scan of the stored days from a date on
+        IndexModel([("date", ASCENDING)], name="date"),
+    ],
+    "rate_limits": [
+        # Idle buckets are dropped once they would have refilled completely
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+# ---------------- BACKFILLS ---------------- #
+def backfill_active_slots(db):
+    """Flag legacy non-cancelled appointments so the slot index covers them."""
+    db.appointments.update_many(
+        {"slot_active": {"$exists": False}, "status": {"$ne": "Cancelled"}},
+        {"$set": {"slot_active": True}},
+    )
+
+
+# Run before index creation so new constraints see existing data
+BACKFILLS = [backfill_active_slots, backfill_account_fullnames]
+
+
+# ---------------- BOOTSTRAP ---------------- #
+def ensure_indexes(db, registry=None):
+    """
+    Create every registered index. Existing indexes with the same spec are
+    left alone by MongoDB; a conflicting or failing index is reported and
+    skipped so one bad collection does not block startup.
+
+    Returns a list of ``(collection, index_name, error)`` for failures.
+    """
+    failures = []
+    if registry is None:
+        for backfill in BACKFILLS:
+            try:
+                backfill(db)
+            except OperationFailure as e:
+                print(f"[INDEX BACKFILL ERROR] {backfill.__name__}: {e}")
+                failures.append((None, backfill.__name__, str(e)))
+    for collection_name, models in (registry or INDEXES).items():
+        collection = db[collection_name]
+        for model in models:
+            name = model.document["name"]
+            try:
+                collection.create_indexes([model])
+            except OperationFailure as e:
+                print(f"[INDEX ERROR] {collection_name}.{name}: {e}")
+                failures.append((collection_name, name, str(e)))
+    return failures
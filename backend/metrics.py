@@ -0,0 +1,283 @@
+# /metrics.py
+"""
+In-process request and MongoDB instrumentation.
+
+``init_app`` times every request into a latency histogram labelled by
+blueprint/endpoint, and serves ``/metrics`` (Prometheus text format, admin
+session or ``METRICS_TOKEN`` bearer) and ``/readyz`` (Mongo ping latency and
+pool stats). ``command_listener`` / ``pool_listener`` are registered on the
+MongoClient in ``backend.db``; commands are counted per request on the
+calling thread, so with ``METRICS_DEBUG_HEADERS=1`` (or app debug) every
+response carries ``X-DB-Calls`` and ``Server-Timing``.
+
+Metrics are per worker process.
+"""
+import hmac
+import os
+import threading
+import time
+
+from pymongo import monitoring
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_DEBUG_HEADERS = os.getenv("METRICS_DEBUG_HEADERS") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_local = threading.local()
+# Set by the first command event; stays False when the client has no
+# command monitoring (e.g. mongomock), in which case X-DB-Calls reads 0
+_commands_observed = False
+
+
+# ---------------- PRIMITIVES ---------------- #
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, label_values=(), value=0):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, seconds):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = _labels(self.labels + ("le",), label_values + (str(bound),))
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                inf = _labels(self.labels + ("le",), label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{inf} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {series[-1]}")
+        return lines
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by endpoint",
+    ("blueprint", "endpoint", "method", "status"),
+)
+REQUEST_DB_CALLS = Histogram(
+    "http_request_db_calls", "Mongo commands issued per request",
+    ("blueprint", "endpoint"), buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "Mongo command latency", ("command", "outcome"),
+)
+POOL_CONNECTIONS = Gauge("mongo_pool_connections", "Open pooled connections", ("address",))
+POOL_CHECKED_OUT = Gauge("mongo_pool_checked_out", "Connections currently checked out", ("address",))
+POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts", ("address", "reason"),
+)
+EMAIL_DELIVERIES = Counter("email_deliveries_total", "Email delivery attempts", ("transport", "outcome"))
+
+REGISTRY = [
+    REQUEST_LATENCY, REQUEST_DB_CALLS, DB_COMMAND_LATENCY,
+    POOL_CONNECTIONS, POOL_CHECKED_OUT, POOL_CHECKOUT_FAILURES, EMAIL_DELIVERIES,
+]
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- PYMONGO LISTENERS ---------------- #
+def command_monitoring_active() -> bool:
+    """Whether any Mongo command has been observed by ``command_listener``."""
+    return _commands_observed
+
+
+class _CommandListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def _record(self, event, outcome):
+        global _commands_observed
+        _commands_observed = True
+        seconds = event.duration_micros / 1e6
+        DB_COMMAND_LATENCY.observe((event.command_name, outcome), seconds)
+        if getattr(_local, "active", False):
+            _local.db_calls += 1
+            _local.db_seconds += seconds
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+
+class _PoolListener(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._open = {}
+        self._checked_out = {}
+        self._lock = threading.Lock()
+
+    def _adjust(self, counts, gauge, address, delta):
+        key = (f"{address[0]}:{address[1]}",)
+        with self._lock:
+            counts[key] = max(counts.get(key, 0) + delta, 0)
+            gauge.set(key, counts[key])
+
+    def connection_created(self, event):
+        self._adjust(self._open, POOL_CONNECTIONS, event.address, 1)
+
+    def connection_closed(self, event):
+        self._adjust(self._open, POOL_CONNECTIONS, event.address, -1)
+
+    def connection_checked_out(self, event):
+        self._adjust(self._checked_out, POOL_CHECKED_OUT, event.address, 1)
+
+    def connection_checked_in(self, event):
+        self._adjust(self._checked_out, POOL_CHECKED_OUT, event.address, -1)
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_FAILURES.inc((f"{event.address[0]}:{event.address[1]}", str(event.reason)))
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._checked_out.pop((f"{event.address[0]}:{event.address[1]}",), None)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def pool_snapshot(self):
+        with self._lock:
+            return {
+                key[0]: {"open": self._open.get(key, 0), "checked_out": self._checked_out.get(key, 0)}
+                for key in set(self._open) | set(self._checked_out)
+            }
+
+
+command_listener = _CommandListener()
+pool_listener = _PoolListener()
+
+
+# ---------------- FLASK WIRING ---------------- #
+def _metrics_allowed(request, session):
+    if (session.get("role") or "").lower() == "admin":
+        return True
+    auth = request.headers.get("Authorization", "")
+    return bool(METRICS_TOKEN) and hmac.compare_digest(auth, f"Bearer {METRICS_TOKEN}")
+
+
+def init_app(app, get_db):
+    from flask import Response, g, jsonify, request, session
+
+    debug_headers = METRICS_DEBUG_HEADERS or app.debug
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        _local.active = True
+        _local.db_calls = 0
+        _local.db_seconds = 0.0
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+        blueprint = request.blueprint or ""
+        REQUEST_LATENCY.observe((blueprint, endpoint, request.method, str(response.status_code)), elapsed)
+        REQUEST_DB_CALLS.observe((blueprint, endpoint), _local.db_calls)
+        if debug_headers:
+            response.headers["X-DB-Calls"] = str(_local.db_calls)
+            response.headers["Server-Timing"] = (
+                f'db;dur={_local.db_seconds * 1000:.1f};desc="{_local.db_calls} calls", '
+                f"total;dur={elapsed * 1000:.1f}"
+            )
+        return response
+
+    @app.teardown_request
+    def _stop_counting(exc):
+        _local.active = False
+
+    @app.route("/metrics")
+    def metrics():
+        if not _metrics_allowed(request, session):
+            return jsonify({"error": "Forbidden"}), 403
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/readyz")
+    def readyz():
+        db = get_db()
+        try:
+            start = time.perf_counter()
+            db.command("ping")
+            ping_ms = round((time.perf_counter() - start) * 1000, 2)
+        except Exception as e:
+            print(f"[READYZ ERROR] {e}")
+            return jsonify({"status": "unavailable", "error": str(e)}), 503
+        return jsonify({
+            "status": "ok",
+            "mongo": {"ping_ms": ping_ms, "pools": pool_listener.pool_snapshot()},
+        }), 200
@@ -0,0 +1,232 @@
+# /query_plans.py
+"""
+Query-plan checker for the query shapes used in ``backend/routes``.
+
+Runs ``explain()`` on each registered shape and fails if the winning plan
+contains a COLLSCAN. Usage::
+
+    python -m backend.query_plans            # check only
+    python -m backend.query_plans --apply    # ensure indexes first
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from backend.db import get_db
+from backend.indexes import ensure_indexes
+
+_OID = ObjectId()
+_DATE = datetime.now().strftime("%Y-%m-%d")
+_TWO_WEEKS_AGO = (datetime.now() - timedelta(days=14)).strftime("%Y-%m-%d")
+
+
+def _shape(name, collection, filter=None, sort=None, pipeline=None, allow_collscan=None):
+    """
+    A query shape: either a find/count (``filter`` + optional ``sort``) or an
+    aggregation (``pipeline``). ``allow_collscan`` is a reason string for
+    shapes that are expected to scan, e.g. whole-collection aggregations.
+    """
+    return {
+        "name": name,
+        "collection": collection,
+        "filter": filter if filter is not None else {},
+        "sort": sort,
+        "pipeline": pipeline,
+        "allow_collscan": allow_collscan,
+    }
+
+
+# ---------------- QUERY SHAPES ---------------- #
+QUERY_SHAPES = [
+    # routes/auth.py
+    _shape("auth.login", "tbl_accounts", {"$or": [{"username": "u"}, {"email": "u@gmail.com"}]}),
+    _shape("auth.account_by_username", "tbl_accounts", {"username": "u"}),
+    _shape("auth.account_by_email", "tbl_accounts", {"email": "u@gmail.com"}),
+    _shape("auth.client_profile", "clients", {"account_id": _OID}),
+    _shape("auth.staff_profile", "tbl_staff", {"account_id": _OID}),
+    _shape("auth.admin_profile", "admins", {"account_id": _OID}),
+
+    # utils/identity.py (bookings, feedback)
+    _shape("identity.account_with_client", "tbl_accounts", pipeline=[
+        {"$match": {"username": "u"}},
+        {"$limit": 1},
+        {"$lookup": {"from": "clients", "localField": "_id", "foreignField": "account_id", "as": "client"}},
+    ]),
+
+    # routes/bookings.py
+    _shape("bookings.two_week_rule", "appointments", {
+        "user_id": _OID, "service": "Haircut",
+        "appointment_date": {"$gte": _TWO_WEEKS_AGO}, "status": {"$ne": "Cancelled"},
+    }),
+    _shape("bookings.user_appointments", "appointments", {"user_id": _OID},
+           sort=[("appointment_date", -1), ("time", -1)]),
+    _shape("bookings.booked_times", "appointments", {
+        "appointment_date": _DATE, "artist_id": _OID, "status": {"$ne": "Cancelled"},
+    }),
+    _shape("bookings.staff_unavailability", "staff_unavailability",
+           {"staff_id": _OID, "unavailable_date": _DATE}),
+    _shape("bookings.availability_unavailability", "staff_unavailability",
+           {"staff_id": {"$in": [_OID]}, "unavailable_date": {"$in": [_DATE]}, "is_booked": {"$ne": False}}),
+    _shape("bookings.availability_booked", "appointments", {
+        "artist_id": {"$in": [_OID]}, "appointment_date": {"$in": [_DATE]}, "status": {"$ne": "Cancelled"},
+    }),
+    _shape("bookings.mark_slot", "staff_unavailability",
+           {"staff_id": _OID, "unavailable_date": _DATE, "unavailable_time": "9:00 AM"}),
+
+    # routes/staff.py
+    _shape("staff.by_service", "tbl_staff", {"specialization": "Barber"}),
+    _shape("staff.manual_unavailability", "staff_unavailability", {
+        "staff_id": _OID, "unavailable_date": {"$in": [_DATE]}, "is_booked": {"$exists": False},
+    }),
+    _shape("staff.unavailability_list", "staff_unavailability", pipeline=[
+        {"$lookup": {"from": "tbl_staff", "localField": "staff_id", "foreignField": "_id", "as": "staff_info"}},
+        {"$unwind": "$staff_info"},
+        {"$sort": {"unavailable_date": 1, "unavailable_time": 1}},
+    ], allow_collscan="lists every unavailability row"),
+
+    # routes/admin.py
+    _shape("admin.dashboard_stats", "stats", {"_id": "dashboard"}),
+    _shape("admin.rollup_range", "appointment_rollups", {"_id": {"$gte": "2025-01-01", "$lte": "2025-01-31"}}),
+    _shape("admin.users_by_role", "tbl_accounts", {"role": "User"}, sort=[("username", 1), ("_id", 1)]),
+    _shape("admin.users_by_username", "tbl_accounts", {}, sort=[("username", 1), ("_id", 1)]),
+    _shape("admin.users_by_name", "tbl_accounts", {}, sort=[("fullname", 1), ("_id", 1)]),
+    _shape("admin.users_by_role_name", "tbl_accounts", {"role": "User"}, sort=[("fullname", 1), ("_id", 1)]),
+    _shape("admin.appointments_by_date", "appointments", {}, sort=[("appointment_date", 1), ("time", 1), ("_id", 1)]),
+    _shape("admin.appointments_by_status", "appointments", {"status": "Pending"},
+           sort=[("appointment_date", 1), ("time", 1), ("_id", 1)]),
+    _shape("admin.appointments_history", "appointments",
+           {"status": {"$in": ["Completed", "Abandoned", "Cancelled"]}},
+           sort=[("appointment_date", 1), ("time", 1), ("_id", 1)]),
+    _shape("admin.appointments_by_artist", "appointments", {"artist_name": "A"},
+           sort=[("appointment_date", 1), ("time", 1), ("_id", 1)]),
+    _shape("admin.appointments_by_name", "appointments", {}, sort=[("fullname", 1), ("_id", 1)]),
+    _shape("admin.appointments_by_service", "appointments", {}, sort=[("service", 1), ("_id", 1)]),
+    _shape("admin.appointments_text_search", "appointments", {"$text": {"$search": "maria"}}),
+    _shape("admin.appointments_display_id", "appointments", {"display_id": "APT-000123"}),
+    _shape("admin.appointments_display_id_prefix", "appointments", {"display_id": {"$regex": "^APT-0001"}}),
+    _shape("admin.feedback_by_date", "feedback", {}, sort=[("date_submitted", -1), ("_id", -1)]),
+    _shape("admin.feedback_by_rating", "feedback", {}, sort=[("stars", -1), ("_id", -1)]),
+    _shape("admin.appointments_keyset", "appointments", {"$or": [
+        {"appointment_date": {"$gt": _DATE}},
+        {"appointment_date": _DATE, "time": {"$gt": "9:00 AM"}},
+        {"appointment_date": _DATE, "time": "9:00 AM", "_id": {"$gt": _OID}},
+    ]}, sort=[("appointment_date", 1), ("time", 1), ("_id", 1)]),
+    _shape("admin.feedback_by_resolved", "feedback", {"resolved": False}, sort=[("date_submitted", -1), ("_id", -1)]),
+    _shape("admin.staff_by_role", "tbl_staff", {"specialization": "TattooArtist"}),
+
+    # routes/feedback.py
+    _shape("feedback.public_list", "feedback", {}, sort=[("date_submitted", -1)]),
+    _shape("feedback.public_page", "feedback", {"$or": [
+        {"date_submitted": {"$lt": datetime.now()}},
+        {"date_submitted": datetime.now(), "_id": {"$lt": _OID}},
+    ]}, sort=[("date_submitted", -1), ("_id", -1)]),
+
+    # utils/stats.py (periodic reconcile)
+    _shape("stats.unreplied_feedback", "feedback", {"reply": {"$in": [None, ""]}}),
+    _shape("stats.completed_by_artist", "appointments", pipeline=[
+        {"$match": {"status": {"$in": ["Completed", "Done"]}}},
+        {"$group": {"_id": "$artist_id", "jobs": {"$sum": 1}}},
+    ]),
+    _shape("stats.appointments_by_status", "appointments", pipeline=[
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ], allow_collscan="background reconcile over the whole collection"),
+    _shape("stats.feedback_ratings", "feedback", pipeline=[
+        {"$group": {"_id": "$stars", "count": {"$sum": 1}}},
+    ], allow_collscan="background reconcile over the whole collection"),
+
+    # utils/day_slots.py
+    _shape("day_slots.rebuild_unavailability", "staff_unavailability",
+           {"unavailable_date": {"$gte": _DATE}, "is_booked": {"$exists": False}}),
+    _shape("day_slots.rebuild_bookings", "appointments",
+           {"slot_active": True, "appointment_date": {"$gte": _DATE}},
+           allow_collscan="one-off mask rebuild (first boot / CLI)"),
+    _shape("day_slots.rebuild_versions", "staff_day_slots", {"date": {"$gte": _DATE}}),
+
+    # utils/email_outbox.py
+    _shape("outbox.claim", "email_outbox", {"$or": [
+        {"status": "pending", "next_attempt_at": {"$lte": datetime.utcnow()}},
+        {"status": "sending", "lease_expires_at": {"$lte": datetime.utcnow()}},
+    ]}, sort=[("next_attempt_at", 1)]),
+]
+
+
+# ---------------- EXPLAIN ---------------- #
+def _explain(db, shape):
+    collection = db[shape["collection"]]
+    if shape["pipeline"] is not None:
+        return db.command("aggregate", shape["collection"], pipeline=shape["pipeline"], explain=True)
+    cursor = collection.find(shape["filter"])
+    if shape["sort"]:
+        cursor = cursor.sort(shape["sort"])
+    return cursor.explain()
+
+
+def _winning_plans(node):
+    """Yield every ``winningPlan`` found anywhere in an explain document."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "winningPlan":
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _winning_plans(item)
+
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+def check_query_plans(db, shapes=None):
+    """
+    Explain every shape and return a list of ``(name, stages, problem)`` rows.
+    ``problem`` is None when the plan is acceptable.
+    """
+    results = []
+    for shape in shapes or QUERY_SHAPES:
+        try:
+            explain = _explain(db, shape)
+        except Exception as e:
+            results.append((shape["name"], [], f"explain failed: {e}"))
+            continue
+        stages = sorted({s for plan in _winning_plans(explain) for s in _stages(plan)})
+        problem = None
+        if "COLLSCAN" in stages and not shape["allow_collscan"]:
+            problem = "COLLSCAN"
+        results.append((shape["name"], stages, problem))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if any route query shape falls back to COLLSCAN.")
+    parser.add_argument("--apply", action="store_true", help="ensure registered indexes before checking")
+    args = parser.parse_args(argv)
+
+    db = get_db()
+    if args.apply:
+        ensure_indexes(db)
+
+    failed = 0
+    for name, stages, problem in check_query_plans(db):
+        status = "FAIL" if problem else "ok"
+        print(f"{status:4} {name:40} {','.join(stages) or '-'}" + (f"  <- {problem}" if problem else ""))
+        failed += bool(problem)
+
+    if failed:
+        print(f"{failed} query shape(s) without an index-backed plan")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
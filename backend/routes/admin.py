@@ -1,39 +1,70 @@
 # /routes/admin.py
 from flask import Blueprint, request, jsonify
 from backend.db import get_db  # Assume this returns a PyMongo database instance
-from backend.utils.security import hash_password
-from backend.utils.email_utils import send_appointment_status_email, send_feedback_reply_email
+from backend.utils.security import hash_password, PasswordHasherBusy, RETRY_AFTER_SECONDS
+from backend.utils.email_utils import (
+    send_appointment_status_email,
+    send_appointment_status_emails,
+    send_feedback_reply_email,
+)
+from backend.utils.availability import invalidate_slots, invalidate_all
+from backend.utils.day_slots import record_slot_status_changes
+from backend.utils.schedule import (
+    DEFAULT_OPEN_HOURS,
+    SHOP_ID,
+    get_schedule,
+    invalidate_schedule,
+    validate_dates,
+    validate_hours,
+    validate_weekday_hours,
+)
+from backend.utils.stats import (
+    get_dashboard_stats,
+    top_artists,
+    record_client_created,
+    record_status_change,
+    record_status_changes,
+    record_feedback_replied,
+)
+from backend.utils.profiles import resolve_fullnames
+from backend.utils.pagination import paginate, count_total, InvalidCursor, TOTAL_MODES
+from backend.utils.search import appointment_search_filter
+from backend.utils.feedback_feed import invalidate_feedback_feed
+from backend.utils.rollups import (
+    summarize,
+    previous_range,
+    record_rollup_status_change,
+    record_rollup_status_changes,
+)
 from bson import ObjectId
-from datetime import datetime
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from datetime import datetime, timedelta
 
 admin_bp = Blueprint("admin", __name__)
 
+
+def _total_mode():
+    """``?total=exact|estimate|none`` for the paginated lists (default exact)."""
+    mode = (request.args.get("total") or "exact").lower()
+    return mode if mode in TOTAL_MODES else "exact"
+
+
 # -----------------------------
 # Route 1: Admin Dashboard Data
 # -----------------------------
 @admin_bp.route("/dashboard-data", methods=["GET"])
 def admin_dashboard_data():
-    db = get_db()
-    
-    total_clients = db.clients.count_documents({})
-    pending = db.appointments.count_documents({"status": "Pending"})
-    new_feedback = db.feedback.count_documents({"reply": {"$in": [None, ""]}})
-    
-    # Artist performance (top 10)
-    pipeline = [
-        {"$match": {"status": {"$in": ["Completed", "Done"]}}},
-        {"$lookup": {"from": "tbl_staff", "localField": "artist_id", "foreignField": "_id", "as": "artist"}},
-        {"$unwind": {"path": "$artist", "preserveNullAndEmptyArrays": True}},
-        {"$group": {"_id": {"$ifNull": ["$artist.fullname", "Unassigned"]}, "total_jobs": {"$sum": 1}}},
-        {"$sort": {"total_jobs": -1}},
-        {"$limit": 10}
-    ]
-    artist_performance = [{"artist_name": a["_id"], "total_jobs": a["total_jobs"]} for a in db.appointments.aggregate(pipeline)]
+    db = get_db("analytics")
+    stats = get_dashboard_stats(db)
     
     return jsonify({
-        "total_clients": total_clients,
-        "notifications": {"pending_appointments": pending, "new_feedback": new_feedback},
-        "artist_performance": artist_performance
+        "total_clients": stats.get("clients_total", 0),
+        "notifications": {
+            "pending_appointments": stats.get("appointments_by_status", {}).get("Pending", 0),
+            "new_feedback": stats.get("feedback_unreplied", 0),
+        },
+        "artist_performance": top_artists(stats, 10)
     })
 
 # -----------------------------
@@ -41,27 +72,22 @@ def admin_dashboard_data():
 # -----------------------------
 @admin_bp.route("/appointments/summary", methods=["GET"])
 def appointments_summary():
-    db = get_db()
+    db = get_db("analytics")
+    stats = get_dashboard_stats(db)
+    by_status = stats.get("appointments_by_status", {})
     
-    pipeline = [
-        {"$group": {
-            "_id": None,
-            "totalAppointments": {"$sum": 1},
-            "pendingAppointments": {"$sum": {"$cond": [{"$eq": ["$status", "Pending"]}, 1, 0]}},
-            "approvedAppointments": {"$sum": {"$cond": [{"$eq": ["$status", "Approved"]}, 1, 0]}}
-        }}
-    ]
-    summary = list(db.appointments.aggregate(pipeline))
-    summary = summary[0] if summary else {"totalAppointments": 0, "pendingAppointments": 0, "approvedAppointments": 0}
-    
-    return jsonify(summary)
+    return jsonify({
+        "totalAppointments": stats.get("appointments_total", 0),
+        "pendingAppointments": by_status.get("Pending", 0),
+        "approvedAppointments": by_status.get("Approved", 0)
+    })
 
 # -----------------------------
 # Route 3: Monthly Report
 # -----------------------------
 @admin_bp.route("/appointments/monthly-report", methods=["GET"])
 def monthly_report():
-    db = get_db()
+    db = get_db("analytics")
     now = datetime.now()
 
     start_of_month = datetime(now.year, now.month, 1)
@@ -69,49 +95,44 @@ def monthly_report():
         next_month = datetime(now.year + 1, 1, 1)
     else:
         next_month = datetime(now.year, now.month + 1, 1)
+    end_of_month = next_month - timedelta(days=1)
 
-    month_prefix = start_of_month.strftime("%Y-%m")
-
-    pipeline = [
-        {
-            "$match": {
-                "$or": [
-                    {
-                        "$expr": {
-                            "$and": [
-                                {"$eq": [{"$type": "$appointment_date"}, "date"]},
-                                {"$gte": ["$appointment_date", start_of_month]},
-                                {"$lt": ["$appointment_date", next_month]},
-                            ]
-                        }
-                    },
-                    {
-                        "$expr": {
-                            "$and": [
-                                {"$eq": [{"$type": "$appointment_date"}, "string"]},
-                                {
-                                    "$regexMatch": {
-                                        "input": "$appointment_date",
-                                        "regex": f"^{month_prefix}"
-                                    }
-                                },
-                            ]
-                        }
-                    },
-                ]
-            }
-        },
-        {"$group": {"_id": {"$toLower": {"$ifNull": ["$service", ""]}}, "count": {"$sum": 1}}},
-    ]
-    rows = list(db.appointments.aggregate(pipeline))
+    summary = summarize(db, start_of_month.strftime("%Y-%m-%d"), end_of_month.strftime("%Y-%m-%d"), "service")
     
     result = {"haircut": 0, "tattoo": 0}
-    for row in rows:
-        key = (row["_id"] or "").strip().lower()
+    for key, count in summary["groups"].items():
         if key in result:
-            result[key] = row["count"]
+            result[key] = count
     return jsonify(result)
 
+# -----------------------------
+# Route 3b: Appointment Reports (any range)
+# -----------------------------
+@admin_bp.route("/reports/appointments", methods=["GET"])
+def appointments_report():
+    db = get_db("analytics")
+    group_by = request.args.get("group_by", "service")
+    compare = request.args.get("compare")
+    if group_by not in ("service", "artist", "status", "day", "month"):
+        return jsonify({"error": "group_by must be one of service, artist, status, day, month"}), 400
+    if compare not in (None, "", "previous", "yoy"):
+        return jsonify({"error": "compare must be previous or yoy"}), 400
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    start = request.args.get("start") or today[:8] + "01"
+    end = request.args.get("end") or today
+    try:
+        if datetime.strptime(end, "%Y-%m-%d") < datetime.strptime(start, "%Y-%m-%d"):
+            return jsonify({"error": "end is before start"}), 400
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    report = summarize(db, start, end, group_by)
+    if compare:
+        prev_start, prev_end = previous_range(start, end, compare)
+        report["compare"] = summarize(db, prev_start, prev_end, group_by)
+    return jsonify(report)
+
 # -----------------------------
 # Route 4: Get Users
 # -----------------------------
@@ -137,32 +158,27 @@ def get_users():
     }
     sort_order = sort_map.get(sort, [("fullname", 1)])
     
-    total = db.tbl_accounts.count_documents(query)
-    users = list(db.tbl_accounts.find(query).sort(sort_order).skip((page-1)*per_page).limit(per_page))
-    
-    # Fill fullname from role-specific collection
-    data = []
-    for u in users:
-        fullname = u.get("fullname")
-        if not fullname:
-            if u["role"].lower() == "user":
-                client = db.clients.find_one({"account_id": u["_id"]})
-                fullname = client.get("fullname") if client else ""
-            elif u["role"].lower() in ["barber", "tattooartist"]:
-                staff = db.tbl_staff.find_one({"account_id": u["_id"]})
-                fullname = staff.get("fullname") if staff else ""
-            elif u["role"].lower() == "admin":
-                admin = db.admins.find_one({"account_id": u["_id"]})
-                fullname = admin.get("fullname") if admin else ""
-        data.append({
-            "id": str(u["_id"]),
-            "username": u.get("username"),
-            "email": u.get("email"),
-            "role": u.get("role"),
-            "fullname": fullname
-        })
-    
-    return jsonify({"data": data, "total": total, "page": page, "per_page": per_page})
+    try:
+        users, meta = paginate(
+            db.tbl_accounts, query, sort_order, per_page,
+            cursor=request.args.get("cursor"), page=page,
+            projection={"username": 1, "email": 1, "role": 1, "fullname": 1},
+            total_mode=_total_mode(),
+        )
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Accounts written before fullname was denormalized: one $in per profile collection
+    names = resolve_fullnames(db, users)
+    data = [{
+        "id": str(u["_id"]),
+        "username": u.get("username"),
+        "email": u.get("email"),
+        "role": u.get("role"),
+        "fullname": u.get("fullname") or names.get(u["_id"], "")
+    } for u in users]
+    
+    return jsonify({"data": data, "page": page, "per_page": per_page, **meta})
 
 # -----------------------------
 # Route 5: Add User
@@ -179,17 +195,23 @@ def add_user():
     if not all([fullname, username, email, password, role]):
         return jsonify({"error": "Missing required fields"}), 400
     
+    try:
+        hashed_password = hash_password(password)
+    except PasswordHasherBusy:
+        return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": str(RETRY_AFTER_SECONDS)}
+
     db = get_db()
-    hashed_password = hash_password(password)
     account_id = db.tbl_accounts.insert_one({
         "username": username,
         "email": email,
         "hash_pass": hashed_password,
-        "role": role
+        "role": role,
+        "fullname": fullname
     }).inserted_id
     
     if role.lower() == "client":
         db.clients.insert_one({"account_id": account_id, "fullname": fullname})
+        record_client_created(db)
     elif role.lower() in ["barber", "tattooartist"]:
         db.tbl_staff.insert_one({"account_id": account_id, "fullname": fullname, "specialization": role})
     elif role.lower() == "admin":
@@ -220,13 +242,10 @@ def get_appointments():
     elif exclude_history == '1':
         query["status"] = {"$nin": ["Completed", "Abandoned", "Cancelled"]}
     
+    ranked = False
     if q:
-        query["$or"] = [
-            {"fullname": {"$regex": q, "$options": "i"}},
-            {"service": {"$regex": q, "$options": "i"}},
-            {"artist_name": {"$regex": q, "$options": "i"}},
-            {"_id": {"$regex": q, "$options": "i"}}
-        ]
+        search_filter, ranked = appointment_search_filter(q)
+        query.update(search_filter)
     if artist:
         query["artist_name"] = artist
     
@@ -239,45 +258,81 @@ def get_appointments():
     }
     sort_order = sort_map.get(sort, [("appointment_date", 1)])
     
-    total = db.appointments.count_documents(query)
-    appointments = list(db.appointments.find(query).sort(sort_order).skip((page-1)*per_page).limit(per_page))
+    if ranked and 'sort' not in request.args:
+        # Text search without an explicit sort: best matches first
+        score = {"$meta": "textScore"}
+        appointments = list(
+            db.appointments.find(query, {"score": score})
+            .sort([("score", score), ("_id", 1)]).skip((page-1)*per_page).limit(per_page)
+        )
+        total, is_estimate = count_total(db.appointments, query, _total_mode())
+        meta = {"total": total, "total_is_estimate": is_estimate, "next_cursor": None}
+    else:
+        try:
+            appointments, meta = paginate(
+                db.appointments, query, sort_order, per_page,
+                cursor=request.args.get("cursor"), page=page, total_mode=_total_mode(),
+            )
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
 
-    # Normalize ObjectIds and datetimes for JSON
+    # ObjectIds/datetimes are handled by the app JSON provider
     for a in appointments:
-        try:
-            a["id"] = str(a["_id"])  # explicit id field
-            a["_id"] = str(a["_id"])  # replace ObjectId with string
-        except Exception:
-            pass
+        a["id"] = a["_id"]  # explicit id field
         # Add a separate display_id for tables
-        a["display_id"] = a.get("display_id") or (a.get("id")[-6:] if a.get("id") else None)
-        if isinstance(a.get("user_id"), ObjectId):
-            a["user_id"] = str(a["user_id"])
-        if isinstance(a.get("artist_id"), ObjectId):
-            a["artist_id"] = str(a["artist_id"])
-        if isinstance(a.get("created_at"), datetime):
-            a["created_at"] = a["created_at"].strftime("%Y-%m-%d %H:%M:%S")
+        a["display_id"] = a.get("display_id") or str(a["_id"])[-6:]
 
-    return jsonify({"data": appointments, "total": total, "page": page, "per_page": per_page})
+    return jsonify({"data": appointments, "page": page, "per_page": per_page, **meta})
 
 # -----------------------------
 # Route 7: Update Appointment
 # -----------------------------
+NOTIFY_STATUSES = ("approved", "denied")
+APPOINTMENT_STATUSES = ("Pending", "Approved", "Denied", "Completed", "Done", "Cancelled", "Abandoned")
+BULK_STATUS_MAX_ITEMS = 500
+
+
+def _canonical_status(value):
+    """The stored spelling of a status (matched case-insensitively), or None if unknown."""
+    if not isinstance(value, str):
+        return None
+    return {s.lower(): s for s in APPOINTMENT_STATUSES}.get(value.strip().lower())
+
+
+def _status_update(new_status):
+    # Cancelled bookings release their slot in the unique slot index
+    if new_status == "Cancelled":
+        return {"$set": {"status": new_status}, "$unset": {"slot_active": ""}}
+    return {"$set": {"status": new_status, "slot_active": True}}
+
+
 @admin_bp.route("/appointments/<appointment_id>", methods=["PUT"])
 def update_appointment(appointment_id):
     data = request.get_json(silent=True) or {}
     new_status = data.get("status")
     if not new_status:
         return jsonify({"error": "Missing status field"}), 400
+    new_status = _canonical_status(new_status)
+    if not new_status:
+        return jsonify({"error": f"Invalid status; must be one of {', '.join(APPOINTMENT_STATUSES)}"}), 400
     
     db = get_db()
-    appointment = db.appointments.find_one_and_update(
-        {"_id": ObjectId(appointment_id)},
-        {"$set": {"status": new_status}},
-        return_document=True
-    )
-    
-    if appointment and new_status.lower() in ("approved", "denied"):
+    try:
+        appointment = db.appointments.find_one_and_update(
+            {"_id": ObjectId(appointment_id)},
+            _status_update(new_status),
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        return jsonify({"error": "This time slot is already booked"}), 409
+    if appointment:
+        record_status_change(db, appointment, new_status)
+        record_rollup_status_change(db, appointment, new_status)
+        record_slot_status_changes(db, [(appointment, new_status)])
+    if appointment and appointment.get("artist_id"):
+        invalidate_slots(appointment["artist_id"], appointment.get("appointment_date"))
+    
+    if appointment and new_status.lower() in NOTIFY_STATUSES:
         client = db.clients.find_one({"_id": appointment["user_id"]})
         account = db.tbl_accounts.find_one({"_id": client["account_id"]}) if client else None
         if account:
@@ -293,6 +348,143 @@ def update_appointment(appointment_id):
     
     return jsonify({"message": f"Appointment #{appointment_id} updated to {new_status}"}), 200
 
+# -----------------------------
+# Route 7b: Bulk Update Appointment Status
+# -----------------------------
+def _notify_status_changes(db, changed):
+    """Queue approval/denial emails for ``(before, new_status)`` pairs in one batch."""
+    changed = [(a, s) for a, s in changed if s.lower() in NOTIFY_STATUSES and a.get("user_id")]
+    if not changed:
+        return
+    clients = {
+        c["_id"]: c for c in db.clients.find(
+            {"_id": {"$in": list({a["user_id"] for a, _ in changed})}}, {"account_id": 1, "fullname": 1}
+        )
+    }
+    emails = {
+        acc["_id"]: acc.get("email") for acc in db.tbl_accounts.find(
+            {"_id": {"$in": list({c["account_id"] for c in clients.values() if c.get("account_id")})}}, {"email": 1}
+        )
+    }
+    notifications = []
+    for appointment, new_status in changed:
+        client = clients.get(appointment["user_id"])
+        email = emails.get(client.get("account_id")) if client else None
+        if email:
+            notifications.append({
+                "email": email,
+                "fullname": client.get("fullname", ""),
+                "status": new_status,
+                "artist_name": appointment.get("artist_name"),
+                "service": appointment.get("service"),
+                "appointment_date": appointment.get("appointment_date"),
+                "time": appointment.get("time"),
+            })
+    send_appointment_status_emails(notifications)
+
+
+@admin_bp.route("/appointments/bulk-status", methods=["POST"])
+def bulk_update_appointment_status():
+    """
+    Body: ``{"updates": [{"id": ..., "status": ...}, ...]}`` or
+    ``{"ids": [...], "status": ...}``. Returns a result per item, in order;
+    if any item is malformed nothing is written and the response is a 400.
+    """
+    data = request.get_json(silent=True) or {}
+    updates = data.get("updates")
+    if updates is None and data.get("ids") is not None:
+        updates = [{"id": i, "status": data.get("status")} for i in data.get("ids") or []]
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"error": "updates must be a non-empty list"}), 400
+    if len(updates) > BULK_STATUS_MAX_ITEMS:
+        return jsonify({"error": f"At most {BULK_STATUS_MAX_ITEMS} updates per request"}), 400
+
+    results = []
+    pending = {}  # ObjectId -> result entry
+    for item in updates:
+        item = item if isinstance(item, dict) else {}
+        appointment_id = str(item.get("id") or "")
+        new_status = item.get("status")
+        result = {"id": appointment_id, "status": new_status, "ok": False}
+        results.append(result)
+        if not new_status:
+            result.update(error="Missing status field", code=400)
+        elif not _canonical_status(new_status):
+            result.update(error=f"Invalid status; must be one of {', '.join(APPOINTMENT_STATUSES)}", code=400)
+        elif not ObjectId.is_valid(appointment_id):
+            result.update(error="Invalid appointment id", code=400)
+        elif ObjectId(appointment_id) in pending:
+            result.update(error="Duplicate appointment id", code=400)
+        else:
+            result["status"] = _canonical_status(new_status)
+            pending[ObjectId(appointment_id)] = result
+    if any(r.get("code") == 400 for r in results):
+        # Reject the whole batch before touching the database
+        return jsonify({"error": "Invalid updates", "results": results}), 400
+
+    db = get_db()
+    before = {a["_id"]: a for a in db.appointments.find({"_id": {"$in": list(pending)}})}
+
+    ops, op_ids = [], []
+    for _id, result in pending.items():
+        appointment = before.get(_id)
+        if not appointment:
+            result.update(error="Appointment not found", code=404)
+        elif appointment.get("status") == result["status"]:
+            result.update(ok=True, unchanged=True)
+        else:
+            # Filtering on the old status keeps concurrent changes from being overwritten
+            ops.append(UpdateOne({"_id": _id, "status": appointment.get("status")}, _status_update(result["status"])))
+            op_ids.append(_id)
+
+    failed = set()
+    matched = 0
+    if ops:
+        try:
+            matched = db.appointments.bulk_write(ops, ordered=False).matched_count
+        except BulkWriteError as e:
+            matched = e.details.get("nMatched", 0)
+            for error in e.details.get("writeErrors", []):
+                _id = op_ids[error["index"]]
+                failed.add(_id)
+                if error.get("code") == 11000:
+                    pending[_id].update(error="This time slot is already booked", code=409)
+                else:
+                    pending[_id].update(error=error.get("errmsg", "Update failed"), code=500)
+
+    applied = [_id for _id in op_ids if _id not in failed]
+    if matched < len(applied):
+        # Some filters missed: the status changed since it was read
+        current = {
+            a["_id"]: a.get("status")
+            for a in db.appointments.find({"_id": {"$in": applied}}, {"status": 1})
+        }
+        for _id in list(applied):
+            if current.get(_id) != pending[_id]["status"]:
+                pending[_id].update(error="Appointment status changed concurrently", code=409)
+                applied.remove(_id)
+
+    changed = [(before[_id], pending[_id]["status"]) for _id in applied]
+    for _id in applied:
+        pending[_id]["ok"] = True
+    if changed:
+        record_status_changes(db, changed)
+        record_rollup_status_changes(db, changed)
+        record_slot_status_changes(db, changed)
+        for artist_id, date in {(a.get("artist_id"), a.get("appointment_date")) for a, _ in changed}:
+            if artist_id:
+                invalidate_slots(artist_id, date)
+        try:
+            _notify_status_changes(db, changed)
+        except Exception as e:
+            print(f"[BULK STATUS EMAIL ERROR] {e}")
+
+    return jsonify({
+        "results": results,
+        "updated": len(changed),
+        "failed": sum(1 for r in results if not r["ok"]),
+    }), 200
+
 # -----------------------------
 # Route 8: Get Feedback
 # -----------------------------
@@ -319,8 +511,13 @@ def get_feedback_admin():
     }
     sort_order = sort_map.get(sort, [("date_submitted", -1)])
     
-    total = db.feedback.count_documents(query)
-    feedback = list(db.feedback.find(query).sort(sort_order).skip((page-1)*per_page).limit(per_page))
+    try:
+        feedback, meta = paginate(
+            db.feedback, query, sort_order, per_page,
+            cursor=request.args.get("cursor"), page=page, total_mode=_total_mode(),
+        )
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
 
     # Preload account + client names so user column is always populated
     account_ids = list({f["account_id"] for f in feedback if isinstance(f.get("account_id"), ObjectId)})
@@ -352,17 +549,13 @@ def get_feedback_admin():
         f["username"] = username
         f["user_fullname"] = fullname
         f["user"] = fullname or username
-        f["id"] = str(f["_id"]) if f.get("_id") else None
+        f["id"] = f.get("_id")
         f["reply"] = f.get("reply", "")
-        # Make nested types serializable
-        if isinstance(f.get("_id"), ObjectId):
-            f["_id"] = str(f["_id"])  # replace ObjectId
-        if isinstance(f.get("account_id"), ObjectId):
-            f["account_id"] = str(f["account_id"])
+        # Minute precision, as this endpoint has always returned
         if isinstance(f.get("date_submitted"), datetime):
             f["date_submitted"] = f["date_submitted"].strftime("%Y-%m-%d %H:%M")
     
-    return jsonify({"data": feedback, "total": total, "page": page, "per_page": per_page})
+    return jsonify({"data": feedback, "page": page, "per_page": per_page, **meta})
 
 # -----------------------------
 # Route 9: Admin Reply Feedback
@@ -380,11 +573,13 @@ def admin_reply_feedback(feedback_id):
     feedback = db.feedback.find_one_and_update(
         {"_id": ObjectId(feedback_id)},
         {"$set": {"reply": reply, "resolved": True}},
-        return_document=True
+        return_document=ReturnDocument.BEFORE
     )
     
     if not feedback:
         return jsonify({"message": "Feedback not found."}), 404
+    record_feedback_replied(db, feedback)
+    invalidate_feedback_feed()
     
     if send_email:
         client = db.clients.find_one({"account_id": feedback["account_id"]})
@@ -408,6 +603,7 @@ def toggle_feedback_resolved(feedback_id):
     
     if result.matched_count == 0:
         return jsonify({"message": "Feedback not found."}), 404
+    invalidate_feedback_feed()
     
     return jsonify({"message": f"Feedback status updated to resolved={resolved_status}"}), 200
 
@@ -430,3 +626,94 @@ def admin_get_staff():
     cursor = db.tbl_staff.find({"specialization": specialization}, {"_id": 1, "fullname": 1})
     staff_list = [{"id": str(doc.get("_id")), "fullname": doc.get("fullname", "") or ""} for doc in cursor]
     return jsonify(staff_list), 200
+
+# -----------------------------
+# Route 12: Shop Schedule
+# -----------------------------
+def _schedule_payload(schedule):
+    shop = schedule.get("shop") or {}
+    return {
+        "shop": {
+            "open_hours": shop.get("open_hours") or {
+                str(d): list(h) if h else None for d, h in DEFAULT_OPEN_HOURS.items()
+            },
+            "holidays": shop.get("holidays") or [],
+        },
+        "staff": [
+            {
+                "staff_id": staff_id,
+                "open_hours": doc.get("open_hours") or {},
+                "days_off": doc.get("days_off") or [],
+                "dates": doc.get("dates") or {},
+            }
+            for staff_id, doc in sorted((schedule.get("staff") or {}).items())
+        ],
+    }
+
+
+def _schedule_changed():
+    invalidate_schedule()
+    invalidate_all()
+
+
+@admin_bp.route("/schedule", methods=["GET"])
+def get_shop_schedule():
+    return jsonify(_schedule_payload(get_schedule(get_db()))), 200
+
+
+@admin_bp.route("/schedule", methods=["PUT"])
+def update_shop_schedule():
+    """Body: ``open_hours`` ({weekday 0-6: [start, end] | null}) and/or ``holidays``."""
+    data = request.get_json(silent=True) or {}
+    update = {}
+    try:
+        if "open_hours" in data:
+            update["open_hours"] = validate_weekday_hours(data["open_hours"])
+        if "holidays" in data:
+            update["holidays"] = validate_dates(data["holidays"], "holidays")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not update:
+        return jsonify({"error": "Nothing to update"}), 400
+
+    db = get_db()
+    db.schedules.update_one({"_id": SHOP_ID}, {"$set": update}, upsert=True)
+    _schedule_changed()
+    return jsonify(_schedule_payload(get_schedule(db))), 200
+
+
+@admin_bp.route("/schedule/staff/<staff_id>", methods=["PUT"])
+def update_staff_schedule(staff_id):
+    """
+    Per-staff overrides: ``open_hours`` by weekday, ``days_off`` and
+    ``dates`` ({YYYY-MM-DD: [start, end] | null}). Shop holidays still apply.
+    """
+    if not ObjectId.is_valid(staff_id):
+        return jsonify({"error": "Invalid staff_id"}), 400
+    data = request.get_json(silent=True) or {}
+    update = {}
+    try:
+        if "open_hours" in data:
+            update["open_hours"] = validate_weekday_hours(data["open_hours"])
+        if "days_off" in data:
+            update["days_off"] = validate_dates(data["days_off"], "days_off")
+        if "dates" in data:
+            if not isinstance(data["dates"], dict):
+                raise ValueError("dates must be an object keyed by YYYY-MM-DD")
+            validate_dates(list(data["dates"]), "dates")
+            update["dates"] = {d: validate_hours(h) for d, h in data["dates"].items()}
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not update:
+        return jsonify({"error": "Nothing to update"}), 400
+
+    db = get_db()
+    if not db.tbl_staff.find_one({"_id": ObjectId(staff_id)}, {"_id": 1}):
+        return jsonify({"error": "Staff not found"}), 404
+    db.schedules.update_one(
+        {"_id": f"staff:{staff_id}"},
+        {"$set": {**update, "staff_id": ObjectId(staff_id)}},
+        upsert=True,
+    )
+    _schedule_changed()
+    return jsonify(_schedule_payload(get_schedule(db))), 200
@@ -1,18 +1,27 @@
 # /routes/auth.py
 from flask import Blueprint, request, jsonify, session
+from pymongo.errors import PyMongoError
 from backend.db import get_db
-from backend.utils.security import hash_password, is_valid_email, is_strong_password
+from backend.utils.security import (
+    hash_password, verify_password, rehash_in_background, is_valid_email, is_strong_password,
+    PasswordHasherBusy, RETRY_AFTER_SECONDS,
+)
 from backend.utils.email_utils import send_email_otp
-from datetime import datetime, timedelta
-import random
+from backend.utils.stats import record_client_created
+from backend.utils.profiles import resolve_fullnames
+from backend.utils.rate_limit import rate_limit
+from backend.utils.identity import invalidate_identity
+from backend.utils.otp_store import (
+    get_otp_store, generate_otp, OTP_EXPIRY_MINUTES, PURPOSE_SIGNUP, PURPOSE_RESET,
+)
 
 auth_bp = Blueprint("auth", __name__)
 
-OTP_EXPIRY_MINUTES = 5
-otp_storage = {} 
+BUSY_HEADERS = {"Retry-After": str(RETRY_AFTER_SECONDS)}
 
 # ---------------- LOGIN ---------------- #
 @auth_bp.route("/login", methods=["POST"])
+@rate_limit("login", "login_ip", "username", "login_identifier", identifier_per_ip=True)
 def login():
     data = request.get_json()
     username_or_email = data.get("username")
@@ -26,20 +35,18 @@ def login():
         {"$or": [{"username": username_or_email}, {"email": username_or_email}]}
     )
 
-    if not user or hash_password(password) != user.get("hash_pass"):
+    try:
+        ok, needs_rehash = verify_password(password, (user or {}).get("hash_pass"))
+    except PasswordHasherBusy:
+        return jsonify({"error": "Too many login attempts right now, please retry"}), 503, BUSY_HEADERS
+    if not user or not ok:
         return jsonify({"error": "Invalid username/email or password"}), 401
+    if needs_rehash:
+        # Transparently upgrade legacy / under-cost hashes
+        rehash_in_background(db.tbl_accounts, user["_id"], password, user["hash_pass"])
 
-    # Get user's profile name
-    fullname = None
-    if user["role"].lower() == "user":
-        client = db.clients.find_one({"account_id": user["_id"]})
-        fullname = client["fullname"] if client else ""
-    elif user["role"].lower() in ["barber", "tattooartist"]:
-        staff = db.tbl_staff.find_one({"account_id": user["_id"]})
-        fullname = staff["fullname"] if staff else ""
-    elif user["role"].lower() == "admin":
-        admin = db.admins.find_one({"account_id": user["_id"]})
-        fullname = admin["fullname"] if admin else ""
+    # Get user's profile name (denormalized on the account when available)
+    fullname = user.get("fullname") or resolve_fullnames(db, [user]).get(user["_id"], "")
 
     # Store session data
     session.update({
@@ -99,21 +106,29 @@ def change_password():
     if not user:
         return jsonify({"success": False, "message": "User not found"}), 404
 
-    if hash_password(current_password) != user.get("hash_pass"):
-        return jsonify({"success": False, "message": "Current password is incorrect"}), 403
+    try:
+        if not verify_password(current_password, user.get("hash_pass"))[0]:
+            return jsonify({"success": False, "message": "Current password is incorrect"}), 403
+
+        # Hashes are salted, so compare by verifying rather than re-hashing
+        if new_password == current_password:
+            return jsonify({"success": False, "message": "New password must be different"}), 400
 
-    if hash_password(new_password) == user.get("hash_pass"):
-        return jsonify({"success": False, "message": "New password must be different"}), 400
+        new_hash = hash_password(new_password)
+    except PasswordHasherBusy:
+        return jsonify({"success": False, "message": "Server busy, please retry"}), 503, BUSY_HEADERS
 
     db.tbl_accounts.update_one(
         {"_id": user["_id"]},
-        {"$set": {"hash_pass": hash_password(new_password)}}
+        {"$set": {"hash_pass": new_hash}}
     )
+    invalidate_identity(user["username"])
 
     return jsonify({"success": True, "message": "Password updated successfully"})
 
 # ---------------- FORGOT PASSWORD - SEND OTP ---------------- #
 @auth_bp.route("/send_otp", methods=["POST"])
+@rate_limit("reset_otp", "otp_ip", "email", "otp_identifier")
 def forgot_send_otp():
     email = request.json.get("email")
     if not email or not email.endswith("@gmail.com"):
@@ -123,20 +138,20 @@ def forgot_send_otp():
     if not db.tbl_accounts.find_one({"email": email}):
         return jsonify({"success": False, "message": "No account found with this email"}), 404
 
-    otp = str(random.randint(100000, 999999))
-    otp_storage[email] = {
-        "otp": otp,
-        "expires_at": datetime.now() + timedelta(minutes=OTP_EXPIRY_MINUTES)
-    }
+    otp = generate_otp()
+    get_otp_store().put(PURPOSE_RESET, email, otp)
 
     try:
-        send_email_otp(email, "Your OTP for Password Reset", otp)
-        return jsonify({"success": True, "message": "OTP sent successfully"})
-    except Exception as e:
-        return jsonify({"success": False, "message": f"Failed to send OTP: {str(e)}"}), 500
+        # Queued for the outbox workers; only the enqueue can fail here
+        send_email_otp(email, "Your OTP for Password Reset", otp, OTP_EXPIRY_MINUTES)
+    except PyMongoError as e:
+        print(f"[OTP EMAIL ERROR] {e}")
+        return jsonify({"success": False, "message": "Failed to send OTP, please try again"}), 500
+    return jsonify({"success": True, "message": "OTP sent successfully"})
 
 # ---------------- RESET PASSWORD ---------------- #
 @auth_bp.route("/reset_password", methods=["POST"])
+@rate_limit("reset_verify", "otp_verify_ip", "email", "otp_verify_identifier")
 def reset_password():
     data = request.json
     email, otp, new_pass, confirm = (
@@ -151,37 +166,50 @@ def reset_password():
     if new_pass != confirm:
         return jsonify({"success": False, "message": "Passwords do not match"}), 400
 
-    stored = otp_storage.get(email)
-    if not stored or datetime.now() > stored["expires_at"] or otp != stored["otp"]:
+    otp_store = get_otp_store()
+    consumed = otp_store.verify_and_consume(PURPOSE_RESET, email, otp)
+    if not consumed:
         return jsonify({"success": False, "message": "Invalid or expired OTP"}), 400
 
+    try:
+        new_hash = hash_password(new_pass)
+    except PasswordHasherBusy:
+        # Give the code back (same expiry and attempts) so the user can simply retry
+        otp_store.restore(PURPOSE_RESET, email, consumed)
+        return jsonify({"success": False, "message": "Server busy, please retry"}), 503, BUSY_HEADERS
+
     db = get_db()
-    db.tbl_accounts.update_one(
+    account = db.tbl_accounts.find_one_and_update(
         {"email": email},
-        {"$set": {"hash_pass": hash_password(new_pass)}}
+        {"$set": {"hash_pass": new_hash}},
+        projection={"username": 1}
     )
+    if account:
+        invalidate_identity(account["username"])
 
-    del otp_storage[email]
     return jsonify({"success": True, "message": "Password reset successful"})
 
 # ---------------- SIGNUP - SEND OTP ---------------- #
 @auth_bp.route("/signup/send_otp", methods=["POST"])
+@rate_limit("signup_otp", "otp_ip", "email", "otp_identifier")
 def signup_send_otp():
     data = request.get_json()
     email = data.get("email")
     if not email or not is_valid_email(email):
         return jsonify({"error": "Please enter a valid Gmail address"}), 400
 
-    otp = str(random.randint(100000, 999999))
-    otp_storage[email] = {"otp": otp, "expires": datetime.now() + timedelta(minutes=OTP_EXPIRY_MINUTES)}
+    otp = generate_otp()
+    get_otp_store().put(PURPOSE_SIGNUP, email, otp)
     try:
         send_email_otp(email, "Your OTP for Signup", otp, OTP_EXPIRY_MINUTES)
-        return jsonify({"message": "OTP sent successfully!"})
-    except Exception as e:
-        return jsonify({"error": f"Failed to send OTP: {e}"}), 500
+    except PyMongoError as e:
+        print(f"[OTP EMAIL ERROR] {e}")
+        return jsonify({"error": "Failed to send OTP, please try again"}), 500
+    return jsonify({"message": "OTP sent successfully!"})
 
 # ---------------- SIGNUP - VERIFY ---------------- #
 @auth_bp.route("/signup/verify", methods=["POST"])
+@rate_limit("signup_verify", "otp_verify_ip", "email", "otp_verify_identifier")
 def signup_verify():
     data = request.get_json()
     fullname = data.get("fullname")
@@ -196,27 +224,36 @@ def signup_verify():
     if password != confirm:
         return jsonify({"error": "Passwords do not match"}), 400
 
-    record = otp_storage.get(email)
-    if not record or datetime.now() > record["expires"] or record["otp"] != otp:
-        return jsonify({"error": "Invalid or expired OTP"}), 400
-
     db = get_db()
+    # Checked before the code is consumed so a taken username doesn't burn it
     if db.tbl_accounts.find_one({"$or": [{"username": username}, {"email": email}]}):
         return jsonify({"error": "Username or email already exists"}), 409
 
+    otp_store = get_otp_store()
+    consumed = otp_store.verify_and_consume(PURPOSE_SIGNUP, email, otp)
+    if not consumed:
+        return jsonify({"error": "Invalid or expired OTP"}), 400
+
+    try:
+        password_hash = hash_password(password)
+    except PasswordHasherBusy:
+        otp_store.restore(PURPOSE_SIGNUP, email, consumed)
+        return jsonify({"error": "Server busy, please retry"}), 503, BUSY_HEADERS
+
     role = "User"
     result = db.tbl_accounts.insert_one({
         "username": username,
         "email": email,
-        "hash_pass": hash_password(password),
-        "role": role
+        "hash_pass": password_hash,
+        "role": role,
+        "fullname": fullname
     })
     db.clients.insert_one({
         "account_id": result.inserted_id,
         "fullname": fullname
     })
+    record_client_created(db)
 
-    del otp_storage[email]
     return jsonify({"message": "Signup successful!"}), 201
 
 # ---------------- CURRENT USER ---------------- #
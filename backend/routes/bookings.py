@@ -2,12 +2,56 @@
 from flask import Blueprint, request, jsonify, session
 from datetime import datetime, timedelta
 from backend.db import get_db
-from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from functools import lru_cache
 from backend.utils.email_utils import send_appointment_status_email
 from bson import ObjectId
+from backend.utils.availability import get_availability, date_range, invalidate_slots
+from backend.utils.sequences import next_appointment_display_id
+from backend.utils.identity import resolve_identity
+from backend.utils.stats import record_appointment_created, record_status_change
+from backend.utils.rollups import record_appointment_rollup, record_rollup_status_change
+from backend.utils.day_slots import mark_booking, record_slot_status_changes
 
 bookings_bp = Blueprint("bookings", __name__)
 
+# Fresh display ids tried when one collides (e.g. after a counter reset)
+DISPLAY_ID_ATTEMPTS = 3
+
+
+@lru_cache(maxsize=64)
+def _to_12h(t):
+    """Time to 12h format if stored as 24h."""
+    if not t:
+        return t
+    try:
+        return datetime.strptime(t.strip(), "%H:%M").strftime("%I:%M %p")
+    except Exception:
+        return t
+
+
+def _duplicate_index(error):
+    """Which unique index a DuplicateKeyError hit: "slot", "display_id" or None."""
+    details = error.details or {}
+    key_pattern = details.get("keyPattern") or {}
+    message = details.get("errmsg") or str(error)
+    if "display_id" in key_pattern or "display_id_unique" in message:
+        return "display_id"
+    if "artist_id" in key_pattern or "active_slot_unique" in message:
+        return "slot"
+    return None
+
+
+def _slot_taken(db, appointment):
+    """Whether another active booking holds the appointment's slot (for unnamed duplicate errors)."""
+    return db.appointments.find_one({
+        "artist_id": appointment["artist_id"],
+        "appointment_date": appointment["appointment_date"],
+        "time": appointment["time"],
+        "slot_active": True,
+    }, {"_id": 1}) is not None
+
+
 # ---------------- CREATE BOOKING ---------------- #
 @bookings_bp.route("", methods=["POST"])
 def create_booking():
@@ -25,55 +69,40 @@ def create_booking():
     staff_id = data["staff_id"]
     remarks = data.get("remarks", "")
 
-    db = get_db()
+    if not ObjectId.is_valid(staff_id):
+        return jsonify({"error": "Artist not found"}), 404
 
-    # Find client and staff
-    account = db.tbl_accounts.find_one({"username": username})
-    if not account:
-        return jsonify({"error": "User not found"}), 404
+    db = get_db("booking")
 
-    client = db.clients.find_one({"account_id": account["_id"]})
-    if not client:
-        return jsonify({"error": "Client profile not found"}), 404
+    identity = resolve_identity(db, username)  # cached account + client profile
+    staff = db.tbl_staff.find_one({"_id": ObjectId(staff_id)}, {"fullname": 1})
 
-    staff = db.tbl_staff.find_one({"_id": ObjectId(staff_id)})
+    if not identity:
+        return jsonify({"error": "User not found"}), 404
+    client_id = identity["client_id"]
+    if not client_id:
+        return jsonify({"error": "Client profile not found"}), 404
     if not staff:
         return jsonify({"error": "Artist not found"}), 404
     artist_name = staff["fullname"]
 
-    # Check if slot already booked
-    existing = db.appointments.find_one({
-        "appointment_date": date,
-        "time": time,
-        "artist_id": staff["_id"],
-        "status": {"$ne": "Cancelled"}
-    })
-    if existing:
-        return jsonify({"error": "This time slot is already booked"}), 409
-
     # Prevent overbooking within 2 weeks
     two_weeks_ago = (datetime.now() - timedelta(days=14)).strftime("%Y-%m-%d")
-    recent = db.appointments.count_documents({
-        "user_id": client["_id"],
+    recent = db.appointments.find_one({
+        "user_id": client_id,
         "service": service,
         "appointment_date": {"$gte": two_weeks_ago},
         "status": {"$ne": "Cancelled"}
-    })
-    if recent >= 1:
+    }, {"_id": 1})
+    if recent:
         return jsonify({"error": f"You can only book one {service} every 2 weeks."}), 400
 
-    # Generate human-friendly appointment code
-    seq_doc = db.counters.find_one_and_update(
-        {"_id": "appointment"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=ReturnDocument.AFTER,
-    )
-    code_str = f"APT-{int(seq_doc.get('seq', 1)):06d}" if seq_doc else None
+    # Generate human-friendly appointment code (from this worker's reserved block)
+    code_str = next_appointment_display_id(db)
 
     # Create booking
     appointment = {
-        "user_id": client["_id"],
+        "user_id": client_id,
         "fullname": fullname,
         "service": service,
         "appointment_date": date,
@@ -83,9 +112,27 @@ def create_booking():
         "artist_id": staff["_id"],
         "artist_name": artist_name,
         "created_at": datetime.now(),
-        "display_id": code_str
+        "display_id": code_str,
+        # Covered by the unique partial index: one active booking per slot
+        "slot_active": True,
     }
-    db.appointments.insert_one(appointment)
+    for attempt in range(DISPLAY_ID_ATTEMPTS):
+        try:
+            db.appointments.insert_one(appointment)
+            break
+        except DuplicateKeyError as e:
+            index = _duplicate_index(e)
+            if index is None and _slot_taken(db, appointment):
+                index = "slot"
+            if index == "slot":
+                return jsonify({"error": "This time slot is already booked"}), 409
+            if index != "display_id" or attempt == DISPLAY_ID_ATTEMPTS - 1:
+                raise
+            print(f"[BOOKING] display id {appointment['display_id']} already taken, retrying")
+            appointment["display_id"] = next_appointment_display_id(db)
+    record_appointment_created(db, appointment["status"])
+    record_appointment_rollup(db, appointment)
+    mark_booking(db, staff["_id"], date, time, True)
 
     # Mark slot as booked
     db.staff_unavailability.update_one(
@@ -93,6 +140,7 @@ def create_booking():
         {"$set": {"is_booked": True}},
         upsert=True
     )
+    invalidate_slots(staff["_id"], date)
 
     return jsonify({"message": "Booking created successfully!", "status": "Pending"}), 201
 
@@ -102,43 +150,22 @@ def create_booking():
 def get_user_appointments(username):
     db = get_db()
 
-    account = db.tbl_accounts.find_one({"username": username})
-    if not account:
+    identity = resolve_identity(db, username)
+    if not identity:
         return jsonify({"error": "User not found"}), 404
-
-    client = db.clients.find_one({"account_id": account["_id"]})
-    if not client:
+    if not identity["client_id"]:
         return jsonify({"error": "Client profile not found"}), 404
 
-    appointments = list(db.appointments.find({"user_id": client["_id"]}).sort([
+    appointments = list(db.appointments.find({"user_id": identity["client_id"]}).sort([
         ("appointment_date", -1),
         ("time", -1)
     ]))
 
-    # Normalize fields for JSON
+    # ObjectIds/datetimes are handled by the app JSON provider
     for apt in appointments:
-        # Time to 12h format if stored as 24h
-        t = apt.get("time")
-        if t:
-            try:
-                parsed = datetime.strptime(t.strip(), "%H:%M")
-                apt["time"] = parsed.strftime("%I:%M %p")
-            except Exception:
-                apt["time"] = t
-
-        # Convert ObjectIds and datetimes to strings
-        try:
-            apt["_id"] = str(apt["_id"])
-        except Exception:
-            pass
+        apt["time"] = _to_12h(apt.get("time"))
         # Friendly display id for UI
-        apt["display_id"] = apt.get("display_id") or (apt.get("_id")[-6:] if apt.get("_id") else None)
-        if isinstance(apt.get("user_id"), ObjectId):
-            apt["user_id"] = str(apt["user_id"])
-        if isinstance(apt.get("artist_id"), ObjectId):
-            apt["artist_id"] = str(apt["artist_id"])
-        if isinstance(apt.get("created_at"), datetime):
-            apt["created_at"] = apt["created_at"].strftime("%Y-%m-%d %H:%M:%S")
+        apt["display_id"] = apt.get("display_id") or str(apt["_id"])[-6:]
 
     return jsonify(appointments), 200
 
@@ -150,22 +177,30 @@ def cancel_appointment(appointment_id):
         return jsonify({"error": "Not authenticated"}), 401
 
     username = session["username"]
-    db = get_db()
+    db = get_db("booking")
 
     appointment = db.appointments.find_one({"_id": ObjectId(appointment_id)})
     if not appointment:
         return jsonify({"error": "Appointment not found"}), 404
 
-    account = db.tbl_accounts.find_one({"username": username})
-    client = db.clients.find_one({"account_id": account["_id"]})
+    identity = resolve_identity(db, username)
 
-    if not client or appointment["user_id"] != client["_id"]:
+    if not identity or not identity["client_id"] or appointment["user_id"] != identity["client_id"]:
         return jsonify({"error": "Not authorized to cancel this appointment"}), 403
 
     if appointment["status"] in ["Cancelled", "Completed", "Abandoned", "Done"]:
         return jsonify({"error": "Appointment already in a terminal state"}), 400
 
-    db.appointments.update_one({"_id": ObjectId(appointment_id)}, {"$set": {"status": "Cancelled"}})
+    result = db.appointments.update_one(
+        {"_id": ObjectId(appointment_id), "status": appointment["status"]},
+        {"$set": {"status": "Cancelled"}, "$unset": {"slot_active": ""}}
+    )
+    if not result.modified_count:
+        # The status changed since it was read (e.g. an admin update won)
+        return jsonify({"error": "Appointment was updated concurrently; please refresh"}), 409
+    record_status_change(db, appointment, "Cancelled")
+    record_rollup_status_change(db, appointment, "Cancelled")
+    record_slot_status_changes(db, [(appointment, "Cancelled")])
 
     # Release slot
     db.staff_unavailability.update_one(
@@ -176,13 +211,13 @@ def cancel_appointment(appointment_id):
         },
         {"$set": {"is_booked": False}}
     )
+    invalidate_slots(appointment["artist_id"], appointment["appointment_date"])
 
     # Send email
-    user_account = db.tbl_accounts.find_one({"_id": account["_id"]})
-    if user_account and user_account.get("email"):
+    if identity.get("email"):
         send_appointment_status_email(
-            email=user_account["email"],
-            fullname=session.get("fullname", ""),
+            email=identity["email"],
+            fullname=session.get("fullname") or identity["fullname"],
             status="Cancelled",
             service=appointment.get("service"),
             appointment_date=appointment.get("appointment_date"),
@@ -200,41 +235,51 @@ def get_available_slots():
     staff_id = request.args.get("staff_id")
     if not date or not staff_id:
         return jsonify({"error": "Missing parameters"}), 400
+    if not ObjectId.is_valid(staff_id):
+        return jsonify({"error": "Invalid staff_id"}), 400
+    try:
+        date_range(date, date)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date: {e}"}), 400
+
+    availability = get_availability(get_db(), [staff_id], [date])
+    return jsonify({"available_times": availability[staff_id][date]})
+
+
+# ---------------- AVAILABILITY (RANGE) ---------------- #
+@bookings_bp.route("/availability", methods=["GET"])
+def get_availability_range():
+    start = request.args.get("start") or request.args.get("date")
+    end = request.args.get("end") or start
+    staff_param = request.args.get("staff_ids") or request.args.get("staff_id")
+    service = (request.args.get("service") or "").lower()
+    if not start or not (staff_param or service):
+        return jsonify({"error": "Missing parameters"}), 400
 
-    db = get_db()
-    staff_oid = ObjectId(staff_id)
-
-    # Combine explicitly set staff unavailability (any entry for the date)
-    # and later we'll union with booked times from appointments.
-    unavailable = list(db.staff_unavailability.find(
-        {"staff_id": staff_oid, "unavailable_date": date},
-        {"unavailable_time": 1, "_id": 0}
-    ))
-    unavailable_times = {u["unavailable_time"] for u in unavailable}
-
-    dt = datetime.strptime(date, "%Y-%m-%d")
-    weekday = dt.weekday()
-    if weekday == 6:  # Sunday
-        return jsonify({"available_times": []})
-
-    start_hour = 9
-    end_hour = 17 if weekday == 5 else 21
-    default_slots = [f"{h%12 or 12}:00 {'AM' if h < 12 else 'PM'}" for h in range(start_hour, end_hour)]
-
-    booked = list(db.appointments.find(
-        {"appointment_date": date, "artist_id": staff_oid, "status": {"$ne": "Cancelled"}},
-        {"time": 1, "_id": 0}
-    ))
-    booked_times = {b["time"] for b in booked}
-
-    # Convert all to 12-hour format
-    def to_12h(t):
-        try:
-            return datetime.strptime(t, "%H:%M").strftime("%I:%M %p")
-        except Exception:
-            return t
-
-    all_unavailable = {to_12h(t) for t in (unavailable_times | booked_times)}
-    available_times = [t for t in default_slots if t not in all_unavailable]
+    try:
+        dates = date_range(start, end)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date range: {e}"}), 400
 
-    return jsonify({"available_times": available_times})
+    db = get_db()
+    staff = []
+    if staff_param:
+        staff_ids = [s.strip() for s in staff_param.split(",") if s.strip()]
+        if not all(ObjectId.is_valid(s) for s in staff_ids):
+            return jsonify({"error": "Invalid staff_id"}), 400
+    else:
+        role = {"haircut": "Barber", "tattoo": "TattooArtist"}.get(service)
+        if not role:
+            return jsonify({"error": "Unknown service"}), 400
+        staff = [
+            {"id": str(doc["_id"]), "fullname": doc.get("fullname", "")}
+            for doc in db.tbl_staff.find({"specialization": role}, {"_id": 1, "fullname": 1})
+        ]
+        staff_ids = [s["id"] for s in staff]
+
+    return jsonify({
+        "start": dates[0],
+        "end": dates[-1],
+        "staff": staff,
+        "availability": get_availability(db, staff_ids, dates),
+    }), 200
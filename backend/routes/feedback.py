@@ -2,8 +2,18 @@
 from flask import Blueprint, request, jsonify
 from backend.db import get_db
 from backend.utils.email_utils import send_feedback_reply_email
+from backend.utils.stats import STAR_VALUES, record_feedback_created
+from backend.utils.identity import resolve_identity
+from backend.utils.feedback_feed import (
+    FEED_DEFAULT_LIMIT,
+    FEED_MAX_LIMIT,
+    get_feed_page,
+    get_full_feed,
+    get_rating_summary,
+    invalidate_feedback_feed,
+)
+from backend.utils.pagination import InvalidCursor
 from datetime import datetime
-from bson import ObjectId
 
 feedback_bp = Blueprint("feedback", __name__)
 
@@ -11,25 +21,25 @@ feedback_bp = Blueprint("feedback", __name__)
 @feedback_bp.route("", methods=["GET"])
 def get_feedback():
     db = get_db()
-    feedback_list = list(
-        db.feedback.find({}, {"_id": 0}).sort("date_submitted", -1)
-    )
 
-    # Format the date for display
-    for f in feedback_list:
-        if "date_submitted" in f and isinstance(f["date_submitted"], datetime):
-            f["date"] = f["date_submitted"].strftime("%Y-%m-%d %H:%M")
-        else:
-            f["date"] = f.get("date_submitted", "")
-        f.pop("date_submitted", None)
-        # Ensure ObjectIds are strings
-        try:
-            if isinstance(f.get("account_id"), ObjectId):
-                f["account_id"] = str(f["account_id"])
-        except Exception:
-            pass
+    # Legacy callers (no limit/cursor) still get the plain list
+    if "limit" not in request.args and "cursor" not in request.args:
+        return jsonify(get_full_feed(db)), 200
 
-    return jsonify(feedback_list), 200
+    try:
+        limit = min(max(int(request.args.get("limit", FEED_DEFAULT_LIMIT)), 1), FEED_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    try:
+        items, next_cursor = get_feed_page(db, limit, request.args.get("cursor"))
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "data": items,
+        "next_cursor": next_cursor,
+        "summary": get_rating_summary(db),
+    }), 200
 
 
 # ---------------- POST FEEDBACK ---------------- #
@@ -42,18 +52,24 @@ def post_feedback():
 
     if not username or not stars or not message:
         return jsonify({"error": "Missing fields"}), 400
+    try:
+        stars = int(stars)
+    except (TypeError, ValueError):
+        stars = None
+    if stars not in STAR_VALUES:
+        return jsonify({"error": "stars must be a whole number from 1 to 5"}), 400
 
     db = get_db()
 
     # Find user
-    account = db.tbl_accounts.find_one({"username": username})
-    if not account:
+    identity = resolve_identity(db, username)
+    if not identity:
         return jsonify({"error": "User not found"}), 404
 
     feedback_doc = {
-        "account_id": account["_id"],
+        "account_id": identity["account_id"],
         "username": username,
-        "stars": int(stars),
+        "stars": stars,
         "message": message,
         "reply": "",
         "date_submitted": datetime.now()
@@ -61,6 +77,8 @@ def post_feedback():
 
     try:
         db.feedback.insert_one(feedback_doc)
+        record_feedback_created(db, feedback_doc["stars"])
+        invalidate_feedback_feed()
         return jsonify({"message": "Feedback submitted successfully!"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
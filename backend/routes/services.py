@@ -1,19 +1,29 @@
-from flask import Blueprint, jsonify, send_from_directory, request, url_for
 import os
 
+from flask import Blueprint, jsonify, request, url_for
+from backend.utils.assets import asset_manifest, serve_asset, srcset, IMAGE_FOLDERS
+from backend.utils.cache import TTLCache
+from backend.utils.image_variants import SRCSET_FORMAT
+
 services_bp = Blueprint("services", __name__)
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-REACT_PUBLIC_PATH = os.path.join(BASE_DIR, "../../backend/public/assets")
+THUMBNAIL_WIDTH = 320
+# Canonical origin for image URLs (e.g. https://api.example.com); unset = the request's host
+ASSET_BASE_URL = os.getenv("ASSET_BASE_URL", "").rstrip("/")
+
+# (manifest version, base URL) -> /images payload. Without ASSET_BASE_URL the
+# base comes from the client-controlled Host header, hence the small bound.
+_images_payload = TTLCache(maxsize=int(os.getenv("IMAGES_PAYLOAD_CACHE_SIZE", "8")), ttl=3600)
 
 
 # ---------------- SERVE STATIC ASSETS ---------------- #
 @services_bp.route("/assets/<path:filename>")
 def serve_assets(filename):
     """
-    Serve static files from the public/assets folder.
+    Serve static files from the public/assets folder, with ETags and
+    far-future caching for fingerprinted URLs.
     """
-    return send_from_directory(REACT_PUBLIC_PATH, filename)
+    return serve_asset(filename)
 
 
 # ---------------- GET SERVICE IMAGES ---------------- #
@@ -21,28 +31,33 @@ def serve_assets(filename):
 def get_service_images():
     """
     Return all tattoo and haircut images with their URLs and formatted names.
+    Built from the startup asset manifest and kept in a small in-memory cache.
     """
-    tattoo_folder = os.path.join(REACT_PUBLIC_PATH, "tattoo_images")
-    haircut_folder = os.path.join(REACT_PUBLIC_PATH, "haircut_images")
-
-    def get_images(folder_path, service_type):
-        images = []
-        if not os.path.exists(folder_path):
+    asset_manifest.refresh_if_changed()
+    base = ASSET_BASE_URL or request.url_root.rstrip("/")
+    key = (asset_manifest.version, base)
+    payload = _images_payload.get(key)
+    if payload is None:
+        def get_images(folder):
+            images = []
+            for name, entry in asset_manifest.images(folder):
+                image_url = base + url_for("services.serve_assets", filename=entry["fingerprinted"])
+                images.append({
+                    "name": name,
+                    "image": image_url,
+                    "thumbnail": f"{image_url}?w={THUMBNAIL_WIDTH}&fmt={SRCSET_FORMAT}",
+                    "srcset": srcset(image_url, SRCSET_FORMAT),
+                })
             return images
-        for filename in os.listdir(folder_path):
-            if filename.lower().endswith(".png"):
-                name = os.path.splitext(filename)[0].replace("_", " ").replace("-", " ").title()
-                image_url = url_for("services.serve_assets",
-                                    filename=f"{service_type}_images/{filename}",
-                                    _external=True)
-                images.append({"name": name, "image": image_url})
-        return sorted(images, key=lambda x: x["name"])
-
-    tattoos = get_images(tattoo_folder, "tattoo")
-    haircuts = get_images(haircut_folder, "haircut")
-
-    return jsonify({
-        "tattoos": tattoos,
-        "haircuts": haircuts,
-        "total": len(tattoos) + len(haircuts)
-    }), 200
+
+        tattoos = get_images(IMAGE_FOLDERS["tattoos"])
+        haircuts = get_images(IMAGE_FOLDERS["haircuts"])
+        payload = {
+            "tattoos": tattoos,
+            "haircuts": haircuts,
+            "total": len(tattoos) + len(haircuts)
+        }
+        # Payloads for an older manifest version are never hit again and age out
+        _images_payload.set(key, payload)
+
+    return jsonify(payload), 200
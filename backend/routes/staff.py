@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from bson.objectid import ObjectId
 from backend.db import get_db
+from backend.utils.unavailability import MODES, apply_unavailability, expand_dates, expand_slots
+from backend.utils.schedule import get_schedule
 
 staff_bp = Blueprint("staff", __name__)
 
@@ -57,25 +59,59 @@ def add_unavailability():
         except Exception:
             return jsonify({"error": "Invalid staff_id"}), 400
 
-        # Remove existing entries for that date
-        unavailability_col.delete_many({
-            "staff_id": staff_obj_id,
-            "unavailable_date": unavailable_date
-        })
-
-        # Insert new unavailable times
-        documents = [
-            {"staff_id": staff_obj_id, "unavailable_date": unavailable_date, "unavailable_time": t}
-            for t in unavailable_times
-        ]
-        if documents:
-            unavailability_col.insert_many(documents)
+        # Replace the manual rows for that date; booked-slot markers are kept
+        desired = expand_slots([unavailable_date], unavailable_times)
+        apply_unavailability(db, staff_obj_id, desired, "replace")
 
         return jsonify({"message": "Unavailability saved successfully"}), 201
     except Exception as e:
         return jsonify({"error": f"Failed to save unavailability: {str(e)}"}), 500
 
 
+# ---------------- STAFF UNAVAILABILITY (RANGE / RECURRING) ---------------- #
+@staff_bp.route("/unavailability/range", methods=["POST", "OPTIONS"])
+def add_unavailability_range():
+    """
+    Body: ``staff_id``, ``start`` and either ``end`` or ``weeks``; optional
+    ``weekdays`` (0 = Monday), ``times`` or ``all_day``, and ``mode``
+    (replace / add / remove, default replace). E.g. every Monday afternoon
+    for 8 weeks: ``{"start": ..., "weeks": 8, "weekdays": [0],
+    "times": ["1:00 PM", "2:00 PM", ...], "mode": "add"}``.
+    """
+    from flask import make_response
+    if request.method == "OPTIONS":
+        return make_response(('', 200))
+    data = request.get_json(silent=True) or {}
+
+    staff_id = data.get("staff_id") or data.get("staffId")
+    start = data.get("start") or data.get("date")
+    times = data.get("times") or data.get("unavailable_times") or []
+    all_day = bool(data.get("all_day"))
+    mode = (data.get("mode") or "replace").lower()
+    if isinstance(times, str):
+        times = [t.strip() for t in times.split(',') if t.strip()]
+
+    if not staff_id or not start or not (times or all_day or mode == "replace"):
+        return jsonify({"error": "Missing required fields"}), 400
+    if not ObjectId.is_valid(staff_id):
+        return jsonify({"error": "Invalid staff_id"}), 400
+    if mode not in MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(MODES)}"}), 400
+
+    try:
+        dates = expand_dates(start, data.get("end"), data.get("weeks"), data.get("weekdays"))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid date range: {e}"}), 400
+
+    try:
+        desired = expand_slots(dates, times, all_day, get_schedule(db), staff_id)
+        result = apply_unavailability(db, ObjectId(staff_id), desired, mode)
+    except Exception as e:
+        return jsonify({"error": f"Failed to save unavailability: {str(e)}"}), 500
+
+    return jsonify({"message": "Unavailability saved successfully", "dates": dates, **result}), 200
+
+
 # ---------------- GET STAFF BY SERVICE ---------------- #
 @staff_bp.route("/by-service/<service>", methods=["GET"])
 def get_staff_by_service(service):
@@ -1,16 +1,19 @@
 # /utils/__init__.py
-from .security import hash_password, is_strong_password, is_valid_email
+from .security import hash_password, verify_password, is_strong_password, is_valid_email
 from .email_utils import (
     send_email_otp,
     send_feedback_reply_email,
     send_appointment_status_email,
+    send_appointment_status_emails,
 )
 
 __all__ = [
     "hash_password",
+    "verify_password",
     "is_strong_password",
     "is_valid_email",
     "send_email_otp",
     "send_feedback_reply_email",
     "send_appointment_status_email",
+    "send_appointment_status_emails",
 ]
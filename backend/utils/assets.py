@@ -0,0 +1,161 @@
+# /utils/assets.py
+"""
+Startup manifest of the files under ``public/assets``.
+
+Each file gets a content hash, which doubles as its ETag and as the
+fingerprint in an immutable URL (``haircut_images/buzzcut.3f2a9c1d0e4b.png``).
+The manifest re-scans (hashing only changed files) when the directory
+changes, checked at most every few seconds.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from flask import abort, request, send_from_directory
+
+from backend.utils.image_variants import ALLOWED_WIDTHS, FORMATS, CACHE_DIR, get_variant
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.abspath(os.path.join(BASE_DIR, "../public/assets"))
+
+FINGERPRINT_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+REVALIDATE_MAX_AGE = 300
+IMAGE_FOLDERS = {"tattoos": "tattoo_images", "haircuts": "haircut_images"}
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def _fingerprinted(rel_path, file_hash):
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{file_hash}{ext}"
+
+
+def _display_name(filename):
+    return os.path.splitext(filename)[0].replace("_", " ").replace("-", " ").title()
+
+
+class AssetManifest:
+    def __init__(self, root, check_interval=5):
+        self.root = root
+        self.check_interval = check_interval
+        self.entries = {}
+        self.by_fingerprint = {}
+        self.version = 0
+        self._stats = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def _walk(self):
+        stats = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                rel = os.path.relpath(full, self.root).replace(os.sep, "/")
+                st = os.stat(full)
+                stats[rel] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def refresh(self):
+        """Re-scan the tree, hashing only new or modified files."""
+        with self._lock:
+            stats = self._walk() if os.path.isdir(self.root) else {}
+            self._checked_at = time.monotonic()
+            if stats == self._stats:
+                return False
+            entries = {}
+            for rel, (mtime_ns, size) in stats.items():
+                old = self.entries.get(rel)
+                if old and self._stats.get(rel) == (mtime_ns, size):
+                    entries[rel] = old
+                    continue
+                file_hash = _file_hash(os.path.join(self.root, rel))
+                entries[rel] = {
+                    "path": rel,
+                    "hash": file_hash,
+                    "size": size,
+                    "fingerprinted": _fingerprinted(rel, file_hash),
+                }
+            self.entries = entries
+            self.by_fingerprint = {e["fingerprinted"]: e for e in entries.values()}
+            self._stats = stats
+            self.version += 1
+            return True
+
+    def refresh_if_changed(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+
+    def resolve(self, filename):
+        """``(entry, is_fingerprinted)`` for a request path, or ``(None, False)``."""
+        entry = self.by_fingerprint.get(filename)
+        if entry:
+            return entry, True
+        return self.entries.get(filename), False
+
+    def images(self, folder):
+        """Sorted ``(display name, entry)`` pairs for the PNGs in ``folder``."""
+        prefix = folder + "/"
+        rows = [
+            (_display_name(rel[len(prefix):]), entry)
+            for rel, entry in self.entries.items()
+            if rel.startswith(prefix) and "/" not in rel[len(prefix):] and rel.lower().endswith(".png")
+        ]
+        return sorted(rows, key=lambda row: row[0])
+
+
+asset_manifest = AssetManifest(ASSETS_DIR)
+
+
+# ---------------- SERVING ---------------- #
+def _serve_variant(entry, max_age):
+    """Resized/re-encoded response for ``?w=&fmt=``; None falls back to the original."""
+    try:
+        width = int(request.args.get("w", ALLOWED_WIDTHS[-1]))
+    except ValueError:
+        abort(400)
+    fmt = (request.args.get("fmt") or os.path.splitext(entry["path"])[1].lstrip(".")).lower()
+    if width not in ALLOWED_WIDTHS or fmt not in FORMATS:
+        abort(400)
+    path = get_variant(os.path.join(ASSETS_DIR, entry["path"]), entry["hash"], width, fmt)
+    if not path:
+        return None
+    return send_from_directory(
+        CACHE_DIR, os.path.basename(path), mimetype=FORMATS[fmt][1],
+        etag=f"{entry['hash']}-w{width}-{fmt}", max_age=max_age, conditional=True,
+    )
+
+
+def srcset(url, fmt):
+    """``srcset`` value listing every allowed width of ``url`` in ``fmt``."""
+    return ", ".join(f"{url}?w={w}&fmt={fmt} {w}w" for w in ALLOWED_WIDTHS)
+
+
+def serve_asset(filename):
+    """
+    Serve ``filename`` (plain or fingerprinted) with an ETag. Fingerprinted
+    URLs are cached for a year as immutable; plain ones must revalidate.
+    """
+    asset_manifest.refresh_if_changed()
+    entry, fingerprinted = asset_manifest.resolve(filename)
+    if not entry:
+        return send_from_directory(ASSETS_DIR, filename)
+
+    max_age = IMMUTABLE_MAX_AGE if fingerprinted else REVALIDATE_MAX_AGE
+    response = None
+    if "w" in request.args or "fmt" in request.args:
+        response = _serve_variant(entry, max_age)
+    if response is None:
+        response = send_from_directory(ASSETS_DIR, entry["path"], etag=entry["hash"], max_age=max_age, conditional=True)
+    response.cache_control.public = True
+    if fingerprinted:
+        response.cache_control.immutable = True
+    return response
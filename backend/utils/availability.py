@@ -0,0 +1,128 @@
+# /utils/availability.py
+"""
+Slot availability per staff member and day, served from an in-process cache.
+
+A staff-day's free hours are ``open_mask & ~(blocked | booked)``: the open
+hours compiled from the schedule (``utils/schedule.py``) and the masks in its
+``staff_day_slots`` document (``utils/day_slots.py``). Until those masks have
+been built, they are derived from ``staff_unavailability`` and
+``appointments`` instead.
+
+Writes that change a staff-day (bookings, cancellations, status changes and
+unavailability edits) call ``invalidate_slots`` for exactly that staff-day.
+"""
+import os
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from bson import ObjectId
+
+from backend.utils.cache import TTLCache
+from backend.utils.day_slots import day_slots_ready, get_day_masks
+from backend.utils.schedule import get_schedule, mask_hours, open_mask, slot_bit
+
+MAX_RANGE_DAYS = 31
+
+slot_cache = TTLCache(
+    maxsize=int(os.getenv("AVAILABILITY_CACHE_SIZE", "5000")),
+    ttl=int(os.getenv("AVAILABILITY_CACHE_TTL", "30")),
+)
+
+
+# ---------------- SLOT LABELS ---------------- #
+def slot_label(hour: int) -> str:
+    return f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
+
+
+@lru_cache(maxsize=256)
+def normalize_slot(t):
+    """Map "13:00", "01:00 PM" and "1:00 PM" to the slot label "1:00 PM"."""
+    if not isinstance(t, str):
+        return t
+    value = t.strip()
+    for fmt in ("%H:%M", "%I:%M %p", "%I:%M%p"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return f"{parsed.hour % 12 or 12}:{parsed.minute:02d} {'AM' if parsed.hour < 12 else 'PM'}"
+    return value
+
+
+def date_range(start: str, end: str):
+    """Inclusive list of ``YYYY-MM-DD`` strings; raises ValueError on bad input."""
+    start_dt = datetime.strptime(start, "%Y-%m-%d")
+    end_dt = datetime.strptime(end, "%Y-%m-%d")
+    days = (end_dt - start_dt).days
+    if days < 0:
+        raise ValueError("end is before start")
+    if days >= MAX_RANGE_DAYS:
+        raise ValueError(f"range is limited to {MAX_RANGE_DAYS} days")
+    return [(start_dt + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+
+
+# ---------------- CACHE ---------------- #
+def invalidate_slots(staff_id, date):
+    slot_cache.pop((str(staff_id), date))
+
+
+def invalidate_all():
+    """After schedule changes, which can affect any staff-day."""
+    slot_cache.clear()
+
+
+# ---------------- LOOKUP ---------------- #
+def _legacy_taken_masks(db, misses):
+    """Taken-hour masks from the source collections (before day slots are built)."""
+    miss_staff = sorted({ObjectId(s) for s, _ in misses})
+    miss_dates = sorted({d for _, d in misses})
+    taken = {}
+    for row in db.staff_unavailability.find(
+        # Released booking markers (``is_booked: False``) no longer block the slot
+        {"staff_id": {"$in": miss_staff}, "unavailable_date": {"$in": miss_dates}, "is_booked": {"$ne": False}},
+        {"staff_id": 1, "unavailable_date": 1, "unavailable_time": 1, "_id": 0},
+    ):
+        key = (str(row["staff_id"]), row["unavailable_date"])
+        taken[key] = taken.get(key, 0) | slot_bit(row.get("unavailable_time"))
+    for row in db.appointments.find(
+        {"artist_id": {"$in": miss_staff}, "appointment_date": {"$in": miss_dates}, "status": {"$ne": "Cancelled"}},
+        {"artist_id": 1, "appointment_date": 1, "time": 1, "_id": 0},
+    ):
+        key = (str(row["artist_id"]), row["appointment_date"])
+        taken[key] = taken.get(key, 0) | slot_bit(row.get("time"))
+    return taken
+
+
+def get_availability(db, staff_ids, dates):
+    """
+    Return ``{staff_id: {date: [available slot labels]}}`` for every
+    combination. Cache misses are filled with one ``staff_day_slots`` query.
+    """
+    schedule = get_schedule(db)
+    result = {str(s): {} for s in staff_ids}
+    misses = []
+    for staff_id in result:
+        for date in dates:
+            if not open_mask(schedule, staff_id, date):
+                result[staff_id][date] = []
+                continue
+            cached = slot_cache.get((staff_id, date))
+            if cached is None:
+                misses.append((staff_id, date))
+            else:
+                result[staff_id][date] = list(cached)
+
+    if not misses:
+        return result
+
+    if day_slots_ready(db):
+        taken = {key: blocked | booked for key, (blocked, booked) in get_day_masks(db, misses).items()}
+    else:
+        taken = _legacy_taken_masks(db, misses)
+
+    for staff_id, date in misses:
+        free = open_mask(schedule, staff_id, date) & ~taken.get((staff_id, date), 0)
+        available = tuple(slot_label(h) for h in mask_hours(free))
+        slot_cache.set((staff_id, date), available)
+        result[staff_id][date] = list(available)
+    return result
@@ -0,0 +1,239 @@
+# /utils/day_slots.py
+"""
+One ``staff_day_slots`` document per staff member and day.
+
+``_id`` is ``"<staff_id>:<YYYY-MM-DD>"``; ``blocked`` (manual unavailability)
+and ``booked`` (active appointments) are 24-bit hour masks kept up to date
+with ``$bit`` by the booking, status and unavailability write paths.
+Availability is ``open_mask & ~(blocked | booked)``. Every hook write also
+bumps the day's ``version``, which rebuilds use to avoid overwriting it.
+
+The legacy ``staff_unavailability`` rows are still written, so the masks can
+be rebuilt from them at any time:
+
+    python -m backend.utils.day_slots --rebuild
+"""
+import argparse
+import threading
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from backend.utils.leases import acquire_lease, release_lease
+from backend.utils.schedule import slot_bit
+
+META_ID = "_meta"
+BATCH_SIZE = 1000
+REBUILD_LEASE = "day-slots-rebuild"
+REBUILD_LEASE_SECONDS = 900
+REBUILD_ATTEMPTS = 3
+# Manual unavailability rows; booked-slot markers carry ``is_booked``
+MANUAL_ROWS = {"is_booked": {"$exists": False}}
+
+_ready = False
+
+
+def day_id(staff_id, date) -> str:
+    return f"{staff_id}:{date}"
+
+
+def _bit_op(staff_id, date, field, set_mask=0, clear_mask=0):
+    """``UpdateOne``s setting/clearing bits of ``field`` (one op per $bit operator)."""
+    ops = []
+    for operator, value, needed in (("or", set_mask, set_mask), ("and", ~clear_mask, clear_mask)):
+        if needed:
+            ops.append(UpdateOne(
+                {"_id": day_id(staff_id, date)},
+                {
+                    "$bit": {field: {operator: value}},
+                    "$inc": {"version": 1},
+                    "$setOnInsert": {"staff_id": staff_id, "date": date},
+                },
+                upsert=True,
+            ))
+    return ops
+
+
+# ---------------- WRITE PATH HOOKS ---------------- #
+def mark_bookings(db, items):
+    """``(staff_id, date, time, booked)`` tuples -> one bulk_write on the booked masks."""
+    ops = []
+    for staff_id, date, time, booked in items:
+        bit = slot_bit(time)
+        if staff_id and date and bit:
+            ops.extend(_bit_op(staff_id, date, "booked", set_mask=bit if booked else 0, clear_mask=0 if booked else bit))
+    if ops:
+        db.staff_day_slots.bulk_write(ops, ordered=False)
+
+
+def mark_booking(db, staff_id, date, time, booked=True):
+    mark_bookings(db, [(staff_id, date, time, booked)])
+
+
+def record_slot_status_changes(db, changes):
+    """
+    Mirror ``(appointment before update, new_status)`` pairs into the booked
+    masks; only changes into or out of "Cancelled" move a bit.
+    """
+    items = []
+    for appointment, new_status in changes:
+        was_active = appointment.get("status") != "Cancelled"
+        is_active = new_status != "Cancelled"
+        if was_active != is_active:
+            items.append((appointment.get("artist_id"), appointment.get("appointment_date"),
+                          appointment.get("time"), is_active))
+    mark_bookings(db, items)
+
+
+def update_blocked(db, staff_id, added, removed):
+    """Set the hours in ``added`` and clear those in ``removed`` (``[(date, time)]``)."""
+    masks = {}
+    for date, time in added:
+        masks.setdefault(date, [0, 0])[0] |= slot_bit(time)
+    for date, time in removed:
+        masks.setdefault(date, [0, 0])[1] |= slot_bit(time)
+    ops = []
+    for date, (set_mask, clear_mask) in masks.items():
+        ops.extend(_bit_op(staff_id, date, "blocked", set_mask, clear_mask & ~set_mask))
+    if ops:
+        db.staff_day_slots.bulk_write(ops, ordered=False)
+
+
+# ---------------- READ ---------------- #
+def get_day_masks(db, keys):
+    """``{(staff_id str, date): (blocked, booked)}`` for ``keys`` in one query."""
+    masks = {}
+    for doc in db.staff_day_slots.find(
+        {"_id": {"$in": [day_id(s, d) for s, d in keys]}},
+        {"blocked": 1, "booked": 1},
+    ):
+        staff_id, date = doc["_id"].split(":", 1)
+        masks[(staff_id, date)] = (doc.get("blocked", 0), doc.get("booked", 0))
+    return masks
+
+
+def day_slots_ready(db) -> bool:
+    """Whether the masks have been built (checked until the first success)."""
+    global _ready
+    if not _ready:
+        _ready = db.staff_day_slots.find_one({"_id": META_ID}, {"_id": 1}) is not None
+    return _ready
+
+
+# ---------------- REBUILD ---------------- #
+def _day_versions(db, since, until=None):
+    """``{day_id: version}`` for the stored staff-days in ``[since, until]``."""
+    dates = {"$gte": since, **({"$lte": until} if until else {})}
+    return {doc["_id"]: doc.get("version") for doc in db.staff_day_slots.find({"date": dates}, {"version": 1})}
+
+
+def _compute_days(db, since, until=None):
+    """Recompute the masks of every staff-day in ``[since, until]`` from the source collections."""
+    dates = {"$gte": since, **({"$lte": until} if until else {})}
+    days = {}
+
+    def entry(staff_id, date):
+        return days.setdefault(day_id(staff_id, date), {
+            "staff_id": staff_id, "date": date, "blocked": 0, "booked": 0,
+        })
+
+    for row in db.staff_unavailability.find(
+        {"unavailable_date": dates, **MANUAL_ROWS},
+        {"staff_id": 1, "unavailable_date": 1, "unavailable_time": 1},
+    ):
+        entry(row["staff_id"], row["unavailable_date"])["blocked"] |= slot_bit(row.get("unavailable_time"))
+    for row in db.appointments.find(
+        {"slot_active": True, "appointment_date": dates},
+        {"artist_id": 1, "appointment_date": 1, "time": 1},
+    ):
+        if row.get("artist_id"):
+            entry(row["artist_id"], row["appointment_date"])["booked"] |= slot_bit(row.get("time"))
+    return days
+
+
+def _write_days(db, days, versions):
+    """``$set`` each recomputed staff-day whose version is unchanged; returns the ones that moved."""
+    conflicts = []
+    items = list(days.items())
+    for i in range(0, len(items), BATCH_SIZE):
+        batch = items[i:i + BATCH_SIZE]
+        # {"version": None} also matches a day written before versioning
+        ops = [
+            UpdateOne({"_id": _id, "version": versions.get(_id)},
+                      {"$set": {**doc, "version": versions.get(_id) or 0}}, upsert=True)
+            for _id, doc in batch
+        ]
+        try:
+            db.staff_day_slots.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            # Duplicate keys: a hook bumped (or created) the day after its version was read
+            conflicts.extend(batch[error["index"]][0] for error in errors)
+    for _id, version in versions.items():
+        # Days with nothing blocked or booked any more
+        if _id not in days and not db.staff_day_slots.delete_one({"_id": _id, "version": version}).deleted_count:
+            conflicts.append(_id)
+    return conflicts
+
+
+def rebuild_day_slots(db, since=None):
+    """
+    Recompute every staff-day from ``since`` (default today) onward. Safe on
+    live traffic: staff-days a hook writes to while it runs are recomputed,
+    up to ``REBUILD_ATTEMPTS`` rounds.
+    """
+    since = since or datetime.now().strftime("%Y-%m-%d")
+    start, end = since, None
+    written = set()
+    for _ in range(REBUILD_ATTEMPTS):
+        versions = _day_versions(db, start, end)
+        days = _compute_days(db, start, end)
+        conflicts = _write_days(db, days, versions)
+        written.update(days)
+        if not conflicts:
+            break
+        dates = [_id.split(":", 1)[1] for _id in conflicts]
+        start, end = min(dates), max(dates)
+    else:
+        print(f"[DAY SLOTS REBUILD] {len(conflicts)} staff-day(s) kept changing; run the rebuild again")
+    db.staff_day_slots.replace_one(
+        {"_id": META_ID}, {"rebuilt_at": datetime.utcnow(), "since": since, "days": len(written)}, upsert=True
+    )
+    return len(written)
+
+
+def ensure_day_slots(db, background=True):
+    """Build the masks once if they have never been built (in one process only)."""
+    if day_slots_ready(db):
+        return
+
+    def build():
+        try:
+            if not acquire_lease(db, REBUILD_LEASE, REBUILD_LEASE_SECONDS):
+                return  # another process is building them
+            try:
+                if not db.staff_day_slots.find_one({"_id": META_ID}, {"_id": 1}):
+                    rebuild_day_slots(db)
+            finally:
+                release_lease(db, REBUILD_LEASE)
+        except Exception as e:
+            print(f"[DAY SLOTS REBUILD ERROR] {e}")
+
+    if background:
+        threading.Thread(target=build, name="day-slots-rebuild", daemon=True).start()
+    else:
+        build()
+
+
+if __name__ == "__main__":
+    from backend.db import get_db
+
+    parser = argparse.ArgumentParser(description="Maintain the per staff-day slot masks.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every staff-day from today on")
+    parser.add_argument("--since", help="first day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"rebuilt {rebuild_day_slots(get_db(), args.since)} staff-day(s)")
@@ -0,0 +1,245 @@
+# /utils/email_outbox.py
+"""
+Durable email outbox.
+
+Send helpers insert a message into ``email_outbox`` and return immediately;
+a small pool of background workers claims pending messages, delivers them,
+retries failures with exponential backoff and records the outcome on the
+outbox document.
+
+Messages enqueued with ``expires_in`` (one-time codes) are short-lived: a
+failure is retried on the next poll instead of backing off, nothing is
+delivered after ``expires_at`` (the message ends up ``expired``), and the
+body is dropped once the message is sent, failed or expired.
+"""
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+from backend.db import db
+
+OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_MAX_BACKOFF_SECONDS = 3600
+OUTBOX_POLL_SECONDS = 5
+# A message stuck in "sending" longer than this (crashed worker) is retried
+OUTBOX_LEASE_SECONDS = 120
+# Worst case for one message (SMTP timeout); the API fallback adds one call
+OUTBOX_SEND_SECONDS = 10
+# Messages claimed per delivery round, delivered over one SMTP session or
+# folded into a single API call on fallback. Capped so a slow round still
+# finishes well inside the lease and is never reclaimed mid-delivery.
+OUTBOX_BATCH_SIZE = max(min(
+    int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "6")),
+    OUTBOX_LEASE_SECONDS // 2 // OUTBOX_SEND_SECONDS,
+), 1)
+
+outbox_col = db["email_outbox"]
+
+_wakeup = threading.Event()
+_stop = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+# ---------------- ENQUEUE ---------------- #
+def enqueue_email(to_email: str, subject: str, html_body: str, expires_in: int = None):
+    """
+    Persist a message for background delivery and return its outbox id.
+    ``expires_in`` (seconds) marks it short-lived; see the module docstring.
+    """
+    now = datetime.utcnow()
+    message = {
+        "to_email": to_email,
+        "subject": subject,
+        "body": html_body,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+        "last_error": None,
+    }
+    if expires_in:
+        message["expires_at"] = now + timedelta(seconds=expires_in)
+    result = outbox_col.insert_one(message)
+    _wakeup.set()
+    return result.inserted_id
+
+
+def enqueue_emails(messages):
+    """Persist many ``(to_email, subject, html_body)`` messages in one insert."""
+    if not messages:
+        return []
+    now = datetime.utcnow()
+    result = outbox_col.insert_many([
+        {
+            "to_email": to_email,
+            "subject": subject,
+            "body": html_body,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "last_error": None,
+        }
+        for to_email, subject, html_body in messages
+    ])
+    _wakeup.set()
+    return result.inserted_ids
+
+
+# ---------------- DELIVERY ---------------- #
+def _backoff(attempts: int) -> timedelta:
+    seconds = OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+def _claim_next(worker_id: str):
+    now = datetime.utcnow()
+    return outbox_col.find_one_and_update(
+        {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "sending", "lease_expires_at": {"$lte": now}},
+        ]},
+        {
+            "$set": {
+                "status": "sending",
+                "worker": worker_id,
+                "lease_expires_at": now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _owned(message, worker_id):
+    # Only the worker still holding the lease may record the outcome
+    return {"_id": message["_id"], "status": "sending", "worker": worker_id}
+
+
+def _release(message, worker_id, fields):
+    """Record the outcome and give up the lease; final states drop short-lived bodies."""
+    unset = {"lease_expires_at": "", "worker": ""}
+    if fields["status"] != "pending" and message.get("expires_at"):
+        unset["body"] = ""
+    return outbox_col.update_one(_owned(message, worker_id), {"$set": fields, "$unset": unset})
+
+
+def _record_failure(message, worker_id, error):
+    attempts = message.get("attempts", 1)
+    expires_at = message.get("expires_at")
+    now = datetime.utcnow()
+    # Short-lived messages retry on the next poll rather than backing off
+    next_attempt_at = now + (timedelta(seconds=OUTBOX_POLL_SECONDS) if expires_at else _backoff(attempts))
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        status = "failed"
+    elif expires_at and next_attempt_at >= expires_at:
+        status = "expired"
+    else:
+        status = "pending"
+    _release(message, worker_id, {"status": status, "next_attempt_at": next_attempt_at, "last_error": str(error)})
+    print(f"[EMAIL OUTBOX] {message['_id']} attempt {attempts} failed ({status}): {error}")
+
+
+def _record_sent(message, worker_id, transport):
+    result = _release(message, worker_id, {
+        "status": "sent", "sent_at": datetime.utcnow(), "transport": transport, "last_error": None,
+    })
+    if not result.modified_count:
+        print(f"[EMAIL OUTBOX] {message['_id']} sent after its lease expired")
+
+
+def _record_expired(message, worker_id):
+    _release(message, worker_id, {"status": "expired", "last_error": "expired before delivery"})
+    print(f"[EMAIL OUTBOX] {message['_id']} expired before delivery")
+
+
+def _process_batch(messages, worker_id, deliver):
+    now = datetime.utcnow()
+    expired = [m for m in messages if m.get("expires_at") and m["expires_at"] <= now]
+    for message in expired:
+        try:
+            _record_expired(message, worker_id)
+        except Exception as e:
+            print(f"[EMAIL OUTBOX] recording {message['_id']} failed: {e}")
+    messages = [m for m in messages if m not in expired]
+    if not messages:
+        return
+    try:
+        results = deliver([(m["to_email"], m["subject"], m["body"]) for m in messages])
+    except Exception as e:
+        results = [e] * len(messages)
+
+    for message, result in zip(messages, results):
+        try:
+            if isinstance(result, Exception):
+                _record_failure(message, worker_id, result)
+            else:
+                _record_sent(message, worker_id, result)
+        except Exception as e:
+            print(f"[EMAIL OUTBOX] recording {message['_id']} failed: {e}")
+
+
+def _worker_loop(deliver):
+    worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    while not _stop.is_set():
+        _wakeup.clear()
+        batch = []
+        try:
+            while len(batch) < OUTBOX_BATCH_SIZE:
+                message = _claim_next(worker_id)
+                if not message:
+                    break
+                batch.append(message)
+        except Exception as e:
+            print(f"[EMAIL OUTBOX] claim failed: {e}")
+        if batch:
+            _process_batch(batch, worker_id, deliver)
+            continue
+        _wakeup.wait(OUTBOX_POLL_SECONDS)
+
+
+# ---------------- WORKER POOL ---------------- #
+def start_workers(deliver, count: int = None):
+    """
+    Start ``count`` daemon delivery threads (once per process).
+    ``deliver(messages)`` takes ``(to_email, subject, html_body)`` tuples and
+    returns, per message, a short transport name on success or the exception
+    that made it fail.
+    """
+    count = OUTBOX_WORKERS if count is None else count
+    with _workers_lock:
+        if _workers or count <= 0:
+            return
+        _stop.clear()
+        for i in range(count):
+            t = threading.Thread(target=_worker_loop, args=(deliver,), name=f"email-outbox-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def stop_workers(timeout: float = 5):
+    with _workers_lock:
+        _stop.set()
+        _wakeup.set()
+        for t in _workers:
+            t.join(timeout)
+        _workers.clear()
+
+
+if __name__ == "__main__":
+    # Standalone delivery process: python -m backend.utils.email_outbox
+    from backend.utils.email_utils import _deliver_html_emails
+
+    start_workers(_deliver_html_emails, max(OUTBOX_WORKERS, 1))
+    try:
+        while True:
+            _stop.wait(60)
+    except KeyboardInterrupt:
+        stop_workers()
@@ -0,0 +1,172 @@
+# /utils/email_transport.py
+"""
+Persistent email transports.
+
+``SMTPPool`` keeps authenticated SMTP sessions open and reuses them across
+sends, reconnecting when the server has dropped one. ``BrevoHTTPTransport``
+talks to the Brevo HTTP API over a keep-alive session with bounded timeouts
+and folds many messages into one call using ``messageVersions``.
+"""
+import queue
+import smtplib
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
+# Brevo accepts up to 1000 message versions per call
+BREVO_MAX_BATCH = 1000
+
+
+# ---------------- SMTP ---------------- #
+class SMTPPool:
+    """A small LIFO pool of logged-in ``smtplib.SMTP`` connections."""
+
+    def __init__(self, host, port, login, password, size=2, timeout=10, idle_check_seconds=30):
+        self.host = host
+        self.port = port
+        self.login = login
+        self.password = password
+        self.timeout = timeout
+        self.idle_check_seconds = idle_check_seconds
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.starttls()
+            server.login(self.login, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _checkout(self):
+        try:
+            server, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        # Servers silently drop idle sessions; probe before reusing an old one
+        if time.monotonic() - last_used > self.idle_check_seconds:
+            try:
+                if server.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("noop failed")
+            except Exception:
+                self._close(server)
+                return self._connect()
+        return server
+
+    def _checkin(self, server):
+        self._idle.put((server, time.monotonic()))
+
+    def send(self, msg):
+        """Send one ``email.message.Message``, reconnecting once if the session died."""
+        with self._slots:
+            server = self._checkout()
+            try:
+                server.send_message(msg)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server answered and refused; a new session won't help
+                self._close(server)
+                raise
+            except OSError:
+                # Dropped session: reconnect and retry once
+                self._close(server)
+                server = self._connect()
+                try:
+                    server.send_message(msg)
+                except Exception:
+                    self._close(server)
+                    raise
+            except Exception:
+                self._close(server)
+                raise
+            self._checkin(server)
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+
+# ---------------- BREVO HTTP API ---------------- #
+class BrevoHTTPTransport:
+    """Keep-alive client for Brevo's transactional email endpoint."""
+
+    def __init__(self, api_key, sender_email, sender_name, connect_timeout=3.05, read_timeout=10, pool_size=4):
+        self.sender = {"name": sender_name, "email": sender_email}
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update({
+            "api-key": api_key or "",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def _post(self, payload):
+        response = self.session.post(BREVO_API_URL, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def send(self, to_email, subject, html_body):
+        self._post({
+            "sender": self.sender,
+            "to": [{"email": to_email}],
+            "subject": subject,
+            "htmlContent": html_body,
+        })
+
+    def send_batch(self, messages):
+        """
+        Send ``(to_email, subject, html_body)`` tuples in as few API calls as
+        possible. Returns one entry per message: None on success or the
+        exception that failed its chunk.
+        """
+        results = []
+        for start in range(0, len(messages), BREVO_MAX_BATCH):
+            chunk = messages[start:start + BREVO_MAX_BATCH]
+            if len(chunk) == 1:
+                payload = {
+                    "sender": self.sender,
+                    "to": [{"email": chunk[0][0]}],
+                    "subject": chunk[0][1],
+                    "htmlContent": chunk[0][2],
+                }
+            else:
+                # Base subject/body are required; each version overrides them
+                payload = {
+                    "sender": self.sender,
+                    "subject": chunk[0][1],
+                    "htmlContent": chunk[0][2],
+                    "messageVersions": [
+                        {"to": [{"email": to}], "subject": subject, "htmlContent": html}
+                        for to, subject, html in chunk
+                    ],
+                }
+            try:
+                self._post(payload)
+                results.extend([None] * len(chunk))
+            except requests.exceptions.RequestException as e:
+                results.extend([e] * len(chunk))
+        return results
+
+    def close(self):
+        self.session.close()
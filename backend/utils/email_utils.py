@@ -1,10 +1,11 @@
-import smtplib
-import requests
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import os
 from dotenv import load_dotenv
 from backend.db import db
+from backend.metrics import EMAIL_DELIVERIES
+from backend.utils.email_outbox import enqueue_email, enqueue_emails, start_workers
+from backend.utils.email_transport import SMTPPool, BrevoHTTPTransport
 from datetime import datetime
 
 load_dotenv()
@@ -19,6 +20,12 @@ SMTP_PORT = int(os.getenv("BREVO_SMTP_PORT", "587"))
 # API config
 BREVO_API_KEY = os.getenv("BREVO_API_KEY")
 
+SENDER_NAME = "Marmu Barber & Tattoo Shop"
+SMTP_POOL_SIZE = int(os.getenv("EMAIL_SMTP_POOL_SIZE", "2"))
+
+_smtp_pool = SMTPPool(SMTP_SERVER, SMTP_PORT, BREVO_SMTP_LOGIN, BREVO_SMTP_KEY, size=SMTP_POOL_SIZE)
+_brevo_api = BrevoHTTPTransport(BREVO_API_KEY, SENDER_EMAIL, SENDER_NAME)
+
 def log_email(to_email, subject, html_body):
     db.emails.insert_one({
         "to_email": to_email,
@@ -27,43 +34,65 @@ def log_email(to_email, subject, html_body):
         "sent_at": datetime.utcnow()
     })
 
-def _send_html_email(to_email: str, subject: str, html_body: str):
-    # Try SMTP first
-    try:
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = f"Marmu Barber & Tattoo Shop <{SENDER_EMAIL}>"
-        msg["To"] = to_email
-        msg.attach(MIMEText(html_body, "html"))
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=10) as server:
-            server.starttls()
-            server.login(BREVO_SMTP_LOGIN, BREVO_SMTP_KEY)
-            server.send_message(msg)
-
-        log_email(to_email, subject, html_body)
-        return
-    except Exception as smtp_error:
-        print(f"[SMTP ERROR] {smtp_error}")
-
-    # Fallback to Brevo API
-    try:
-        url = "https://api.brevo.com/v3/smtp/email"
-        headers = {
-            "api-key": BREVO_API_KEY,
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "sender": {"name": "Marmu Barber & Tattoo Shop", "email": SENDER_EMAIL},
-            "to": [{"email": to_email}],
-            "subject": subject,
-            "htmlContent": html_body
-        }
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        log_email(to_email, subject, html_body)
-    except requests.exceptions.RequestException as api_error:
-        print(f"[BREVO API ERROR] {api_error}")
+def _build_message(to_email: str, subject: str, html_body: str):
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = f"{SENDER_NAME} <{SENDER_EMAIL}>"
+    msg["To"] = to_email
+    msg.attach(MIMEText(html_body, "html"))
+    return msg
+
+def _deliver_html_emails(messages):
+    """
+    Deliver ``(to_email, subject, html_body)`` tuples now. Each goes over a
+    pooled SMTP session first; whatever SMTP could not send is batched into
+    Brevo API calls. Returns the transport name or the exception per message.
+    """
+    results = [None] * len(messages)
+    fallback = []
+    for i, (to_email, subject, html_body) in enumerate(messages):
+        try:
+            _smtp_pool.send(_build_message(to_email, subject, html_body))
+            results[i] = "smtp"
+            EMAIL_DELIVERIES.inc(("smtp", "sent"))
+        except Exception as smtp_error:
+            print(f"[SMTP ERROR] {smtp_error}")
+            EMAIL_DELIVERIES.inc(("smtp", "failed"))
+            fallback.append(i)
+
+    if fallback:
+        api_results = _brevo_api.send_batch([messages[i] for i in fallback])
+        for i, api_error in zip(fallback, api_results):
+            if api_error is None:
+                results[i] = "api"
+                EMAIL_DELIVERIES.inc(("api", "sent"))
+            else:
+                print(f"[BREVO API ERROR] {api_error}")
+                EMAIL_DELIVERIES.inc(("api", "failed"))
+                results[i] = api_error
+
+    sent = [
+        {"to_email": to_email, "subject": subject, "body": html_body, "sent_at": datetime.utcnow()}
+        for (to_email, subject, html_body), r in zip(messages, results)
+        if isinstance(r, str)
+    ]
+    if sent:
+        db.emails.insert_many(sent)
+    return results
+
+def _deliver_html_email(to_email: str, subject: str, html_body: str) -> str:
+    """Deliver one message now; returns the transport used, raises if both fail."""
+    result = _deliver_html_emails([(to_email, subject, html_body)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def _send_html_email(to_email: str, subject: str, html_body: str, expires_in: int = None):
+    # Queue for the outbox workers; request handlers never wait on SMTP/HTTP
+    return enqueue_email(to_email, subject, html_body, expires_in)
+
+def start_email_workers(count: int = None):
+    start_workers(_deliver_html_emails, count)
 
 def send_email_otp(email: str, subject: str, otp: str, expiry_minutes: int = 5):
     html_body = f"""
@@ -82,7 +111,8 @@ def send_email_otp(email: str, subject: str, otp: str, expiry_minutes: int = 5):
     </body>
     </html>
     """
-    _send_html_email(email, subject, html_body)
+    # Never delivered after the code expires; the body is dropped once done
+    return _send_html_email(email, subject, html_body, expires_in=expiry_minutes * 60)
 
 def send_feedback_reply_email(to_email: str, username: str, reply: str):
     subject = "Reply to Your Feedback - Marmu Barber & Tattoo Shop"
@@ -102,7 +132,7 @@ def send_feedback_reply_email(to_email: str, username: str, reply: str):
     """
     _send_html_email(to_email, subject, html_body)
 
-def send_appointment_status_email(email, fullname, status, service=None, appointment_date=None, time=None, artist_name=None):
+def _appointment_status_message(fullname, status, service=None, appointment_date=None, time=None, artist_name=None):
     subject = f"Your Appointment has been {status}"
     color = "#28a745" if str(status).lower() == "approved" else "#d9534f"
     html_body = f"""
@@ -122,4 +152,22 @@ def send_appointment_status_email(email, fullname, status, service=None, appoint
     </body>
     </html>
     """
+    return subject, html_body
+
+def send_appointment_status_email(email, fullname, status, service=None, appointment_date=None, time=None, artist_name=None):
+    subject, html_body = _appointment_status_message(fullname, status, service, appointment_date, time, artist_name)
     _send_html_email(email, subject, html_body)
+
+def send_appointment_status_emails(notifications):
+    """
+    Queue many status emails in one outbox insert. Each notification is a
+    dict with ``email``, ``fullname``, ``status`` and the optional fields of
+    ``send_appointment_status_email``.
+    """
+    messages = []
+    for n in notifications:
+        subject, html_body = _appointment_status_message(
+            n["fullname"], n["status"], n.get("service"), n.get("appointment_date"), n.get("time"), n.get("artist_name"),
+        )
+        messages.append((n["email"], subject, html_body))
+    return enqueue_emails(messages)
@@ -0,0 +1,61 @@
+# /utils/feedback_feed.py
+"""
+Cached pages of the public feedback feed.
+
+Pages are cached per ``(limit, cursor)`` in-process; ``post_feedback`` and
+the admin reply/resolve endpoints call ``invalidate_feedback_feed``.
+"""
+import os
+from datetime import datetime
+
+from backend.utils.cache import TTLCache
+from backend.utils.pagination import paginate
+from backend.utils.stats import get_dashboard_stats, rating_summary
+
+FEED_DEFAULT_LIMIT = 20
+FEED_MAX_LIMIT = 100
+FEED_SORT = [("date_submitted", -1)]
+
+feed_cache = TTLCache(maxsize=256, ttl=int(os.getenv("FEEDBACK_FEED_CACHE_TTL", "60")))
+
+
+def invalidate_feedback_feed():
+    feed_cache.clear()
+
+
+def _public_item(f):
+    f.pop("_id", None)
+    if isinstance(f.get("date_submitted"), datetime):
+        f["date"] = f["date_submitted"].strftime("%Y-%m-%d %H:%M")
+    else:
+        f["date"] = f.get("date_submitted", "")
+    f.pop("date_submitted", None)
+    return f
+
+
+def get_feed_page(db, limit=FEED_DEFAULT_LIMIT, cursor=None):
+    """Returns ``(items, next_cursor)``; raises pagination.InvalidCursor."""
+    key = ("page", limit, cursor)
+    cached = feed_cache.get(key)
+    if cached is None:
+        docs, meta = paginate(db.feedback, {}, FEED_SORT, limit, cursor=cursor, total_mode="none")
+        cached = ([_public_item(f) for f in docs], meta["next_cursor"])
+        feed_cache.set(key, cached)
+    return cached
+
+
+def get_full_feed(db):
+    """The legacy un-paginated list, cached like any other page."""
+    cached = feed_cache.get(("all",))
+    if cached is None:
+        cached = [_public_item(f) for f in db.feedback.find({}).sort(FEED_SORT)]
+        feed_cache.set(("all",), cached)
+    return cached
+
+
+def get_rating_summary(db):
+    cached = feed_cache.get(("summary",))
+    if cached is None:
+        cached = rating_summary(get_dashboard_stats(db))
+        feed_cache.set(("summary",), cached)
+    return cached
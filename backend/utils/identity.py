@@ -0,0 +1,62 @@
+# /utils/identity.py
+"""
+Username -> account + client profile, resolved in one aggregation and cached.
+
+Entries live for ``IDENTITY_CACHE_TTL`` seconds per worker process; routes
+that change an account (password, profile, role) call ``invalidate_identity``
+so this worker drops its entry immediately. Unknown usernames are not cached.
+"""
+import os
+
+from backend.utils.cache import TTLCache
+
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "300"))
+
+identity_cache = TTLCache(maxsize=4096, ttl=IDENTITY_CACHE_TTL)
+
+
+def _load_identity(db, username):
+    rows = list(db.tbl_accounts.aggregate([
+        {"$match": {"username": username}},
+        {"$limit": 1},
+        {"$lookup": {"from": "clients", "localField": "_id", "foreignField": "account_id", "as": "client"}},
+        {"$project": {
+            "username": 1,
+            "email": 1,
+            "role": 1,
+            "fullname": 1,
+            "client": {"$arrayElemAt": ["$client", 0]},
+        }},
+    ]))
+    if not rows:
+        return None
+    account = rows[0]
+    client = account.get("client") or {}
+    return {
+        "account_id": account["_id"],
+        "client_id": client.get("_id"),
+        "username": account.get("username"),
+        "email": account.get("email"),
+        "role": account.get("role"),
+        "fullname": account.get("fullname") or client.get("fullname") or "",
+    }
+
+
+def resolve_identity(db, username):
+    """
+    ``{account_id, client_id, username, email, role, fullname}`` or None.
+    ``client_id`` is None for accounts without a client profile. The dict is
+    shared with the cache, so callers must not modify it.
+    """
+    if not username:
+        return None
+    identity = identity_cache.get(username)
+    if identity is None:
+        identity = _load_identity(db, username)
+        if identity is not None:
+            identity_cache.set(username, identity)
+    return identity
+
+
+def invalidate_identity(username):
+    identity_cache.pop(username)
@@ -0,0 +1,101 @@
+# /utils/image_variants.py
+"""
+Resized / re-encoded image variants (``?w=320&fmt=webp``) with a disk cache.
+
+Variants are generated on first request from an allow-listed set of widths
+and formats, written to ``IMAGE_VARIANT_CACHE_DIR`` under the source file's
+content hash, and evicted least-recently-used once the cache grows past
+``IMAGE_VARIANT_CACHE_MB``. Without Pillow installed, callers get None and
+serve the original file.
+"""
+import os
+import threading
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.getenv("IMAGE_VARIANT_CACHE_DIR", os.path.abspath(os.path.join(BASE_DIR, "../.cache/image_variants")))
+CACHE_MAX_BYTES = int(os.getenv("IMAGE_VARIANT_CACHE_MB", "200")) * 1024 * 1024
+
+ALLOWED_WIDTHS = (160, 320, 640, 960)
+# fmt query value -> (Pillow format, mimetype, file extension, save options)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "jpg": ("JPEG", "image/jpeg", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "png": ("PNG", "image/png", "png", {"optimize": True}),
+}
+SRCSET_FORMAT = "webp"
+
+_generate_lock = threading.Lock()
+
+
+def variants_enabled():
+    return Image is not None
+
+
+def variant_name(file_hash, width, fmt):
+    return f"{file_hash}.w{width}.{FORMATS[fmt][2]}"
+
+
+def _evict():
+    """Delete least-recently-used variants until the cache fits its budget."""
+    files = []
+    total = 0
+    for entry in os.scandir(CACHE_DIR):
+        if entry.is_file() and not entry.name.endswith(".tmp"):
+            st = entry.stat()
+            files.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    for _, size, path in sorted(files):
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _render(source_path, target_path, width, fmt):
+    pil_format, _, _, options = FORMATS[fmt]
+    with Image.open(source_path) as img:
+        img.load()
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS)
+        if pil_format == "JPEG" and img.mode in ("RGBA", "LA", "P"):
+            rgba = img.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[-1])
+            img = background
+        tmp_path = f"{target_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, pil_format, **options)
+    os.replace(tmp_path, target_path)
+
+
+def get_variant(source_path, file_hash, width, fmt):
+    """
+    Path to the cached variant, generating it if needed. Returns None when
+    Pillow is unavailable. ``width``/``fmt`` must be allow-listed.
+    """
+    if Image is None:
+        return None
+    name = variant_name(file_hash, width, fmt)
+    path = os.path.join(CACHE_DIR, name)
+    if os.path.exists(path):
+        # mtime is the LRU clock for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+    with _generate_lock:
+        if not os.path.exists(path):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _render(source_path, path, width, fmt)
+            _evict()
+    return path
@@ -0,0 +1,41 @@
+# /utils/leases.py
+"""
+Named leases in the ``leases`` collection.
+
+Background jobs that must run in only one process (periodic reconciles,
+one-off rebuilds) take a lease first. A lease is held by one owner until it
+is released or ``expires_at`` passes, after which any process may take it
+over; long jobs call ``acquire_lease`` again to renew it.
+"""
+import os
+import socket
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+def process_owner() -> str:
+    """Owner id for this process (re-evaluated after a fork)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(db, name: str, seconds: int, owner: str = None) -> bool:
+    """Take or renew lease ``name`` for ``seconds``; False if someone else holds it."""
+    owner = owner or process_owner()
+    now = datetime.utcnow()
+    try:
+        doc = db.leases.find_one_and_update(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+            {"$set": {"owner": owner, "acquired_at": now, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # The lease exists and is held by another owner, so the upsert collided
+        return False
+    return bool(doc) and doc.get("owner") == owner
+
+
+def release_lease(db, name: str, owner: str = None):
+    db.leases.delete_one({"_id": name, "owner": owner or process_owner()})
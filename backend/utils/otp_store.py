@@ -0,0 +1,135 @@
+# /utils/otp_store.py
+"""
+One-time codes shared by the signup and password-reset flows.
+
+Codes are namespaced by purpose (``signup``, ``reset``) and expire after
+``OTP_EXPIRY_MINUTES``. ``verify_and_consume`` checks and deletes a code in
+one step, so a code can be used at most once even when two workers race.
+Each wrong guess is counted; after ``OTP_MAX_ATTEMPTS`` the code is dead and
+a new one has to be requested. A caller that cannot finish after consuming
+a code hands the returned record to ``restore``, which puts it back with its
+original expiry and attempt count.
+
+``OTP_STORE=mongo`` (the default) keeps codes in ``otp_codes`` with a TTL
+index, shared by every worker process; ``OTP_STORE=memory`` keeps them in
+the current process only (single-worker / local development).
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.utils.cache import TTLCache
+
+OTP_EXPIRY_MINUTES = int(os.getenv("OTP_EXPIRY_MINUTES", "5"))
+OTP_STORE = os.getenv("OTP_STORE", "mongo").lower()
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+
+PURPOSE_SIGNUP = "signup"
+PURPOSE_RESET = "reset"
+
+
+def generate_otp() -> str:
+    return str(random.SystemRandom().randint(100000, 999999))
+
+
+class MemoryOTPStore:
+    """Per-process store; expired codes are evicted by the TTL cache."""
+
+    def __init__(self, maxsize=10000):
+        self._codes = TTLCache(maxsize=maxsize, ttl=OTP_EXPIRY_MINUTES * 60)
+        self._lock = threading.Lock()
+
+    def put(self, purpose, key, code, ttl_minutes=OTP_EXPIRY_MINUTES):
+        self._codes.purge_expired()
+        # [code, failed attempts, monotonic expiry]
+        self._codes.set((purpose, key), [code, 0, time.monotonic() + ttl_minutes * 60], ttl=ttl_minutes * 60)
+
+    def verify_and_consume(self, purpose, key, code):
+        """The consumed record if ``code`` matches, else None."""
+        with self._lock:
+            entry = self._codes.get((purpose, key))
+            if entry is None:
+                return None
+            if code and entry[0] == code:
+                self._codes.pop((purpose, key))
+                return entry
+            entry[1] += 1
+            if entry[1] >= OTP_MAX_ATTEMPTS:
+                self._codes.pop((purpose, key))
+            return None
+
+    def restore(self, purpose, key, record):
+        """Put a consumed record back unless it expired or a new code was issued."""
+        ttl = record[2] - time.monotonic()
+        with self._lock:
+            if ttl > 0 and self._codes.get((purpose, key)) is None:
+                self._codes.set((purpose, key), record, ttl=ttl)
+
+
+class MongoOTPStore:
+    """Shared store; MongoDB's TTL monitor deletes expired documents."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def put(self, purpose, key, code, ttl_minutes=OTP_EXPIRY_MINUTES):
+        now = datetime.utcnow()
+        self.collection.replace_one(
+            {"_id": f"{purpose}:{key}"},
+            {"code": code, "attempts": 0, "created_at": now, "expires_at": now + timedelta(minutes=ttl_minutes)},
+            upsert=True,
+        )
+
+    def verify_and_consume(self, purpose, key, code):
+        """The consumed document if ``code`` matches, else None."""
+        _id = f"{purpose}:{key}"
+        now = datetime.utcnow()
+        # The TTL monitor runs about once a minute, so expiry is checked here too
+        consumed = code and self.collection.find_one_and_delete({
+            "_id": _id,
+            "code": code,
+            "expires_at": {"$gt": now},
+            "attempts": {"$lt": OTP_MAX_ATTEMPTS},
+        })
+        if consumed:
+            return consumed
+        doc = self.collection.find_one_and_update(
+            {"_id": _id, "expires_at": {"$gt": now}},
+            {"$inc": {"attempts": 1}},
+            projection={"attempts": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc and doc["attempts"] >= OTP_MAX_ATTEMPTS:
+            self.collection.delete_one({"_id": _id, "attempts": {"$gte": OTP_MAX_ATTEMPTS}})
+        return None
+
+    def restore(self, purpose, key, record):
+        """Put a consumed document back unless it expired or a new code was issued."""
+        if record["expires_at"] <= datetime.utcnow():
+            return
+        try:
+            self.collection.insert_one(record)
+        except DuplicateKeyError:
+            pass  # a newer code was sent in the meantime
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store():
+    """The configured store (``OTP_STORE``), created on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if OTP_STORE == "memory":
+                _store = MemoryOTPStore()
+            else:
+                from backend.db import db
+                _store = MongoOTPStore(db["otp_codes"])
+    return _store
@@ -0,0 +1,191 @@
+# /utils/pagination.py
+"""
+Keyset (cursor) pagination for the admin list endpoints.
+
+A cursor is an opaque token holding the sort-key values and ``_id`` of the
+last row of the previous page, so the next page is an index seek instead of
+a ``skip``. Totals can be exact, estimated/cached, or skipped entirely.
+"""
+import base64
+from datetime import datetime
+
+from bson import ObjectId, json_util
+from bson.decimal128 import Decimal128
+from bson.timestamp import Timestamp
+
+from backend.utils.cache import TTLCache
+
+TOTAL_MODES = ("exact", "estimate", "none")
+
+# Counts for "estimate" mode, shared per process
+_count_cache = TTLCache(maxsize=512, ttl=60)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _with_tiebreak(sort_order):
+    # _id follows the last key's direction so an index ending in _id can be
+    # walked in either direction
+    sort_order = list(sort_order)
+    if not any(field == "_id" for field, _ in sort_order):
+        sort_order.append(("_id", sort_order[-1][1] if sort_order else 1))
+    return sort_order
+
+
+def _signature(sort_order):
+    return ",".join(f"{field}:{direction}" for field, direction in sort_order)
+
+
+def _lookup(doc, field):
+    value = doc
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+# ---------------- CURSOR TOKENS ---------------- #
+def encode_cursor(sort_order, doc) -> str:
+    payload = {"s": _signature(sort_order), "v": [_lookup(doc, f) for f, _ in sort_order]}
+    raw = json_util.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(sort_order, token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json_util.loads(raw.decode("utf-8"))
+    except Exception as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if not isinstance(payload, dict) or payload.get("s") != _signature(sort_order):
+        raise InvalidCursor("Cursor does not match the requested sort")
+    values = payload.get("v")
+    if not isinstance(values, list) or len(values) != len(sort_order):
+        raise InvalidCursor("Malformed cursor")
+    return values
+
+
+# BSON types in MongoDB's cross-type sort order (null/missing first). ``$gt``
+# and ``$lt`` only compare within one bracket, so rows of a later (or, when
+# descending, earlier) bracket are matched by ``$type`` instead.
+_TYPE_BRACKETS = (
+    ("null", "undefined"),
+    ("double", "int", "long", "decimal"),
+    ("string", "symbol"),
+    ("object",),
+    ("array",),
+    ("binData",),
+    ("objectId",),
+    ("bool",),
+    ("date",),
+    ("timestamp",),
+    ("regex",),
+)
+
+
+def _type_rank(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 7
+    if isinstance(value, (int, float, Decimal128)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, (list, tuple)):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, ObjectId):
+        return 6
+    if isinstance(value, datetime):
+        return 8
+    if isinstance(value, Timestamp):
+        return 9
+    return 10
+
+
+def _after(field, direction, value):
+    """Clauses matching ``field`` strictly after ``value`` in ``direction``."""
+    rank = _type_rank(value)
+    if direction == 1:
+        clauses = [{field: {"$gt": value}}] if rank else []
+        later = [t for bracket in _TYPE_BRACKETS[rank + 1:] for t in bracket]
+        if later:
+            clauses.append({field: {"$type": later}})
+        return clauses
+    if not rank:
+        return []  # nothing sorts before null/missing
+    clauses = [{field: {"$lt": value}}]
+    earlier = [t for bracket in _TYPE_BRACKETS[1:rank] for t in bracket]
+    if earlier:
+        clauses.append({field: {"$type": earlier}})
+    clauses.append({field: None})  # null or missing
+    return clauses
+
+
+def keyset_filter(sort_order, values):
+    """
+    Rows strictly after ``values`` in ``sort_order``. Null/missing values and
+    values of different BSON types (e.g. ``appointment_date`` stored both as
+    a string and as a date) follow MongoDB's sort order.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort_order):
+        # {field: None} also matches a missing field, which sorts like null
+        prefix = {f: values[j] for j, (f, _) in enumerate(sort_order[:i])}
+        for after in _after(field, direction, values[i]):
+            clauses.append({**prefix, **after})
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+
+# ---------------- TOTALS ---------------- #
+def count_total(collection, query, mode="exact"):
+    """Returns ``(total, is_estimate)``; total is None in "none" mode."""
+    if mode == "none":
+        return None, False
+    if mode == "estimate":
+        if not query:
+            return collection.estimated_document_count(), True
+        key = (collection.full_name, json_util.dumps(query, sort_keys=True))
+        total = _count_cache.get(key)
+        if total is None:
+            total = collection.count_documents(query)
+            _count_cache.set(key, total)
+        return total, True
+    return collection.count_documents(query), False
+
+
+# ---------------- PAGINATE ---------------- #
+def paginate(collection, query, sort_order, per_page, cursor=None, page=1, projection=None, total_mode="exact"):
+    """
+    Fetch one page. With ``cursor`` the page starts after the cursor row;
+    without it, falls back to ``page``-based skip for compatibility.
+
+    Returns ``(docs, meta)`` where meta has total, total_is_estimate and
+    next_cursor (None on the last page). Raises InvalidCursor.
+    """
+    sort_order = _with_tiebreak(sort_order)
+    find_query = query
+    skip = 0
+    if cursor:
+        after = keyset_filter(sort_order, decode_cursor(sort_order, cursor))
+        find_query = {"$and": [query, after]} if query else after
+    else:
+        skip = max(page - 1, 0) * per_page
+
+    docs = list(
+        collection.find(find_query, projection).sort(sort_order).skip(skip).limit(per_page + 1)
+    )
+    has_more = len(docs) > per_page
+    docs = docs[:per_page]
+
+    total, is_estimate = count_total(collection, query, total_mode)
+    return docs, {
+        "total": total,
+        "total_is_estimate": is_estimate,
+        "next_cursor": encode_cursor(sort_order, docs[-1]) if has_more and docs else None,
+    }
@@ -0,0 +1,65 @@
+# /utils/profiles.py
+"""
+Account -> profile (clients / tbl_staff / admins) resolution in bulk, and
+the denormalized ``tbl_accounts.fullname`` field that makes name sorting work.
+"""
+from pymongo import UpdateOne
+
+# role (lowercase) -> collection holding that role's profile
+PROFILE_COLLECTIONS = {
+    "user": "clients",
+    "client": "clients",
+    "barber": "tbl_staff",
+    "tattooartist": "tbl_staff",
+    "admin": "admins",
+}
+
+
+def profile_collection(role):
+    return PROFILE_COLLECTIONS.get((role or "").lower())
+
+
+def resolve_fullnames(db, accounts):
+    """
+    Map account ``_id`` -> profile fullname for every account that has no
+    denormalized ``fullname``, using one ``$in`` query per profile collection.
+    """
+    ids_by_collection = {}
+    for account in accounts:
+        if account.get("fullname"):
+            continue
+        collection = profile_collection(account.get("role"))
+        if collection:
+            ids_by_collection.setdefault(collection, []).append(account["_id"])
+
+    names = {}
+    for collection, ids in ids_by_collection.items():
+        for doc in db[collection].find({"account_id": {"$in": ids}}, {"account_id": 1, "fullname": 1}):
+            names.setdefault(doc["account_id"], doc.get("fullname") or "")
+    return names
+
+
+def backfill_account_fullnames(db, batch_size=500):
+    """Copy profile fullnames onto accounts that do not have one yet."""
+    cursor = db.tbl_accounts.find({"fullname": {"$exists": False}}, {"role": 1}).batch_size(batch_size)
+    batch = []
+    updated = 0
+    for account in cursor:
+        batch.append(account)
+        if len(batch) >= batch_size:
+            updated += _write_fullnames(db, batch)
+            batch = []
+    if batch:
+        updated += _write_fullnames(db, batch)
+    return updated
+
+
+def _write_fullnames(db, accounts):
+    names = resolve_fullnames(db, accounts)
+    ops = [
+        UpdateOne({"_id": a["_id"]}, {"$set": {"fullname": names.get(a["_id"], "")}})
+        for a in accounts
+    ]
+    if not ops:
+        return 0
+    return db.tbl_accounts.bulk_write(ops, ordered=False).modified_count
@@ -0,0 +1,176 @@
+# /utils/rate_limit.py
+"""
+Token-bucket rate limiting for the auth endpoints.
+
+Each limited route gets a bucket per client IP (``request.remote_addr``,
+already resolved from ``X-Forwarded-For`` by ``ProxyFix``) and optionally
+one per identifier from the request body (username / email). A request
+spends one token from every bucket; an empty bucket answers 429 with
+``Retry-After``.
+
+A bucket shared by every caller of an identifier lets anyone lock that
+account out by spending its tokens. Login therefore keys its identifier
+bucket by (username, IP): strangers cannot exhaust the owner's bucket, at
+the cost that a guesser spread over many IPs is only held back by the
+per-IP limits. The OTP buckets stay per identifier, since they also cap
+the mail sent to one address.
+
+``RATE_LIMIT_STORE=mongo`` (the default) keeps buckets in ``rate_limits`` so
+every worker shares them, updated atomically with a pipeline update;
+``RATE_LIMIT_STORE=memory`` keeps them per process. Limits are
+``"<requests>/<seconds>"`` strings, overridable per bucket via env, e.g.
+``RATE_LIMIT_LOGIN_IP=20/60``.
+"""
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import jsonify, request
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from backend.utils.cache import TTLCache
+
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "mongo").lower()
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+
+
+def parse_limit(spec: str):
+    """``"10/60"`` -> ``(capacity=10, refill tokens per second=10/60)``."""
+    count, seconds = spec.split("/", 1)
+    return int(count), int(count) / float(seconds)
+
+
+def _limit(name, default):
+    return parse_limit(os.getenv(f"RATE_LIMIT_{name.upper()}", default))
+
+
+LIMITS = {
+    "login_ip": _limit("login_ip", "20/60"),
+    # Per (username, IP); see the module docstring
+    "login_identifier": _limit("login_identifier", "10/300"),
+    "otp_ip": _limit("otp_ip", "5/600"),
+    "otp_identifier": _limit("otp_identifier", "3/600"),
+    "otp_verify_ip": _limit("otp_verify_ip", "20/600"),
+    "otp_verify_identifier": _limit("otp_verify_identifier", "10/600"),
+}
+
+
+# ---------------- STORES ---------------- #
+class MemoryBucketStore:
+    """Per-process buckets; an idle bucket expires once it would be full again."""
+
+    def __init__(self, maxsize=50000):
+        self._buckets = TTLCache(maxsize=maxsize, ttl=3600)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        """``(allowed, retry_after_seconds)``"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets.set(key, (tokens, now), ttl=capacity / rate)
+        return allowed, 0 if allowed else (cost - tokens) / rate
+
+
+class MongoBucketStore:
+    """Shared buckets, refilled and spent in a single atomic update."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def take(self, key, capacity, rate, cost=1):
+        now = datetime.utcnow()
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        doc = self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [
+                        capacity,
+                        {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed, rate]}]},
+                    ]},
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=capacity / rate),
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["allowed"]:
+            return True, 0
+        return False, (cost - doc["tokens"]) / rate
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            if RATE_LIMIT_STORE == "memory":
+                _store = MemoryBucketStore()
+            else:
+                from backend.db import db
+                _store = MongoBucketStore(db["rate_limits"])
+    return _store
+
+
+# ---------------- DECORATOR ---------------- #
+def _identifier(field):
+    data = request.get_json(silent=True) or {}
+    value = data.get(field)
+    return str(value).strip().lower() if value else None
+
+
+def rate_limit(name, ip_limit, identifier_field=None, identifier_limit=None, identifier_per_ip=False):
+    """
+    Limit a route per client IP and, when ``identifier_field`` is given, per
+    value of that JSON body field (per value and client IP with
+    ``identifier_per_ip``). Store errors fail open.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED or request.method == "OPTIONS":
+                return view(*args, **kwargs)
+
+            buckets = [(f"{name}:ip:{request.remote_addr}", LIMITS[ip_limit])]
+            if identifier_field:
+                ident = _identifier(identifier_field)
+                if ident:
+                    key = f"{name}:id:{ident}:{request.remote_addr}" if identifier_per_ip else f"{name}:id:{ident}"
+                    buckets.append((key, LIMITS[identifier_limit]))
+
+            store = get_bucket_store()
+            retry_after = 0
+            for key, (capacity, rate) in buckets:
+                try:
+                    allowed, wait = store.take(key, capacity, rate)
+                except PyMongoError as e:
+                    print(f"[RATE LIMIT ERROR] {e}")
+                    continue
+                if not allowed:
+                    retry_after = max(retry_after, wait)
+
+            if retry_after:
+                message = "Too many requests, please try again later"
+                return (
+                    jsonify({"success": False, "error": message, "message": message}),
+                    429,
+                    {"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
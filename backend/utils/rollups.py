@@ -0,0 +1,359 @@
+# /utils/rollups.py
+"""
+Daily appointment rollups.
+
+One ``appointment_rollups`` document per day (``_id`` = ``YYYY-MM-DD``)
+holds appointment counts broken down by service, artist and status. Write
+paths ``$inc`` the affected day; reports for any range sum the day buckets
+instead of scanning ``appointments``.
+
+Each hook also bumps the day's ``version``. Rebuilds ``$set`` a recomputed
+day only if its version is unchanged since they started, so increments that
+land mid-rebuild are never lost; conflicting days are recomputed. Recent
+days are reconciled periodically by whichever process holds the lease.
+
+    python -m backend.utils.rollups --rebuild                    # recompute from scratch
+    python -m backend.utils.rollups --rebuild --since 2025-01-01
+"""
+import argparse
+import os
+import threading
+from datetime import date as date_cls, datetime, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from backend.utils.leases import acquire_lease, release_lease
+
+META_ID = "_meta"
+REBUILD_LEASE = "rollups-rebuild"
+REBUILD_LEASE_SECONDS = 900
+REBUILD_ATTEMPTS = 3
+RECONCILE_LEASE = "rollups-reconciler"
+ROLLUP_RECONCILE_SECONDS = int(os.getenv("ROLLUP_RECONCILE_SECONDS", "3600"))
+# Days back from today covered by the periodic reconcile (future days always are)
+ROLLUP_RECONCILE_DAYS = int(os.getenv("ROLLUP_RECONCILE_DAYS", "35"))
+
+_reconciler = None
+_stop = threading.Event()
+_reconciler_lock = threading.Lock()
+
+
+# ---------------- KEYS ---------------- #
+def _field(value, default="unknown") -> str:
+    # Field names may not contain "." or start with "$"
+    return (str(value).strip() if value else default).replace(".", "_").lstrip("$") or default
+
+
+def day_key(appointment_date):
+    """``YYYY-MM-DD`` for a stored appointment_date (string or date), else None."""
+    if isinstance(appointment_date, (datetime, date_cls)):
+        return appointment_date.strftime("%Y-%m-%d")
+    if isinstance(appointment_date, str) and len(appointment_date) >= 10:
+        return appointment_date[:10]
+    return None
+
+
+def service_key(service) -> str:
+    return _field((service or "").lower())
+
+
+def artist_key(artist_id) -> str:
+    return str(artist_id) if artist_id else "unassigned"
+
+
+def _cell_path(service, artist, status) -> str:
+    return f"cells.{service}.{artist}.{status}"
+
+
+# ---------------- WRITE PATH HOOKS ---------------- #
+def _apply(appointment, status, delta, inc):
+    day = day_key(appointment.get("appointment_date"))
+    if not day:
+        return None
+    service = service_key(appointment.get("service"))
+    artist = artist_key(appointment.get("artist_id"))
+    status = _field(status)
+    for path in (
+        "total",
+        f"by_service.{service}",
+        f"by_artist.{artist}",
+        f"by_status.{status}",
+        _cell_path(service, artist, status),
+    ):
+        inc[path] = inc.get(path, 0) + delta
+    return day
+
+
+def record_appointment_rollup(db, appointment):
+    inc = {}
+    day = _apply(appointment, appointment.get("status"), 1, inc)
+    if day:
+        db.appointment_rollups.update_one(
+            {"_id": day},
+            {
+                "$inc": {**inc, "version": 1},
+                "$set": {f"artist_names.{artist_key(appointment.get('artist_id'))}":
+                         appointment.get("artist_name") or "Unassigned"},
+            },
+            upsert=True,
+        )
+
+
+def record_rollup_status_change(db, appointment, new_status):
+    """``appointment`` is the document as it was before the update."""
+    record_rollup_status_changes(db, [(appointment, new_status)])
+
+
+def record_rollup_status_changes(db, changes):
+    """Apply many ``(appointment before update, new_status)`` pairs, one write per day."""
+    by_day = {}
+    for appointment, new_status in changes:
+        old_status = appointment.get("status")
+        if old_status == new_status:
+            continue
+        day = day_key(appointment.get("appointment_date"))
+        if not day:
+            continue
+        inc = by_day.setdefault(day, {})
+        _apply(appointment, old_status, -1, inc)
+        _apply(appointment, new_status, 1, inc)
+    ops = []
+    for day, inc in by_day.items():
+        # total/by_service/by_artist cancel out; only status paths move
+        inc = {k: v for k, v in inc.items() if v}
+        if inc:
+            ops.append(UpdateOne({"_id": day}, {"$inc": {**inc, "version": 1}}, upsert=True))
+    if ops:
+        db.appointment_rollups.bulk_write(ops, ordered=False)
+
+
+# ---------------- REPORTS ---------------- #
+def _sum_into(target, source):
+    for key, value in (source or {}).items():
+        target[key] = target.get(key, 0) + value
+
+
+def summarize(db, start: str, end: str, group_by: str = "service"):
+    """
+    Sum the day buckets in ``[start, end]`` (``YYYY-MM-DD``). ``group_by`` is
+    one of service, artist, status, day or month.
+    """
+    result = {"start": start, "end": end, "total": 0, "groups": {}}
+    artist_names = {}
+    for doc in db.appointment_rollups.find({"_id": {"$gte": start, "$lte": end}}):
+        if doc["_id"] == META_ID:
+            continue
+        result["total"] += doc.get("total", 0)
+        if group_by == "day":
+            result["groups"][doc["_id"]] = doc.get("total", 0)
+        elif group_by == "month":
+            month = doc["_id"][:7]
+            result["groups"][month] = result["groups"].get(month, 0) + doc.get("total", 0)
+        else:
+            _sum_into(result["groups"], doc.get(f"by_{group_by}"))
+        artist_names.update(doc.get("artist_names") or {})
+    if group_by == "artist":
+        result["artist_names"] = {k: artist_names.get(k, "Unassigned") for k in result["groups"]}
+    return result
+
+
+def previous_range(start: str, end: str, mode: str):
+    """The comparison range for ``mode`` = previous (same length) or yoy."""
+    start_dt = datetime.strptime(start, "%Y-%m-%d")
+    end_dt = datetime.strptime(end, "%Y-%m-%d")
+    if mode == "yoy":
+        try:
+            return (start_dt.replace(year=start_dt.year - 1).strftime("%Y-%m-%d"),
+                    end_dt.replace(year=end_dt.year - 1).strftime("%Y-%m-%d"))
+        except ValueError:  # Feb 29
+            return ((start_dt - timedelta(days=365)).strftime("%Y-%m-%d"),
+                    (end_dt - timedelta(days=365)).strftime("%Y-%m-%d"))
+    length = end_dt - start_dt + timedelta(days=1)
+    return (start_dt - length).strftime("%Y-%m-%d"), (end_dt - length).strftime("%Y-%m-%d")
+
+
+# ---------------- REBUILD ---------------- #
+def _next_day(day: str) -> str:
+    return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _appointments_between(start=None, end=None):
+    """Match appointments whose day is in ``[start, end]``; appointment_date is a string or a date."""
+    as_string, as_date = {}, {}
+    if start:
+        as_string["$gte"] = start
+        as_date["$gte"] = datetime.strptime(start, "%Y-%m-%d")
+    if end:
+        as_string["$lt"] = _next_day(end)
+        as_date["$lt"] = datetime.strptime(_next_day(end), "%Y-%m-%d")
+    if not as_string:
+        return {}
+    return {"$or": [{"appointment_date": as_string}, {"appointment_date": as_date}]}
+
+
+def _day_versions(db, start=None, end=None):
+    """``{day: version}`` for the stored buckets in range (``_meta`` sorts after every day)."""
+    return {
+        doc["_id"]: doc.get("version")
+        for doc in db.appointment_rollups.find(
+            {"_id": {"$gte": start or "", "$lte": end or "9999-12-31"}}, {"version": 1}
+        )
+    }
+
+
+def _aggregate_days(db, start=None, end=None):
+    """Recompute the day buckets in ``[start, end]`` (open ends allowed) from ``appointments``."""
+    pipeline = [
+        {"$match": _appointments_between(start, end)},
+        {"$project": {
+            "day": {"$cond": [
+                {"$eq": [{"$type": "$appointment_date"}, "date"]},
+                {"$dateToString": {"format": "%Y-%m-%d", "date": "$appointment_date"}},
+                {"$substrCP": [{"$ifNull": ["$appointment_date", ""]}, 0, 10]},
+            ]},
+            "service": 1, "artist_id": 1, "artist_name": 1, "status": 1,
+        }},
+        {"$group": {
+            "_id": {"day": "$day", "service": "$service", "artist_id": "$artist_id", "status": "$status"},
+            "count": {"$sum": 1},
+            "artist_name": {"$first": "$artist_name"},
+        }},
+    ]
+    days = {}
+    for row in db.appointments.aggregate(pipeline, allowDiskUse=True):
+        key = row["_id"]
+        if not key.get("day") or len(key["day"]) < 10:
+            continue
+        doc = days.setdefault(key["day"], {"total": 0, "by_service": {}, "by_artist": {}, "by_status": {},
+                                           "cells": {}, "artist_names": {}})
+        service = service_key(key.get("service"))
+        artist = artist_key(key.get("artist_id"))
+        status = _field(key.get("status"))
+        count = row["count"]
+        doc["total"] += count
+        for group, name in (("by_service", service), ("by_artist", artist), ("by_status", status)):
+            doc[group][name] = doc[group].get(name, 0) + count
+        cell = doc["cells"].setdefault(service, {}).setdefault(artist, {})
+        cell[status] = cell.get(status, 0) + count
+        doc["artist_names"][artist] = row.get("artist_name") or "Unassigned"
+    return days
+
+
+def _write_days(db, days, versions):
+    """``$set`` each recomputed day whose version is unchanged; returns the days that moved."""
+    conflicts = []
+    for day, doc in days.items():
+        version = versions.get(day)
+        try:
+            # {"version": None} also matches a bucket written before versioning
+            result = db.appointment_rollups.update_one(
+                {"_id": day, "version": version},
+                {"$set": {**doc, "version": version or 0}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            conflicts.append(day)  # a hook created the bucket first
+            continue
+        if not result.matched_count and result.upserted_id is None:
+            conflicts.append(day)
+    for day, version in versions.items():
+        # Buckets with no appointments left
+        if day not in days and not db.appointment_rollups.delete_one({"_id": day, "version": version}).deleted_count:
+            conflicts.append(day)
+    return conflicts
+
+
+def rebuild_rollups(db, since=None, until=None):
+    """
+    Recompute the day buckets in ``[since, until]`` (every day by default)
+    from ``appointments``. Safe to run on live traffic: days written to while
+    it runs are recomputed, up to ``REBUILD_ATTEMPTS`` rounds.
+    """
+    start, end = since, until
+    written = set()
+    for _ in range(REBUILD_ATTEMPTS):
+        versions = _day_versions(db, start, end)
+        days = _aggregate_days(db, start, end)
+        conflicts = _write_days(db, days, versions)
+        written.update(days)
+        if not conflicts:
+            break
+        start, end = min(conflicts), max(conflicts)
+    else:
+        print(f"[ROLLUP REBUILD] {len(conflicts)} day(s) kept changing; left to the next reconcile")
+    if since is None and until is None:
+        db.appointment_rollups.replace_one(
+            {"_id": META_ID}, {"rebuilt_at": datetime.utcnow(), "days": len(written)}, upsert=True
+        )
+    return len(written)
+
+
+def ensure_rollups(db, background=True):
+    """Build the rollups once if they have never been built (in one process only)."""
+    if db.appointment_rollups.find_one({"_id": META_ID}, {"_id": 1}):
+        return
+
+    def build():
+        try:
+            if not acquire_lease(db, REBUILD_LEASE, REBUILD_LEASE_SECONDS):
+                return  # another process is building them
+            try:
+                if not db.appointment_rollups.find_one({"_id": META_ID}, {"_id": 1}):
+                    rebuild_rollups(db)
+            finally:
+                release_lease(db, REBUILD_LEASE)
+        except Exception as e:
+            print(f"[ROLLUP REBUILD ERROR] {e}")
+
+    if background:
+        threading.Thread(target=build, name="rollup-rebuild", daemon=True).start()
+    else:
+        build()
+
+
+# ---------------- PERIODIC RECONCILE ---------------- #
+def start_rollup_reconciler(db, interval: int = None):
+    """
+    Every ``interval`` seconds (0 disables), the lease holder recomputes the
+    last ``ROLLUP_RECONCILE_DAYS`` days and everything after them.
+    """
+    global _reconciler
+    interval = ROLLUP_RECONCILE_SECONDS if interval is None else interval
+    if interval <= 0:
+        return
+
+    def loop():
+        while not _stop.wait(interval):
+            try:
+                if acquire_lease(db, RECONCILE_LEASE, 2 * interval):
+                    since = (datetime.now() - timedelta(days=ROLLUP_RECONCILE_DAYS)).strftime("%Y-%m-%d")
+                    rebuild_rollups(db, since=since)
+            except Exception as e:
+                print(f"[ROLLUP RECONCILE ERROR] {e}")
+
+    with _reconciler_lock:
+        if _reconciler is None:
+            _stop.clear()
+            _reconciler = threading.Thread(target=loop, name="rollup-reconciler", daemon=True)
+            _reconciler.start()
+
+
+def stop_rollup_reconciler(timeout: float = 5):
+    global _reconciler
+    with _reconciler_lock:
+        _stop.set()
+        if _reconciler is not None:
+            _reconciler.join(timeout)
+            _reconciler = None
+
+
+if __name__ == "__main__":
+    from backend.db import get_db
+
+    parser = argparse.ArgumentParser(description="Maintain daily appointment rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the day buckets")
+    parser.add_argument("--since", help="first day to recompute (YYYY-MM-DD); default: every day")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"rebuilt {rebuild_rollups(get_db(), since=args.since)} day bucket(s)")
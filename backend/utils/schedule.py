@@ -0,0 +1,144 @@
+# /utils/schedule.py
+"""
+Shop schedule: per-weekday open hours, holidays and per-staff overrides.
+
+Schedules live in the ``schedules`` collection (``_id: "shop"`` and
+``_id: "staff:<staff_id>"``) and fall back to ``DEFAULT_OPEN_HOURS``. For a
+given staff member and day they compile to a 24-bit hour mask (bit ``h`` set
+= open from ``h:00``), the same layout as the ``staff_day_slots`` masks.
+"""
+import os
+from datetime import datetime
+from functools import lru_cache
+
+from backend.utils.cache import TTLCache
+
+HOURS = 24
+FULL_MASK = (1 << HOURS) - 1
+
+# weekday() -> (first hour, closing hour); None means closed
+DEFAULT_OPEN_HOURS = {
+    0: (9, 21),
+    1: (9, 21),
+    2: (9, 21),
+    3: (9, 21),
+    4: (9, 21),
+    5: (9, 17),  # Saturday
+    6: None,     # Sunday
+}
+SHOP_ID = "shop"
+
+schedule_cache = TTLCache(maxsize=1, ttl=int(os.getenv("SCHEDULE_CACHE_TTL", "60")))
+
+
+# ---------------- MASKS ---------------- #
+def hours_mask(hours) -> int:
+    """Mask for ``(start, end)`` (end exclusive); 0 for None / closed."""
+    if not hours:
+        return 0
+    start, end = hours
+    return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+
+def mask_hours(mask: int):
+    return [h for h in range(HOURS) if mask >> h & 1]
+
+
+@lru_cache(maxsize=256)
+def slot_hour(t):
+    """Hour for a whole-hour slot ("13:00", "1:00 PM"), else None."""
+    if not isinstance(t, str):
+        return None
+    value = t.strip()
+    for fmt in ("%H:%M", "%I:%M %p", "%I:%M%p"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.hour if parsed.minute == 0 else None
+    return None
+
+
+def slot_bit(t) -> int:
+    hour = slot_hour(t)
+    return 0 if hour is None else 1 << hour
+
+
+# ---------------- VALIDATION ---------------- #
+def validate_hours(value):
+    """``None`` (closed) or ``[start, end]`` with 0 <= start < end <= 24."""
+    if value is None:
+        return None
+    if (not isinstance(value, (list, tuple)) or len(value) != 2
+            or not all(isinstance(v, int) for v in value) or not 0 <= value[0] < value[1] <= HOURS):
+        raise ValueError("hours must be null or [start, end] with 0 <= start < end <= 24")
+    return [value[0], value[1]]
+
+
+def validate_weekday_hours(value):
+    if not isinstance(value, dict):
+        raise ValueError("open_hours must be an object keyed by weekday 0-6")
+    result = {}
+    for key, hours in value.items():
+        if str(key) not in {str(d) for d in range(7)}:
+            raise ValueError(f"invalid weekday {key!r}")
+        result[str(key)] = validate_hours(hours)
+    return result
+
+
+def validate_dates(value, name):
+    if not isinstance(value, list):
+        raise ValueError(f"{name} must be a list of YYYY-MM-DD dates")
+    for d in value:
+        datetime.strptime(d, "%Y-%m-%d")
+    return sorted(set(value))
+
+
+# ---------------- LOAD / COMPILE ---------------- #
+def get_schedule(db):
+    """``{"shop": doc, "staff": {staff_id str: doc}}`` from one cached query."""
+    cached = schedule_cache.get("all")
+    if cached is None:
+        cached = {"shop": {}, "staff": {}}
+        for doc in db.schedules.find({}):
+            if doc["_id"] == SHOP_ID:
+                cached["shop"] = doc
+            elif str(doc["_id"]).startswith("staff:"):
+                cached["staff"][str(doc["_id"])[len("staff:"):]] = doc
+        schedule_cache.set("all", cached)
+    return cached
+
+
+def invalidate_schedule():
+    schedule_cache.clear()
+
+
+def _weekday_hours(doc, weekday):
+    hours = (doc.get("open_hours") or {})
+    key = str(weekday)
+    return (key in hours), hours.get(key)
+
+
+def open_hours_for(schedule, staff_id, date):
+    """``(start, end)`` or None for one staff member on ``date``."""
+    shop = schedule.get("shop") or {}
+    if date in (shop.get("holidays") or ()):
+        return None
+    staff = (schedule.get("staff") or {}).get(str(staff_id)) or {}
+    dates = staff.get("dates") or {}
+    if date in dates:
+        return dates[date]
+    if date in (staff.get("days_off") or ()):
+        return None
+    weekday = datetime.strptime(date, "%Y-%m-%d").weekday()
+    found, hours = _weekday_hours(staff, weekday)
+    if found:
+        return hours
+    found, hours = _weekday_hours(shop, weekday)
+    if found:
+        return hours
+    return DEFAULT_OPEN_HOURS.get(weekday)
+
+
+def open_mask(schedule, staff_id, date) -> int:
+    return hours_mask(open_hours_for(schedule, staff_id, date))
@@ -0,0 +1,38 @@
+# /utils/search.py
+"""
+Admin appointment search.
+
+Booking codes resolve on ``display_id``: a complete number (``APT-000123``,
+``apt-123``, ``123``) is zero-padded to an exact match, while an explicit
+partial code (``APT-0001`` with its leading zero, or a trailing ``*``) is an
+anchored prefix match. A 24-character hex string looks up the appointment
+``_id``; anything else is a ranked ``$text`` query over client name, artist
+and service.
+"""
+import re
+
+from bson import ObjectId
+
+DISPLAY_ID_PREFIX = "APT-"
+DISPLAY_ID_DIGITS = 6
+
+_DISPLAY_ID_RE = re.compile(r"^(apt-?)?(\d{1,6})(\*)?$", re.IGNORECASE)
+
+
+def appointment_search_filter(q: str):
+    """
+    Return ``(filter, ranked)`` for the admin ``q`` parameter. ``ranked`` is
+    True when the filter is a ``$text`` query that can be sorted by score.
+    """
+    q = (q or "").strip()
+    match = _DISPLAY_ID_RE.match(q)
+    if match:
+        has_prefix, digits, wildcard = match.groups()
+        partial = wildcard or (has_prefix and digits.startswith("0") and len(digits) < DISPLAY_ID_DIGITS)
+        if partial:
+            # "APT-0001" / "APT-00012*" -> every code starting with it (anchored, uses the index)
+            return {"display_id": {"$regex": f"^{DISPLAY_ID_PREFIX}{digits}"}}, False
+        return {"display_id": f"{DISPLAY_ID_PREFIX}{int(digits):0{DISPLAY_ID_DIGITS}d}"}, False
+    if ObjectId.is_valid(q):
+        return {"_id": ObjectId(q)}, False
+    return {"$text": {"$search": q}}, True
@@ -1,10 +1,225 @@
 # /utils/security.py
+"""
+Password hashing and input validation.
+
+Hashers are pluggable: new hashes use ``PBKDF2Hasher`` whose iteration count
+is calibrated once per process to ``PASSWORD_HASH_TARGET_MS``; legacy
+unsalted SHA-256 hashes still verify and report ``needs_rehash`` so login can
+upgrade them. The expensive work runs in a small bounded pool, which caps
+how many hashes use the CPU at once. The calling request thread still waits
+for its hash, but for at most ``PASSWORD_HASH_WAIT_MS``; when the pool's
+queue is full or the wait runs out the helpers raise ``PasswordHasherBusy``
+and routes answer 503.
+"""
+import base64
 import hashlib
+import hmac
+import os
 import re
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+PASSWORD_HASH_TARGET_MS = int(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes allowed to wait for a worker before new ones are rejected
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+# Longest a request thread waits for its hash (queueing included)
+PASSWORD_HASH_WAIT_MS = int(os.getenv("PASSWORD_HASH_WAIT_MS", str(8 * PASSWORD_HASH_TARGET_MS)))
+PBKDF2_MIN_ITERATIONS = 100_000
+PBKDF2_MAX_ITERATIONS = 2_000_000
+RETRY_AFTER_SECONDS = 1
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated."""
+
+
+# ---------------- HASHERS ---------------- #
+class PasswordHasher(ABC):
+    algorithm = None
+
+    @abstractmethod
+    def encode(self, password: str) -> str:
+        ...
+
+    @abstractmethod
+    def verify(self, password: str, encoded: str) -> bool:
+        ...
+
+    def needs_update(self, encoded: str) -> bool:
+        return False
+
+    def handles(self, encoded: str) -> bool:
+        return encoded.startswith(self.algorithm + "$")
+
+
+class Sha256Hasher(PasswordHasher):
+    """Legacy unsalted hex SHA-256 (verify only; never chosen for new hashes)."""
+    algorithm = "sha256"
+
+    def encode(self, password: str) -> str:
+        return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(self.encode(password), encoded)
+
+    def handles(self, encoded: str) -> bool:
+        return len(encoded) == 64 and "$" not in encoded
+
+
+class PBKDF2Hasher(PasswordHasher):
+    """``pbkdf2_sha256$<iterations>$<salt>$<b64 hash>``"""
+    algorithm = "pbkdf2_sha256"
+
+    def __init__(self, iterations: int):
+        self.iterations = iterations
+
+    def _derive(self, password, salt, iterations):
+        dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), iterations)
+        return base64.b64encode(dk).decode("ascii").rstrip("=")
+
+    def encode(self, password: str) -> str:
+        salt = secrets.token_urlsafe(16)
+        return f"{self.algorithm}${self.iterations}${salt}${self._derive(password, salt, self.iterations)}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            _, iterations, salt, digest = encoded.split("$", 3)
+            iterations = int(iterations)
+        except ValueError:
+            return False
+        return hmac.compare_digest(self._derive(password, salt, iterations), digest)
+
+    def needs_update(self, encoded: str) -> bool:
+        try:
+            return int(encoded.split("$", 2)[1]) < self.iterations
+        except (IndexError, ValueError):
+            return True
+
+
+def calibrate_pbkdf2_iterations(target_ms: int = PASSWORD_HASH_TARGET_MS) -> int:
+    """Iteration count that takes roughly ``target_ms`` on this machine."""
+    probe = 20_000
+    start = time.perf_counter()
+    hashlib.pbkdf2_hmac("sha256", b"calibration", b"calibration-salt", probe)
+    elapsed_ms = max((time.perf_counter() - start) * 1000, 0.01)
+    iterations = int(probe * target_ms / elapsed_ms)
+    # Round so the stored cost does not flap between restarts
+    iterations = round(iterations, -4)
+    return max(PBKDF2_MIN_ITERATIONS, min(PBKDF2_MAX_ITERATIONS, iterations))
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+_legacy_hashers = [Sha256Hasher()]
+# Verified against when the account does not exist, so unknown usernames
+# take as long as real ones
+_dummy_hash = None
+
+
+def init_password_hasher(target_ms: int = PASSWORD_HASH_TARGET_MS):
+    """Calibrate the preferred hasher; called at startup, otherwise on first use."""
+    global _hasher, _dummy_hash
+    with _hasher_lock:
+        if _hasher is None:
+            hasher = PBKDF2Hasher(calibrate_pbkdf2_iterations(target_ms))
+            _dummy_hash = hasher.encode(secrets.token_urlsafe(16))
+            _hasher = hasher
+            print(f"[PASSWORD HASH] pbkdf2_sha256 with {_hasher.iterations} iterations")
+    return _hasher
+
+
+def get_hasher() -> PasswordHasher:
+    return _hasher or init_password_hasher()
+
+
+def _hasher_for(encoded: str):
+    preferred = get_hasher()
+    if preferred.handles(encoded):
+        return preferred
+    for hasher in _legacy_hashers:
+        if hasher.handles(encoded):
+            return hasher
+    return None
+
+
+# ---------------- BOUNDED EXECUTION ---------------- #
+_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusy("Password hashing is busy, try again shortly")
+    try:
+        future = _pool.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _wait(future):
+    """The pooled call's result, or PasswordHasherBusy after ``PASSWORD_HASH_WAIT_MS``."""
+    try:
+        return future.result(timeout=PASSWORD_HASH_WAIT_MS / 1000)
+    except FutureTimeoutError:
+        # Frees the queue slot if no worker has picked the call up yet
+        future.cancel()
+        raise PasswordHasherBusy("Password hashing is busy, try again shortly")
+
 
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+    """Encode ``password`` with the preferred hasher (raises PasswordHasherBusy)."""
+    return _wait(_run(get_hasher().encode, password))
+
+
+def verify_password(password: str, encoded: str):
+    """
+    ``(ok, needs_rehash)`` for ``password`` against a stored hash. Legacy
+    hashes verify inline; KDF hashes go through the pool. A missing hash
+    (unknown user) still costs one KDF verification.
+    """
+    if not password:
+        return False, False
+    if not encoded:
+        get_hasher()
+        _wait(_run(_hasher.verify, password, _dummy_hash))
+        return False, False
+    hasher = _hasher_for(encoded)
+    if hasher is None:
+        return False, False
+    if hasher.algorithm == get_hasher().algorithm:
+        ok = _wait(_run(hasher.verify, password, encoded))
+    else:
+        ok = hasher.verify(password, encoded)
+    if not ok:
+        return False, False
+    return True, hasher is not get_hasher() or hasher.needs_update(encoded)
+
+
+def rehash_in_background(collection, account_id, password: str, old_hash: str):
+    """Upgrade a stored hash off the request thread; skipped when the pool is busy."""
+    def upgrade():
+        try:
+            collection.update_one(
+                {"_id": account_id, "hash_pass": old_hash},
+                {"$set": {"hash_pass": get_hasher().encode(password)}},
+            )
+        except Exception as e:
+            print(f"[PASSWORD REHASH ERROR] {e}")
+
+    try:
+        _run(upgrade)
+    except PasswordHasherBusy:
+        pass
+
 
+# ---------------- VALIDATION ---------------- #
 def is_strong_password(password: str) -> bool:
     if not password or len(password) < 8:
         return False
@@ -0,0 +1,52 @@
+# /utils/sequences.py
+"""
+Hi-lo sequence allocation on top of the ``counters`` collection.
+
+Instead of one ``$inc`` per number, each worker process reserves a block of
+numbers with a single ``find_one_and_update`` and hands them out from memory.
+Numbers are unique and monotonic within a worker; unused numbers from a
+block are simply skipped (gaps are expected).
+"""
+import os
+import threading
+
+from pymongo import ReturnDocument
+
+APPOINTMENT_ID_BLOCK_SIZE = int(os.getenv("APPOINTMENT_ID_BLOCK_SIZE", "20"))
+
+
+class SequenceAllocator:
+    def __init__(self, counter_id: str, block_size: int = 20):
+        self.counter_id = counter_id
+        self.block_size = max(int(block_size), 1)
+        self._next = 0
+        self._hi = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _reserve_block(self, db):
+        doc = db.counters.find_one_and_update(
+            {"_id": self.counter_id},
+            {"$inc": {"seq": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._hi = int(doc["seq"])
+        self._next = self._hi - self.block_size + 1
+        self._pid = os.getpid()
+
+    def next(self, db) -> int:
+        with self._lock:
+            # A forked worker must not reuse its parent's block
+            if self._pid != os.getpid() or self._next > self._hi:
+                self._reserve_block(db)
+            value = self._next
+            self._next += 1
+            return value
+
+
+appointment_sequence = SequenceAllocator("appointment", APPOINTMENT_ID_BLOCK_SIZE)
+
+
+def next_appointment_display_id(db) -> str:
+    return f"APT-{appointment_sequence.next(db):06d}"
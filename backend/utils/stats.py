@@ -0,0 +1,249 @@
+# /utils/stats.py
+"""
+Incrementally maintained dashboard counters.
+
+Write paths (bookings, status updates, signups, feedback) ``$inc`` a single
+``stats`` document so the admin dashboard, appointment summary and public
+rating summary are one point read. ``reconcile_dashboard_stats`` recomputes
+everything from the source collections and runs periodically, in whichever
+process holds the reconcile lease, to correct any drift.
+
+Every hook also bumps ``version``; a reconcile only writes its result if the
+version is unchanged since it started, so it never overwrites an ``$inc``
+that landed while it was aggregating.
+"""
+import os
+import threading
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.db import get_db
+from backend.utils.leases import acquire_lease
+
+DASHBOARD_ID = "dashboard"
+COMPLETED_STATUSES = ("Completed", "Done")
+STATS_RECONCILE_SECONDS = int(os.getenv("STATS_RECONCILE_SECONDS", "3600"))
+RECONCILE_LEASE = "stats-reconciler"
+RECONCILE_ATTEMPTS = 3
+STAR_VALUES = range(1, 6)
+
+_reconciler = None
+_stop = threading.Event()
+_reconciler_lock = threading.Lock()
+
+
+def _key(value) -> str:
+    # Field names may not contain "." or start with "$"
+    return (str(value) if value else "Unknown").replace(".", "_").lstrip("$")
+
+
+def _artist_key(artist_id) -> str:
+    return str(artist_id) if artist_id else "unassigned"
+
+
+def _inc(db, inc, set_fields=None):
+    update = {"$inc": {**inc, "version": 1}, "$set": {"updated_at": datetime.utcnow()}}
+    if set_fields:
+        update["$set"].update(set_fields)
+    db.stats.update_one({"_id": DASHBOARD_ID}, update, upsert=True)
+
+
+# ---------------- WRITE PATH HOOKS ---------------- #
+def record_appointment_created(db, status="Pending"):
+    _inc(db, {"appointments_total": 1, f"appointments_by_status.{_key(status)}": 1})
+
+
+def _add_status_change(appointment, new_status, inc, set_fields):
+    old_status = appointment.get("status")
+    if old_status == new_status:
+        return
+    for path, delta in (
+        (f"appointments_by_status.{_key(old_status)}", -1),
+        (f"appointments_by_status.{_key(new_status)}", 1),
+    ):
+        inc[path] = inc.get(path, 0) + delta
+    was_done = old_status in COMPLETED_STATUSES
+    is_done = new_status in COMPLETED_STATUSES
+    if was_done != is_done:
+        artist = _artist_key(appointment.get("artist_id"))
+        path = f"artist_jobs.{artist}.jobs"
+        inc[path] = inc.get(path, 0) + (1 if is_done else -1)
+        set_fields[f"artist_jobs.{artist}.name"] = appointment.get("artist_name") or "Unassigned"
+
+
+def record_status_change(db, appointment, new_status):
+    """``appointment`` is the document as it was before the update."""
+    record_status_changes(db, [(appointment, new_status)])
+
+
+def record_status_changes(db, changes):
+    """Apply many ``(appointment before update, new_status)`` pairs in one write."""
+    inc, set_fields = {}, {}
+    for appointment, new_status in changes:
+        _add_status_change(appointment, new_status, inc, set_fields)
+    inc = {k: v for k, v in inc.items() if v}
+    if inc:
+        _inc(db, inc, set_fields)
+
+
+def record_client_created(db):
+    _inc(db, {"clients_total": 1})
+
+
+def record_feedback_created(db, stars=None):
+    inc = {"feedback_unreplied": 1}
+    if stars is not None and int(stars) in STAR_VALUES:
+        inc.update({
+            "feedback_ratings.count": 1,
+            "feedback_ratings.sum": int(stars),
+            f"feedback_ratings.histogram.{int(stars)}": 1,
+        })
+    _inc(db, inc)
+
+
+def record_feedback_replied(db, feedback):
+    """``feedback`` is the document as it was before the reply was saved."""
+    if feedback.get("reply") in (None, ""):
+        _inc(db, {"feedback_unreplied": -1})
+
+
+# ---------------- READ / RECONCILE ---------------- #
+def _compute_dashboard_stats(db):
+    by_status = {}
+    total = 0
+    for row in db.appointments.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+        by_status[_key(row["_id"])] = row["count"]
+        total += row["count"]
+
+    artist_jobs = {}
+    for row in db.appointments.aggregate([
+        {"$match": {"status": {"$in": list(COMPLETED_STATUSES)}}},
+        {"$group": {"_id": "$artist_id", "jobs": {"$sum": 1}}},
+        {"$lookup": {"from": "tbl_staff", "localField": "_id", "foreignField": "_id", "as": "artist"}},
+    ]):
+        artist = row["artist"][0] if row["artist"] else {}
+        artist_jobs[_artist_key(row["_id"])] = {
+            "name": artist.get("fullname") or "Unassigned",
+            "jobs": row["jobs"],
+        }
+
+    ratings = {"count": 0, "sum": 0, "histogram": {}}
+    for row in db.feedback.aggregate([{"$group": {"_id": "$stars", "count": {"$sum": 1}}}]):
+        try:
+            stars = int(row["_id"])
+        except (TypeError, ValueError):
+            continue
+        if stars not in STAR_VALUES:
+            continue
+        ratings["count"] += row["count"]
+        ratings["sum"] += stars * row["count"]
+        ratings["histogram"][str(stars)] = row["count"]
+
+    now = datetime.utcnow()
+    return {
+        "clients_total": db.clients.count_documents({}),
+        "appointments_total": total,
+        "appointments_by_status": by_status,
+        "feedback_unreplied": db.feedback.count_documents({"reply": {"$in": [None, ""]}}),
+        "artist_jobs": artist_jobs,
+        "feedback_ratings": ratings,
+        "updated_at": now,
+        "reconciled_at": now,
+    }
+
+
+def reconcile_dashboard_stats(db):
+    """
+    Recompute the dashboard document from the source collections. ``db``
+    must be a primary handle. The result is ``$set`` only if no hook wrote
+    in the meantime; otherwise it retries, and after ``RECONCILE_ATTEMPTS``
+    conflicts the fresh numbers are returned without being stored.
+    """
+    for _ in range(RECONCILE_ATTEMPTS):
+        current = db.stats.find_one({"_id": DASHBOARD_ID}, {"version": 1})
+        version = current.get("version") if current else None
+        doc = _compute_dashboard_stats(db)
+        try:
+            # {"version": None} also matches a document written before versioning
+            result = db.stats.update_one(
+                {"_id": DASHBOARD_ID, "version": version},
+                {"$set": {**doc, "version": version or 0}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            continue  # a hook created the document first
+        if result.matched_count or result.upserted_id is not None:
+            break
+    else:
+        print("[STATS RECONCILE] concurrent updates kept winning; will retry next round")
+    doc["_id"] = DASHBOARD_ID
+    return doc
+
+
+def get_dashboard_stats(db):
+    doc = db.stats.find_one({"_id": DASHBOARD_ID})
+    if not doc or "reconciled_at" not in doc or "feedback_ratings" not in doc:
+        # ``db`` may be the secondary-preferred analytics handle; write via the primary
+        doc = reconcile_dashboard_stats(get_db())
+    return doc
+
+
+def top_artists(stats, limit=10):
+    """Artist performance rows (most completed jobs first), merged by name."""
+    totals = {}
+    for entry in (stats.get("artist_jobs") or {}).values():
+        name = entry.get("name") or "Unassigned"
+        totals[name] = totals.get(name, 0) + entry.get("jobs", 0)
+    rows = [{"artist_name": name, "total_jobs": jobs} for name, jobs in totals.items() if jobs > 0]
+    rows.sort(key=lambda r: r["total_jobs"], reverse=True)
+    return rows[:limit]
+
+
+def rating_summary(stats):
+    """Average stars, 1-5 star histogram and count for the public feed."""
+    ratings = stats.get("feedback_ratings") or {}
+    count = ratings.get("count", 0)
+    histogram = ratings.get("histogram") or {}
+    return {
+        "count": count,
+        "average": round(ratings.get("sum", 0) / count, 2) if count else 0,
+        "histogram": {str(i): histogram.get(str(i), 0) for i in range(1, 6)},
+    }
+
+
+# ---------------- PERIODIC RECONCILE ---------------- #
+def start_stats_reconciler(db, interval: int = None):
+    """
+    Reconcile in a daemon thread every ``interval`` seconds (0 disables).
+    Every process starts the thread, but only the holder of the reconcile
+    lease does the work; the lease outlives two rounds, so another process
+    takes over only when the holder stops renewing it.
+    """
+    global _reconciler
+    interval = STATS_RECONCILE_SECONDS if interval is None else interval
+    if interval <= 0:
+        return
+
+    def loop():
+        while not _stop.wait(interval):
+            try:
+                if acquire_lease(db, RECONCILE_LEASE, 2 * interval):
+                    reconcile_dashboard_stats(db)
+            except Exception as e:
+                print(f"[STATS RECONCILE ERROR] {e}")
+
+    with _reconciler_lock:
+        if _reconciler is None:
+            _stop.clear()
+            _reconciler = threading.Thread(target=loop, name="stats-reconciler", daemon=True)
+            _reconciler.start()
+
+
+def stop_stats_reconciler(timeout: float = 5):
+    global _reconciler
+    with _reconciler_lock:
+        _stop.set()
+        if _reconciler is not None:
+            _reconciler.join(timeout)
+            _reconciler = None
@@ -0,0 +1,115 @@
+# /utils/unavailability.py
+"""
+Staff unavailability edits as a diff against the stored rows.
+
+A request (one date, a date range or a weekly pattern) expands to a set of
+``(date, slot label)`` pairs. Only manual rows are compared; booking markers
+(rows with an ``is_booked`` field, upserted by ``create_booking``) are never
+touched. The minimal inserts/deletes are applied with one ``bulk_write``,
+and the same change is mirrored into the ``blocked`` masks of
+``staff_day_slots``.
+"""
+from datetime import datetime, timedelta
+
+from pymongo import DeleteMany, InsertOne
+
+from backend.utils.availability import invalidate_slots, normalize_slot, slot_label
+from backend.utils.day_slots import MANUAL_ROWS, update_blocked
+from backend.utils.schedule import mask_hours, open_mask
+
+MAX_PATTERN_DAYS = 184
+MODES = ("replace", "add", "remove")
+
+
+def expand_dates(start, end=None, weeks=None, weekdays=None):
+    """
+    ``YYYY-MM-DD`` strings from ``start`` through ``end`` (or ``weeks`` weeks),
+    keeping only ``weekdays`` (0 = Monday) when given. Raises ValueError.
+    """
+    start_dt = datetime.strptime(start, "%Y-%m-%d")
+    if end:
+        end_dt = datetime.strptime(end, "%Y-%m-%d")
+    elif weeks:
+        end_dt = start_dt + timedelta(days=7 * int(weeks) - 1)
+    else:
+        end_dt = start_dt
+    days = (end_dt - start_dt).days
+    if days < 0:
+        raise ValueError("end is before start")
+    if days >= MAX_PATTERN_DAYS:
+        raise ValueError(f"range is limited to {MAX_PATTERN_DAYS} days")
+    wanted = {int(w) for w in weekdays} if weekdays else None
+    dates = []
+    for i in range(days + 1):
+        day = start_dt + timedelta(days=i)
+        if wanted is None or day.weekday() in wanted:
+            dates.append(day.strftime("%Y-%m-%d"))
+    return dates
+
+
+def expand_slots(dates, times=None, all_day=False, schedule=None, staff_id=None):
+    """
+    ``{date: set(slot labels)}``; ``all_day`` takes each day's open hours
+    for ``staff_id`` from ``schedule`` (see ``schedule.get_schedule``).
+    """
+    labels = {normalize_slot(t) for t in (times or []) if t}
+    slots = {}
+    for date in dates:
+        if all_day:
+            slots[date] = {slot_label(h) for h in mask_hours(open_mask(schedule or {}, staff_id, date))}
+        else:
+            slots[date] = set(labels)
+    return slots
+
+
+def diff_unavailability(existing, desired, mode="replace"):
+    """
+    ``(inserts, delete_ids, removed)`` turning ``existing`` manual rows into
+    ``desired`` (``{date: set(labels)}``); ``removed`` lists the
+    ``(date, label)`` slots that end up free. ``replace`` makes each listed
+    date match exactly; ``add`` only inserts; ``remove`` deletes the listed
+    slots.
+    """
+    present = {}
+    delete_ids = []
+    for row in existing:
+        key = (row["unavailable_date"], normalize_slot(row.get("unavailable_time")))
+        if key in present:
+            delete_ids.append(row["_id"])  # duplicate row for the same slot
+        else:
+            present[key] = row["_id"]
+
+    inserts, removed = [], []
+    for date, labels in desired.items():
+        if mode == "remove":
+            removed.extend((date, t) for t in labels if (date, t) in present)
+            continue
+        inserts.extend((date, t) for t in sorted(labels) if (date, t) not in present)
+    if mode == "replace":
+        removed.extend(key for key in present if key[0] in desired and key[1] not in desired[key[0]])
+    delete_ids.extend(present[key] for key in removed)
+    return inserts, delete_ids, removed
+
+
+def apply_unavailability(db, staff_id, desired, mode="replace"):
+    """Diff and write ``desired`` for one staff member; returns the counts."""
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    existing = db.staff_unavailability.find(
+        {"staff_id": staff_id, "unavailable_date": {"$in": list(desired)}, **MANUAL_ROWS},
+        {"unavailable_date": 1, "unavailable_time": 1},
+    )
+    inserts, delete_ids, removed = diff_unavailability(existing, desired, mode)
+
+    ops = [
+        InsertOne({"staff_id": staff_id, "unavailable_date": date, "unavailable_time": t})
+        for date, t in inserts
+    ]
+    if delete_ids:
+        ops.append(DeleteMany({"_id": {"$in": delete_ids}}))
+    if ops:
+        db.staff_unavailability.bulk_write(ops, ordered=False)
+        update_blocked(db, staff_id, inserts, removed)
+        for date in desired:
+            invalidate_slots(staff_id, date)
+    return {"inserted": len(inserts), "deleted": len(delete_ids)}
@@ -0,0 +1,120 @@
+import mongomock
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+from backend.indexes import INDEXES, backfill_active_slots
+from backend.routes import bookings, bookings_bp
+from backend.utils.json_provider import FastJSONProvider
+
+DATE = "2030-01-15"
+
+
+def _create_indexes(db, name):
+    # mongomock's create_indexes drops partialFilterExpression; create_index keeps it
+    for model in INDEXES[name]:
+        options = dict(model.document)
+        keys = options.pop("key")
+        db[name].create_index(list(keys.items()), **options)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient().bookings_test
+    _create_indexes(db, "appointments")
+    monkeypatch.setattr(bookings, "get_db", lambda *args, **kwargs: db)
+    # The day-slot masks use $bit, which mongomock does not implement
+    monkeypatch.setattr(bookings, "mark_booking", lambda *args, **kwargs: None)
+    monkeypatch.setattr(bookings, "record_slot_status_changes", lambda *args, **kwargs: None)
+    return db
+
+
+@pytest.fixture
+def client(db):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.secret_key = "test"
+    app.register_blueprint(bookings_bp, url_prefix="/api/bookings")
+    return app.test_client()
+
+
+def _seed_client(db, username):
+    account_id = db.tbl_accounts.insert_one({"username": username, "role": "client"}).inserted_id
+    db.clients.insert_one({"account_id": account_id, "fullname": username.title()})
+    return username
+
+
+def _book(client, username, staff_id, service="haircut", time="10:00"):
+    return client.post("/api/bookings", json={
+        "username": username, "fullname": username.title(), "service": service,
+        "date": DATE, "time": time, "staff_id": str(staff_id),
+    })
+
+
+def test_second_booking_for_an_active_slot_is_a_conflict(client, db):
+    staff_id = db.tbl_staff.insert_one({"fullname": "Ada"}).inserted_id
+    first, second = _seed_client(db, "first-a"), _seed_client(db, "second-a")
+
+    assert _book(client, first, staff_id).status_code == 201
+    response = _book(client, second, staff_id)
+
+    assert response.status_code == 409
+    assert db.appointments.count_documents({"artist_id": staff_id, "slot_active": True}) == 1
+
+
+def test_cancelled_slot_can_be_booked_again(client, db):
+    staff_id = db.tbl_staff.insert_one({"fullname": "Ada"}).inserted_id
+    first, second = _seed_client(db, "first-b"), _seed_client(db, "second-b")
+    assert _book(client, first, staff_id).status_code == 201
+    appointment = db.appointments.find_one({"artist_id": staff_id})
+
+    with client.session_transaction() as session:
+        session["username"] = first
+    assert client.post(f"/api/bookings/{appointment['_id']}/cancel").status_code == 200
+    cancelled = db.appointments.find_one({"_id": appointment["_id"]})
+    assert cancelled["status"] == "Cancelled" and "slot_active" not in cancelled
+
+    assert _book(client, second, staff_id).status_code == 201
+    assert db.appointments.count_documents({"artist_id": staff_id, "slot_active": True}) == 1
+
+
+def test_cancel_that_loses_a_race_is_a_conflict(client, db):
+    staff_id = db.tbl_staff.insert_one({"fullname": "Ada"}).inserted_id
+    username = _seed_client(db, "racer")
+    assert _book(client, username, staff_id).status_code == 201
+    appointment = db.appointments.find_one({"artist_id": staff_id})
+    original_find_one = db.appointments.find_one
+
+    def stale_find_one(*args, **kwargs):
+        # The appointment is read as Pending, then an admin approves it before the cancel writes
+        doc = original_find_one(*args, **kwargs)
+        db.appointments.update_one({"_id": appointment["_id"]}, {"$set": {"status": "Approved"}})
+        return doc
+
+    db.appointments.find_one = stale_find_one
+    with client.session_transaction() as session:
+        session["username"] = username
+    assert client.post(f"/api/bookings/{appointment['_id']}/cancel").status_code == 409
+    assert original_find_one({"_id": appointment["_id"]})["status"] == "Approved"
+
+
+def test_backfill_flags_only_legacy_active_appointments():
+    db = mongomock.MongoClient().backfill_test
+    staff_id = ObjectId()
+    legacy = db.appointments.insert_one({"artist_id": staff_id, "status": "Pending"}).inserted_id
+    cancelled = db.appointments.insert_one({"artist_id": staff_id, "status": "Cancelled"}).inserted_id
+    flagged = db.appointments.insert_one({"artist_id": staff_id, "status": "Approved", "slot_active": True}).inserted_id
+
+    backfill_active_slots(db)
+
+    assert db.appointments.find_one({"_id": legacy})["slot_active"] is True
+    assert "slot_active" not in db.appointments.find_one({"_id": cancelled})
+    assert db.appointments.find_one({"_id": flagged})["slot_active"] is True
+
+
+def test_slot_index_only_covers_active_bookings(db):
+    slot = {"artist_id": ObjectId(), "appointment_date": DATE, "time": "10:00"}
+    db.appointments.insert_one({**slot, "status": "Cancelled"})
+    db.appointments.insert_one({**slot, "status": "Pending", "slot_active": True})
+    with pytest.raises(mongomock.DuplicateKeyError):
+        db.appointments.insert_one({**slot, "status": "Pending", "slot_active": True})
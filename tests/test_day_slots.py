@@ -0,0 +1,91 @@
+import mongomock
+from bson import ObjectId
+
+from backend.utils import day_slots
+from backend.utils.day_slots import day_id, rebuild_day_slots, update_blocked
+from backend.utils.schedule import slot_bit
+
+DATE = "2030-01-15"
+
+
+class _RecordingCollection:
+    def __init__(self):
+        self.ops = []
+
+    def bulk_write(self, ops, ordered=True):
+        self.ops.extend(ops)
+
+
+class _RecordingDb:
+    def __init__(self):
+        self.staff_day_slots = _RecordingCollection()
+
+
+def _bits(ops):
+    # mongomock has no $bit, so the update documents are checked directly
+    return [(op._filter["_id"], op._doc["$bit"], op._doc["$inc"]) for op in ops]
+
+
+def test_update_blocked_sets_and_clears_bits_with_a_version_bump():
+    db, staff_id = _RecordingDb(), ObjectId()
+    update_blocked(db, staff_id, added=[(DATE, "10:00 AM"), (DATE, "14:00")], removed=[(DATE, "9:00 AM")])
+    assert _bits(db.staff_day_slots.ops) == [
+        (day_id(staff_id, DATE), {"blocked": {"or": slot_bit("10:00") | slot_bit("14:00")}}, {"version": 1}),
+        (day_id(staff_id, DATE), {"blocked": {"and": ~slot_bit("9:00")}}, {"version": 1}),
+    ]
+
+
+def test_update_blocked_never_clears_a_slot_it_also_sets():
+    db, staff_id = _RecordingDb(), ObjectId()
+    update_blocked(db, staff_id, added=[(DATE, "2:00 PM")], removed=[(DATE, "14:00")])
+    assert _bits(db.staff_day_slots.ops) == [
+        (day_id(staff_id, DATE), {"blocked": {"or": slot_bit("14:00")}}, {"version": 1}),
+    ]
+
+
+def _seed(db, staff_id):
+    db.staff_unavailability.insert_one({"staff_id": staff_id, "unavailable_date": DATE, "unavailable_time": "10:00 AM"})
+    db.appointments.insert_one({"artist_id": staff_id, "appointment_date": DATE, "time": "2:00 PM", "slot_active": True})
+
+
+def test_rebuild_recomputes_masks_and_drops_empty_days():
+    db, staff_id = mongomock.MongoClient().day_slots_test, ObjectId()
+    _seed(db, staff_id)
+    empty = day_id(staff_id, "2030-01-16")
+    db.staff_day_slots.insert_one({"_id": empty, "staff_id": staff_id, "date": "2030-01-16", "blocked": 8, "version": 3})
+
+    assert rebuild_day_slots(db, since=DATE) == 1
+
+    doc = db.staff_day_slots.find_one({"_id": day_id(staff_id, DATE)})
+    assert (doc["blocked"], doc["booked"]) == (slot_bit("10:00"), slot_bit("14:00"))
+    assert db.staff_day_slots.find_one({"_id": empty}) is None
+    assert db.staff_day_slots.find_one({"_id": day_slots.META_ID})["days"] == 1
+
+
+def test_rebuild_recomputes_a_day_a_hook_wrote_to_mid_rebuild(monkeypatch):
+    db, staff_id = mongomock.MongoClient().day_slots_race_test, ObjectId()
+    _seed(db, staff_id)
+    _id = day_id(staff_id, DATE)
+    db.staff_day_slots.insert_one({"_id": _id, "staff_id": staff_id, "date": DATE, "blocked": 0, "booked": 0, "version": 1})
+    compute = day_slots._compute_days
+    rounds = []
+
+    def compute_with_concurrent_booking(db, since, until=None):
+        rounds.append((since, until))
+        days = compute(db, since, until)
+        if len(rounds) == 1:
+            # A booking lands after the sources were read; its hook write bumps the version
+            db.appointments.insert_one({"artist_id": staff_id, "appointment_date": DATE, "time": "3:00 PM",
+                                        "slot_active": True})
+            db.staff_day_slots.update_one({"_id": _id}, {"$set": {"booked": slot_bit("14:00") | slot_bit("15:00")},
+                                                         "$inc": {"version": 1}})
+        return days
+
+    monkeypatch.setattr(day_slots, "_compute_days", compute_with_concurrent_booking)
+    rebuild_day_slots(db, since=DATE)
+
+    # The stale first result is rejected, and the second round covers only the conflicting day
+    assert rounds == [(DATE, None), (DATE, DATE)]
+    doc = db.staff_day_slots.find_one({"_id": _id})
+    assert doc["booked"] == slot_bit("14:00") | slot_bit("15:00")
+    assert doc["blocked"] == slot_bit("10:00")
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from backend.utils import email_outbox
+from backend.utils.email_outbox import OUTBOX_MAX_ATTEMPTS, _claim_next, _process_batch, enqueue_email
+
+WORKER = "worker-1"
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    collection = mongomock.MongoClient().outbox_test.email_outbox
+    monkeypatch.setattr(email_outbox, "outbox_col", collection)
+    return collection
+
+
+def _deliver_with(result):
+    return lambda messages: [result] * len(messages)
+
+
+def test_short_lived_message_drops_its_body_once_sent(outbox):
+    _id = enqueue_email("a@gmail.com", "OTP", "<b>123456</b>", expires_in=300)
+    _process_batch([_claim_next(WORKER)], WORKER, _deliver_with("smtp"))
+
+    doc = outbox.find_one({"_id": _id})
+    assert doc["status"] == "sent" and "body" not in doc
+
+
+def test_regular_message_keeps_its_body(outbox):
+    _id = enqueue_email("a@gmail.com", "Reply", "<p>Thanks</p>")
+    _process_batch([_claim_next(WORKER)], WORKER, _deliver_with("smtp"))
+
+    assert outbox.find_one({"_id": _id})["body"] == "<p>Thanks</p>"
+
+
+def test_short_lived_failure_retries_on_the_next_poll(outbox):
+    _id = enqueue_email("a@gmail.com", "OTP", "<b>123456</b>", expires_in=300)
+    _process_batch([_claim_next(WORKER)], WORKER, _deliver_with(RuntimeError("smtp down")))
+
+    doc = outbox.find_one({"_id": _id})
+    assert doc["status"] == "pending" and doc["body"]
+    assert doc["next_attempt_at"] <= datetime.utcnow() + timedelta(seconds=email_outbox.OUTBOX_POLL_SECONDS)
+
+
+def test_failure_that_would_retry_past_expiry_expires(outbox):
+    _id = enqueue_email("a@gmail.com", "OTP", "<b>123456</b>", expires_in=1)
+    _process_batch([_claim_next(WORKER)], WORKER, _deliver_with(RuntimeError("smtp down")))
+
+    doc = outbox.find_one({"_id": _id})
+    assert doc["status"] == "expired" and "body" not in doc
+
+
+def test_expired_message_is_never_delivered(outbox):
+    _id = enqueue_email("a@gmail.com", "OTP", "<b>123456</b>", expires_in=300)
+    outbox.update_one({"_id": _id}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    delivered = []
+
+    _process_batch([_claim_next(WORKER)], WORKER, lambda messages: delivered.extend(messages) or [])
+
+    assert delivered == []
+    doc = outbox.find_one({"_id": _id})
+    assert doc["status"] == "expired" and "body" not in doc
+
+
+def test_regular_message_backs_off_until_it_fails(outbox):
+    _id = enqueue_email("a@gmail.com", "Reply", "<p>Thanks</p>")
+    outbox.update_one({"_id": _id}, {"$set": {"attempts": OUTBOX_MAX_ATTEMPTS - 1}})
+    _process_batch([_claim_next(WORKER)], WORKER, _deliver_with(RuntimeError("smtp down")))
+
+    doc = outbox.find_one({"_id": _id})
+    assert doc["status"] == "failed" and doc["body"] == "<p>Thanks</p>"
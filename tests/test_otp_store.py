@@ -0,0 +1,42 @@
+import mongomock
+import pytest
+
+from backend.utils.otp_store import OTP_MAX_ATTEMPTS, MemoryOTPStore, MongoOTPStore
+
+EMAIL = "someone@gmail.com"
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def store(request):
+    if request.param == "memory":
+        return MemoryOTPStore()
+    return MongoOTPStore(mongomock.MongoClient().otp_test.otp_codes)
+
+
+def test_restore_keeps_the_attempts_already_spent(store):
+    store.put("reset", EMAIL, "123456")
+    for _ in range(OTP_MAX_ATTEMPTS - 1):
+        assert not store.verify_and_consume("reset", EMAIL, "000000")
+    store.restore("reset", EMAIL, store.verify_and_consume("reset", EMAIL, "123456"))
+
+    # One guess left, exactly as before the code was consumed
+    assert not store.verify_and_consume("reset", EMAIL, "000000")
+    assert not store.verify_and_consume("reset", EMAIL, "123456")
+
+
+def test_restore_does_not_replace_a_newer_code(store):
+    store.put("reset", EMAIL, "123456")
+    consumed = store.verify_and_consume("reset", EMAIL, "123456")
+    store.put("reset", EMAIL, "654321")
+    store.restore("reset", EMAIL, consumed)
+
+    assert store.verify_and_consume("reset", EMAIL, "654321")
+
+
+def test_restore_keeps_the_original_expiry():
+    store = MongoOTPStore(mongomock.MongoClient().otp_test.otp_codes)
+    store.put("signup", EMAIL, "123456")
+    expires_at = store.collection.find_one()["expires_at"]
+    store.restore("signup", EMAIL, store.verify_and_consume("signup", EMAIL, "123456"))
+
+    assert store.collection.find_one()["expires_at"] == expires_at
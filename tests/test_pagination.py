@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from backend.utils.pagination import keyset_filter
+
+OID = ObjectId()
+
+
+def _clauses(sort_order, values):
+    return keyset_filter(sort_order, values)["$or"]
+
+
+def test_null_boundary_ascending_continues_with_non_null_rows():
+    clauses = _clauses([("artist_name", 1), ("_id", 1)], [None, OID])
+    non_null = clauses[0]["artist_name"]["$type"]
+    assert "null" not in non_null and "string" in non_null and "date" in non_null
+    assert {"artist_name": None, "_id": {"$gt": OID}} in clauses
+
+
+def test_null_boundary_descending_only_continues_within_nulls():
+    clauses = _clauses([("artist_name", -1), ("_id", -1)], [None, OID])
+    assert all(c["artist_name"] is None for c in clauses)
+    assert {"artist_name": None, "_id": {"$lt": OID}} in clauses
+
+
+def test_string_boundary_ascending_reaches_date_typed_rows():
+    clauses = _clauses([("appointment_date", 1), ("_id", 1)], ["2025-06-30", OID])
+    assert {"appointment_date": {"$gt": "2025-06-30"}} in clauses
+    later = next(c["appointment_date"]["$type"] for c in clauses if "$type" in c.get("appointment_date", {}))
+    assert "date" in later and "string" not in later and "null" not in later
+
+
+def test_date_boundary_descending_reaches_string_and_null_rows():
+    boundary = datetime(2025, 6, 30)
+    clauses = _clauses([("appointment_date", -1), ("_id", -1)], [boundary, OID])
+    assert {"appointment_date": {"$lt": boundary}} in clauses
+    earlier = next(c["appointment_date"]["$type"] for c in clauses if "$type" in c.get("appointment_date", {}))
+    assert "string" in earlier and "date" not in earlier
+    assert {"appointment_date": None} in clauses
+    assert {"appointment_date": boundary, "_id": {"$lt": OID}} in clauses
@@ -0,0 +1,17 @@
+import pytest
+
+from backend.utils.search import appointment_search_filter
+
+
+@pytest.mark.parametrize("q", ["APT-000123", "apt-123", "APT123", "123"])
+def test_complete_booking_code_is_exact(q):
+    assert appointment_search_filter(q) == ({"display_id": "APT-000123"}, False)
+
+
+@pytest.mark.parametrize("q, prefix", [("APT-0001", "^APT-0001"), ("apt-00012*", "^APT-00012")])
+def test_partial_booking_code_is_prefix(q, prefix):
+    assert appointment_search_filter(q) == ({"display_id": {"$regex": prefix}}, False)
+
+
+def test_free_text_is_ranked():
+    assert appointment_search_filter("maria") == ({"$text": {"$search": "maria"}}, True)
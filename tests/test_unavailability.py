@@ -0,0 +1,72 @@
+import mongomock
+import pytest
+from bson import ObjectId
+
+from backend.utils import unavailability
+from backend.utils.unavailability import apply_unavailability, diff_unavailability, expand_slots
+
+DATE, OTHER = "2030-01-15", "2030-01-16"
+
+
+def _row(date, time):
+    return {"_id": ObjectId(), "unavailable_date": date, "unavailable_time": time}
+
+
+def test_expand_slots_normalises_24h_and_12h_labels():
+    slots = expand_slots([DATE], times=["14:00", "2:00 PM", "02:00 PM", "9:00 AM"])
+    assert slots == {DATE: {"2:00 PM", "9:00 AM"}}
+
+
+def test_add_only_inserts_missing_slots():
+    existing = [_row(DATE, "10:00 AM")]
+    inserts, delete_ids, removed = diff_unavailability(existing, {DATE: {"10:00 AM", "11:00 AM"}}, "add")
+    assert inserts == [(DATE, "11:00 AM")]
+    assert delete_ids == [] and removed == []
+
+
+def test_remove_only_deletes_listed_slots_that_exist():
+    keep, drop = _row(DATE, "10:00 AM"), _row(DATE, "11:00 AM")
+    inserts, delete_ids, removed = diff_unavailability([keep, drop], {DATE: {"11:00 AM", "3:00 PM"}}, "remove")
+    assert inserts == []
+    assert delete_ids == [drop["_id"]] and removed == [(DATE, "11:00 AM")]
+
+
+def test_replace_matches_listed_dates_exactly_and_leaves_others():
+    stale, kept, elsewhere = _row(DATE, "10:00 AM"), _row(DATE, "14:00"), _row(OTHER, "10:00 AM")
+    inserts, delete_ids, removed = diff_unavailability(
+        [stale, kept, elsewhere], {DATE: {"2:00 PM", "4:00 PM"}}, "replace",
+    )
+    # "14:00" already covers "2:00 PM", so it is neither deleted nor re-inserted
+    assert inserts == [(DATE, "4:00 PM")]
+    assert delete_ids == [stale["_id"]] and removed == [(DATE, "10:00 AM")]
+
+
+def test_duplicate_rows_for_one_slot_are_collapsed():
+    first, duplicate = _row(DATE, "2:00 PM"), _row(DATE, "14:00")
+    inserts, delete_ids, removed = diff_unavailability([first, duplicate], {DATE: {"2:00 PM"}}, "replace")
+    assert inserts == [] and removed == []
+    assert delete_ids == [duplicate["_id"]]
+
+
+def test_apply_writes_the_diff_and_mirrors_it_into_the_masks(monkeypatch):
+    db = mongomock.MongoClient().unavailability_test
+    staff_id = ObjectId()
+    db.staff_unavailability.insert_many([
+        {"staff_id": staff_id, "unavailable_date": DATE, "unavailable_time": "10:00 AM"},
+        # Booking markers are never part of the diff
+        {"staff_id": staff_id, "unavailable_date": DATE, "unavailable_time": "1:00 PM", "is_booked": True},
+    ])
+    mirrored = []
+    monkeypatch.setattr(unavailability, "update_blocked", lambda db, *args: mirrored.append(args))
+
+    counts = apply_unavailability(db, staff_id, {DATE: {"11:00 AM"}}, "replace")
+
+    assert counts == {"inserted": 1, "deleted": 1}
+    rows = {(r["unavailable_time"], "is_booked" in r) for r in db.staff_unavailability.find({"staff_id": staff_id})}
+    assert rows == {("11:00 AM", False), ("1:00 PM", True)}
+    assert mirrored == [(staff_id, [(DATE, "11:00 AM")], [(DATE, "10:00 AM")])]
+
+
+def test_apply_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        apply_unavailability(mongomock.MongoClient().unavailability_test, ObjectId(), {DATE: set()}, "merge")